@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import deque
+
+
+def estimate_size(value) -> int:
+    """
+    Taille approximative (octets) d'un document une fois sérialisé en JSON, sans le sérialiser :
+    longueur des chaînes et des clés, 8 octets par autre valeur. Suffit à borner la mémoire de la file,
+    dominée par les gros champs texte (XML EVTX, scripts PowerShell).
+    """
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return sum(len(key) + 4 + estimate_size(item) for key, item in value.items()) + 2
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) + 1 for item in value) + 2
+    return 8
+
+
+class _ProducerStopped(Exception):
+    """Le consommateur a abandonné la file : le thread producteur doit s'arrêter."""
+
+
+class ActionQueue:
+    """
+    File bornée entre la transformation (thread producteur) et l'envoi (thread appelant) : au plus 'max_items'
+    actions et 'max_bytes' octets (estimés) en attente. Le côté qui attend le plus désigne le goulot :
+    un producteur bloqué sur une file pleine attend le cluster, un consommateur bloqué sur une file vide
+    attend la transformation. L'occupation et ces attentes sont affichées toutes les 'report_interval' secondes.
+    """
+
+    # Nombre maximal d'actions retirées de la file en une fois par le consommateur
+    TAKE_SIZE = 500
+
+    def __init__(self, max_items: int, max_bytes: int, report_interval: float = 10):
+        self.max_items = max(1, max_items)
+        self.max_bytes = max(1, max_bytes)
+        self.report_interval = report_interval
+        self._items = deque()
+        self._bytes = 0
+        self._condition = threading.Condition()
+        self._finished = False
+        self._cancelled = False
+        self._error = None
+        # Temps passé à attendre (secondes), total et depuis le dernier affichage
+        self.producer_wait = self.consumer_wait = 0.0
+        self._reported_waits = (0.0, 0.0)
+        self.peak_items = self.peak_bytes = 0
+        self.total_items = 0
+
+    def stream(self, actions):
+        """Consomme 'actions' dans un thread producteur ; génère les actions dans l'ordre, côté appelant."""
+        producer = threading.Thread(target=self._produce, args=(actions,), name="action-producer", daemon=True)
+        producer.start()
+        try:
+            yield from self._consume()
+        finally:
+            with self._condition:
+                self._cancelled = True
+                self._condition.notify_all()
+                finished = self._finished
+            if finished:
+                producer.join()
+            self.print_summary()
+
+    # --- Producteur ---
+    def _produce(self, actions):
+        try:
+            for action in actions:
+                self._put(action, estimate_size(action))
+        except _ProducerStopped:
+            actions.close()
+        except BaseException as e:  # Y compris SystemExit : relancée côté consommateur
+            self._error = e
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def _put(self, action, size: int):
+        with self._condition:
+            if self._items and (len(self._items) >= self.max_items or self._bytes + size > self.max_bytes):
+                start = time.perf_counter()
+                while not self._cancelled and self._items and (
+                        len(self._items) >= self.max_items or self._bytes + size > self.max_bytes):
+                    self._condition.wait()
+                self.producer_wait += time.perf_counter() - start
+            if self._cancelled:
+                raise _ProducerStopped()
+            self._items.append((action, size))
+            self._bytes += size
+            self.peak_items = max(self.peak_items, len(self._items))
+            self.peak_bytes = max(self.peak_bytes, self._bytes)
+            self._condition.notify()
+
+    # --- Consommateur ---
+    def _consume(self):
+        last_report = time.monotonic()
+        while True:
+            with self._condition:
+                if not self._items and not self._finished:
+                    start = time.perf_counter()
+                    while not self._items and not self._finished:
+                        self._condition.wait()
+                    self.consumer_wait += time.perf_counter() - start
+                if not self._items:
+                    break
+                # Retrait par paquets : un seul verrou pour de nombreuses actions
+                batch = [self._items.popleft() for _ in range(min(len(self._items), self.TAKE_SIZE))]
+                self._bytes -= sum(size for _, size in batch)
+                self._condition.notify()
+            self.total_items += len(batch)
+            for action, _ in batch:
+                yield action
+            if time.monotonic() - last_report >= self.report_interval:
+                last_report = time.monotonic()
+                self.print_occupancy()
+        if self._error is not None:
+            raise self._error
+
+    # --- Affichage ---
+    def print_occupancy(self):
+        with self._condition:
+            item_count, size = len(self._items), self._bytes
+        producer_wait, consumer_wait = self.producer_wait, self.consumer_wait
+        print(f"    [File] {item_count}/{self.max_items} documents, {size / (1024 * 1024):.1f}/"
+              f"{self.max_bytes // (1024 * 1024)} Mo - attente transformation (file pleine) "
+              f"{producer_wait - self._reported_waits[0]:.1f} s, attente envoi (file vide) "
+              f"{consumer_wait - self._reported_waits[1]:.1f} s")
+        self._reported_waits = (producer_wait, consumer_wait)
+
+    def print_summary(self):
+        if not self.total_items:
+            return
+        print(f"\n[*] File transformation -> envoi : {self.total_items} documents, maximum {self.peak_items} documents / "
+              f"{self.peak_bytes / (1024 * 1024):.1f} Mo en attente")
+        print(f"    Transformation bloquée (file pleine) : {self.producer_wait:.1f} s, "
+              f"envoi en attente (file vide) : {self.consumer_wait:.1f} s")
+        if self.producer_wait > self.consumer_wait:
+            print("    Goulot d'étranglement : envoi (augmenter --thread-count / --max-in-flight ou le cluster)")
+        else:
+            print("    Goulot d'étranglement : lecture / transformation (augmenter --workers)")
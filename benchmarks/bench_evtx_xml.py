@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Compare le parsing du XML EVTX par xmltodict (ancien chemin) et par l'extracteur evtx_xml :
+#   - parsing seul : xml_string -> dict au format xmltodict
+#   - parsing + accès handler : System + EventData à plat (ce que lit un handle_* de EvtxHandler)
+# Vérifie au passage que les deux produisent exactement la même structure.
+#
+# Usage : python3 benchmarks/bench_evtx_xml.py [--lines 50000] [--repeat 3]
+# (xmltodict doit être installé pour la comparaison : pip install xmltodict)
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sample_timeline import generate_sample_events  # noqa: E402
+from plaso_processors.evtx_xml import EvtxRecord, flatten_event_data, xml_to_dict  # noqa: E402
+
+try:
+    import xmltodict
+except ImportError:
+    xmltodict = None
+
+
+def _best_rate(func, count: int, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best if best else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du parsing XML EVTX (xmltodict vs evtx_xml).")
+    parser.add_argument("--lines", type=int, default=50000, help="Nombre de lignes de la timeline synthétique.")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de répétitions (le meilleur temps est retenu).")
+    args = parser.parse_args()
+
+    xml_strings = [event["xml_string"] for event in generate_sample_events(args.lines) if "xml_string" in event]
+    print(f"[*] {len(xml_strings)} événements EVTX extraits de la timeline synthétique ({args.lines} lignes)")
+    if not xml_strings:
+        return
+
+    def evtx_xml_parse():
+        for xml_string in xml_strings:
+            xml_to_dict(xml_string)
+
+    def evtx_xml_access():
+        for xml_string in xml_strings:
+            record = EvtxRecord.from_xml(xml_string)
+            record.system.get("Computer")
+            record.event_data.get("TargetUserName")
+
+    results = [("evtx_xml", _best_rate(evtx_xml_parse, len(xml_strings), args.repeat),
+                _best_rate(evtx_xml_access, len(xml_strings), args.repeat))]
+
+    if xmltodict is not None:
+        mismatches = sum(1 for xml_string in xml_strings if xmltodict.parse(xml_string) != xml_to_dict(xml_string))
+        print(f"[*] Structures différentes de xmltodict : {mismatches}")
+
+        def xmltodict_parse():
+            for xml_string in xml_strings:
+                xmltodict.parse(xml_string)
+
+        def xmltodict_access():
+            for xml_string in xml_strings:
+                raw_log = xmltodict.parse(xml_string)
+                raw_log.get("Event", {}).get("System", {}).get("Computer")
+                flatten_event_data(raw_log.get("Event", {}).get("EventData")).get("TargetUserName")
+
+        results.insert(0, ("xmltodict", _best_rate(xmltodict_parse, len(xml_strings), args.repeat),
+                           _best_rate(xmltodict_access, len(xml_strings), args.repeat)))
+    else:
+        print("[!] xmltodict non installé : seul evtx_xml est mesuré.")
+
+    print(f"{'parseur':<10} {'parsing (evt/s)':>16} {'parsing + accès (evt/s)':>24}")
+    for name, parse_rate, access_rate in results:
+        print(f"{name:<10} {parse_rate:>16,.0f} {access_rate:>24,.0f}")
+    if len(results) == 2:
+        print(f"[*] Accélération : x{results[1][1] / results[0][1]:.2f} (parsing), "
+              f"x{results[1][2] / results[0][2]:.2f} (parsing + accès)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Mesure le débit (lignes/s) de chaque backend json_codec disponible sur une timeline synthétique fixe :
+#   - décodage : lignes JSONL -> dict (équivalent du json.loads du pipeline)
+#   - encodage bulk : action + document -> NDJSON (équivalent du corps _bulk)
+#
+# Usage : python3 benchmarks/bench_json_codec.py [--lines 50000] [--repeat 3]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sample_timeline import generate_sample_lines  # noqa: E402
+from plaso_processors import json_codec  # noqa: E402
+
+
+def _best_rate(func, count: int, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best if best else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des backends JSON (json_codec).")
+    parser.add_argument("--lines", type=int, default=50000, help="Nombre de lignes de la timeline synthétique.")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de répétitions (le meilleur temps est retenu).")
+    args = parser.parse_args()
+
+    lines = generate_sample_lines(args.lines)
+    action_line = {"index": {"_index": "plaso_bench_machine_files"}}
+    print(f"[*] Timeline synthétique : {len(lines)} lignes, {sum(map(len, lines)) // 1024} Ko")
+    print(f"{'backend':<10} {'décodage (l/s)':>16} {'encodage bulk (l/s)':>20}")
+
+    for backend in json_codec.available_backends():
+        json_codec.set_backend(backend)
+        events = [json_codec.loads(line) for line in lines]
+
+        def decode():
+            for line in lines:
+                json_codec.loads(line)
+
+        def encode():
+            buffer = bytearray()
+            for event in events:
+                buffer += json_codec.dumps_bytes(action_line)
+                buffer += b"\n"
+                buffer += json_codec.dumps_bytes(event)
+                buffer += b"\n"
+
+        decode_rate = _best_rate(decode, len(lines), args.repeat)
+        encode_rate = _best_rate(encode, len(events), args.repeat)
+        print(f"{backend:<10} {decode_rate:>16,.0f} {encode_rate:>20,.0f}")
+
+
+if __name__ == "__main__":
+    main()
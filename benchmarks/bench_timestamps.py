@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Compare les conversions de timestamps de BaseEventProcessor :
+#   - ancien chemin : _parse_*_to_dt (datetime, timedelta, strptime) puis _format_dt_to_es
+#   - chemin rapide : timestamps.py (arithmétique entière, préfixe de date mis en cache)
+#   - conversion par lot (process_batch) : timestamps.*_to_es_many, vectorisée si NumPy est installé
+# Les valeurs proviennent de la timeline synthétique ; le script vérifie aussi que tous les chemins
+# produisent exactement les mêmes chaînes.
+#
+# Usage : python3 benchmarks/bench_timestamps.py [--lines 50000] [--repeat 3]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.sample_timeline import generate_sample_events  # noqa: E402
+from plaso_processors import timestamps  # noqa: E402
+from plaso_processors.base_processor import BaseEventProcessor  # noqa: E402
+from plaso_processors.evtx_xml import EvtxRecord  # noqa: E402
+
+
+def _best_rate(func, count: int, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best if best else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des conversions de timestamps (datetime vs timestamps.py).")
+    parser.add_argument("--lines", type=int, default=50000, help="Nombre de lignes de la timeline synthétique.")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de répétitions (le meilleur temps est retenu).")
+    args = parser.parse_args()
+
+    filetimes, unix_micros, ole_dates, system_times = [], [], [], []
+    for event in generate_sample_events(args.lines):
+        unix_micros.append(event["timestamp"])
+        date_time = event["date_time"]
+        if date_time.get("__class_name__") == "OLEAutomationDate":
+            ole_dates.append(date_time["timestamp"])
+        else:
+            filetimes.append(date_time["timestamp"])
+        if "xml_string" in event:
+            system_times.append(EvtxRecord.from_xml(event["xml_string"]).system["TimeCreated"]["@SystemTime"])
+
+    base = BaseEventProcessor
+    cases = [
+        ("FILETIME", filetimes,
+         lambda value: base._format_dt_to_es(base._parse_filetime_to_dt(value)), timestamps.filetime_to_es,
+         timestamps.filetime_to_es_many),
+        ("Unix µs", unix_micros,
+         lambda value: base._format_dt_to_es(base._parse_unix_micro_to_dt(value)), timestamps.unix_micro_to_es,
+         timestamps.unix_micro_to_es_many),
+        ("OLE", ole_dates,
+         lambda value: base._format_dt_to_es(base._parse_ole_automation_date_to_dt(value)),
+         timestamps.ole_automation_date_to_es, None),
+        ("ISO 'Z'", system_times,
+         lambda value: base._format_dt_to_es(base._parse_iso_string_to_dt(value)),
+         lambda value: timestamps.format_us(timestamps.iso_z_to_us(value)), None),
+    ]
+
+    print(f"[*] NumPy : {'disponible' if timestamps.numpy is not None else 'non installé (lots = boucle scalaire)'}")
+    print(f"{'type':<10} {'valeurs':>8} {'datetime (v/s)':>16} {'entier (v/s)':>16} {'lot (v/s)':>14} "
+          f"{'accél.':>8} {'écarts':>7}")
+    for name, values, old_func, new_func, many_func in cases:
+        if not values:
+            continue
+        old_values = [old_func(value) for value in values]
+        mismatches = sum(1 for old, value in zip(old_values, values) if old != new_func(value))
+        if many_func is not None:
+            mismatches += sum(1 for old, new in zip(old_values, many_func(values)) if old != new)
+
+        def run_old():
+            for value in values:
+                old_func(value)
+
+        def run_new():
+            for value in values:
+                new_func(value)
+
+        old_rate = _best_rate(run_old, len(values), args.repeat)
+        new_rate = _best_rate(run_new, len(values), args.repeat)
+        best_rate = new_rate
+        many_column = "-"
+        if many_func is not None:
+            many_rate = _best_rate(lambda: many_func(values), len(values), args.repeat)
+            best_rate = max(new_rate, many_rate)
+            many_column = f"{many_rate:,.0f}"
+        print(f"{name:<10} {len(values):>8} {old_rate:>16,.0f} {new_rate:>16,.0f} {many_column:>14} "
+              f"{best_rate / old_rate:>7.1f}x {mismatches:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import random
+
+# Génère une timeline Plaso synthétique mais réaliste (MFT, EVTX, registre, LNK, prefetch, SRUM...),
+# toujours identique pour une même graine : les mesures des différents benchmarks restent comparables.
+
+_EVTX_XML = (
+    '<Event xmlns="http://schemas.microsoft.com/win/2004/08/events/event"><System>'
+    '<Provider Name="Microsoft-Windows-Security-Auditing" Guid="{{54849625-5478-4994-A5BA-3E3B0328C30D}}"/>'
+    '<EventID>{event_id}</EventID><Version>2</Version><Level>0</Level><Task>12544</Task><Opcode>0</Opcode>'
+    '<Keywords>0x8020000000000000</Keywords><TimeCreated SystemTime="{system_time}"/>'
+    '<EventRecordID>{record_id}</EventRecordID><Correlation/><Execution ProcessID="4" ThreadID="8"/>'
+    '<Channel>Security</Channel><Computer>WS01.corp.local</Computer><Security/></System><EventData>'
+    '<Data Name="SubjectUserSid">S-1-5-18</Data><Data Name="SubjectUserName">WS01$</Data>'
+    '<Data Name="SubjectDomainName">CORP</Data><Data Name="SubjectLogonId">0x3e7</Data>'
+    '<Data Name="TargetUserSid">S-1-5-21-1-2-3-1104</Data><Data Name="TargetUserName">user{user}</Data>'
+    '<Data Name="TargetDomainName">CORP</Data><Data Name="TargetLogonId">0x8d5f2</Data>'
+    '<Data Name="LogonType">{logon_type}</Data><Data Name="LogonProcessName">NtLmSsp </Data>'
+    '<Data Name="AuthenticationPackageName">NTLM</Data><Data Name="WorkstationName">WS{user}</Data>'
+    '<Data Name="LogonGuid">{{00000000-0000-0000-0000-000000000000}}</Data>'
+    '<Data Name="TransmittedServices">-</Data><Data Name="LmPackageName">NTLM V2</Data>'
+    '<Data Name="KeyLength">128</Data><Data Name="ProcessId">0x0</Data><Data Name="ProcessName">-</Data>'
+    '<Data Name="IpAddress">10.0.{ip_a}.{ip_b}</Data><Data Name="IpPort">{port}</Data></EventData></Event>'
+)
+
+_FILETIME_EPOCH_DELTA = 116444736000000000
+
+
+def _base_event(rng, parser, data_type, timestamp, filetime):
+    return {
+        "__container_type__": "event",
+        "__type__": "AttributeContainer",
+        "_event_values_hash": "%032x" % rng.getrandbits(128),
+        "data_type": data_type,
+        "date_time": {"__class_name__": "Filetime", "__type__": "DateTimeValues", "timestamp": filetime},
+        "display_name": "NTFS:\\Windows\\System32\\config\\SOFTWARE",
+        "message": f"Synthetic {data_type} event",
+        "parser": parser,
+        "timestamp": timestamp,
+        "timestamp_desc": rng.choice(["Creation Time", "Content Modification Time", "Last Access Time"]),
+    }
+
+
+def generate_sample_events(count: int = 50000, seed: int = 1337):
+    """Génère 'count' événements Plaso (dict) dans des proportions proches d'un cas réel (MFT/USN majoritaires)."""
+    rng = random.Random(seed)
+    for index in range(count):
+        timestamp = 1683000000000000 + rng.randint(0, 10 ** 13)
+        filetime = timestamp * 10 + _FILETIME_EPOCH_DELTA + rng.randint(0, 9)
+        kind = rng.random()
+        if kind < 0.55:
+            event = _base_event(rng, rng.choice(["mft", "usnjrnl", "filestat"]), "fs:stat:ntfs", timestamp, filetime)
+            event.update({"file_reference": rng.randint(1, 10 ** 6), "file_size": rng.randint(0, 10 ** 8),
+                          "filename": f"\\Users\\user\\AppData\\Local\\Temp\\file_{index}.tmp",
+                          "file_system_type": "NTFS", "is_allocated": True})
+        elif kind < 0.75:
+            event = _base_event(rng, "winevtx", "windows:evtx:record", timestamp, filetime)
+            event.update({
+                "event_identifier": 4624, "record_number": index, "source_name": "Microsoft-Windows-Security-Auditing",
+                "filename": "C:\\Windows\\System32\\winevt\\Logs\\Security.evtx",
+                "xml_string": _EVTX_XML.format(
+                    event_id=4624, record_id=index, user=rng.randint(1, 50), logon_type=rng.choice([2, 3, 10]),
+                    ip_a=rng.randint(0, 255), ip_b=rng.randint(1, 254), port=rng.choice(["-", "0", "49732"]),
+                    system_time="2023-05-%02dT%02d:%02d:%02d.%07dZ" % (
+                        rng.randint(1, 28), rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59),
+                        rng.randint(0, 9999999))),
+            })
+        elif kind < 0.87:
+            event = _base_event(rng, "winreg/winreg_default", "windows:registry:key_value", timestamp, filetime)
+            event.update({"key_path": f"HKEY_LOCAL_MACHINE\\Software\\Vendor\\Key{index % 500}",
+                          "filename": "C:\\Windows\\System32\\config\\SOFTWARE",
+                          "values": [{"name": f"Value{j}", "data": f"data_{j}_{index}", "data_type": "REG_SZ"}
+                                     for j in range(rng.randint(0, 4))]})
+        elif kind < 0.93:
+            event = _base_event(rng, "lnk", "windows:lnk:link", timestamp, filetime)
+            event.update({"local_path": f"C:\\Users\\user\\Documents\\doc_{index}.docx", "drive_serial_number": 1234})
+        elif kind < 0.96:
+            event = _base_event(rng, "prefetch", "windows:prefetch:execution", timestamp, filetime)
+            event.update({"executable": "CMD.EXE", "run_count": rng.randint(1, 50), "prefetch_hash": 0x1234,
+                          "mapped_files": [f"\\VOLUME{{1}}\\WINDOWS\\SYSTEM32\\LIB{j}.DLL" for j in range(8)]})
+        else:
+            event = _base_event(rng, "esedb/srum", "windows:srum:application_usage", timestamp, filetime)
+            event["date_time"] = {"__class_name__": "OLEAutomationDate", "timestamp": 45000.0 + rng.random() * 1000}
+            event.update({"application": "C:\\Program Files\\App\\app.exe", "bytes_sent": rng.randint(0, 10 ** 6)})
+        yield event
+
+
+def generate_sample_lines(count: int = 50000, seed: int = 1337) -> list:
+    """Retourne la timeline synthétique sous forme de lignes JSONL (sans le '\\n')."""
+    return [json.dumps(event) for event in generate_sample_events(count, seed)]
+
+
+def write_sample_timeline(path: str, count: int = 50000, seed: int = 1337):
+    with open(path, "w", encoding="utf-8") as f:
+        for line in generate_sample_lines(count, seed):
+            f.write(line + "\n")
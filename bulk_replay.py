@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from elasticsearch.exceptions import ApiError
+
+from bulk_sender import _ChunkRetry, retry_delay
+from dead_letter import DeadLetterWriter, FailureReporter
+from elastic_uploader import ElasticUploader
+from ndjson_sink import FILE_EXTENSIONS, TEMPLATES_FILE_NAME
+from node_pool import NODE_SELECTORS
+from timeline_reader import iter_stream_blocks
+
+# Réponse _bulk réduite au strict nécessaire : les documents réussis ne renvoient que leur statut
+BULK_FILTER_PATH = "errors,items.*.status,items.*.error.type,items.*.error.reason"
+
+
+def iter_bulk_chunks(path: str, chunk_bytes: int):
+    """
+    Découpe un fichier NDJSON bulk (éventuellement compressé) en corps de requêtes _bulk d'environ 'chunk_bytes'
+    octets, sans décoder les documents : les coupures tombent sur une fin de ligne et après un nombre pair de lignes
+    (paires action / source, comme en écrit --output-dir). Génère des tuples (corps, nombre de documents).
+    """
+    data = b""
+    for block in iter_stream_blocks(path):
+        data = data + block if data else block
+        while len(data) >= chunk_bytes:
+            cut = data.find(b"\n", chunk_bytes - 1)
+            if cut != -1 and data.count(b"\n", 0, cut + 1) % 2:
+                cut = data.find(b"\n", cut + 1)
+            if cut == -1:
+                break  # Paire incomplète : on attend le bloc suivant
+            yield data[:cut + 1], data.count(b"\n", 0, cut + 1) // 2
+            data = data[cut + 1:]
+    if data.strip():
+        if not data.endswith(b"\n"):
+            data += b"\n"
+        yield data, data.count(b"\n") // 2
+
+
+def collect_bulk_files(paths: list) -> (list, list):
+    """Retourne (fichiers NDJSON bulk, fichiers de templates) à partir de fichiers et de répertoires (--output-dir)."""
+    files, template_files = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(tuple(FILE_EXTENSIONS.values()))))
+            directory = path
+        else:
+            files.append(path)
+            directory = os.path.dirname(path) or "."
+        template_file = os.path.join(directory, TEMPLATES_FILE_NAME)
+        if os.path.exists(template_file) and template_file not in template_files:
+            template_files.append(template_file)
+    return files, template_files
+
+
+class BulkReplayer:
+    """
+    Rejoue des fichiers NDJSON bulk (--output-dir de plaso_2_siem.py) dans Elasticsearch avec 'thread_count'
+    requêtes simultanées. Les corps sont transmis tels quels (aucun json.loads des documents) : seul le débit
+    d'ingestion côté Elasticsearch est mesuré. Connexion, timeouts et retries sont ceux d'ElasticUploader :
+    les documents rejetés en 429 / 503 sont renvoyés comme dans BulkSender, les autres échecs sont résumés
+    (FailureReporter) et écrits dans la file des rejets. Seuls les documents en échec sont décodés.
+    """
+
+    def __init__(self, uploader: ElasticUploader, chunk_bytes: int, thread_count: int):
+        self.uploader = uploader
+        self.chunk_bytes = chunk_bytes
+        self.thread_count = max(1, thread_count)
+        self.max_retries = max(0, uploader.max_retries)
+        self.retry_backoff = uploader.retry_backoff
+        self.stats = Counter()
+        self.failures = FailureReporter()
+        self.dead_letters = None
+        if uploader.dead_letter_file:
+            serializer = uploader.client.transport.serializers.get_serializer("application/json")
+            self.dead_letters = DeadLetterWriter(uploader.dead_letter_file, serializer)
+        self._lock = threading.Lock()
+
+    def install_templates(self, template_files: list):
+        for template_file in template_files:
+            with open(template_file, "r", encoding="utf-8") as f:
+                for template_name, template_body in json.load(f).items():
+                    self.uploader.put_index_template(template_name, template_body)
+
+    def replay(self, files: list):
+        print(f"\nRejeu de {len(files)} fichier(s) : {self.thread_count} requêtes simultanées, "
+              f"lots de {self.chunk_bytes // (1024 * 1024)} Mo...")
+        start_time = last_report = time.perf_counter()
+        pending = deque()
+        try:
+            with ThreadPoolExecutor(max_workers=self.thread_count, thread_name_prefix="bulk-replay") as executor:
+                for path in files:
+                    print(f"[*] {path}")
+                    for body, document_count in iter_bulk_chunks(path, self.chunk_bytes):
+                        pending.append(executor.submit(self._send_chunk, body, document_count))
+                        # Fenêtre bornée : au plus deux lots en attente par connexion
+                        while len(pending) >= self.thread_count * 2:
+                            pending.popleft().result()
+                        if time.perf_counter() - last_report >= 10:
+                            last_report = time.perf_counter()
+                            self._print_rate(last_report - start_time)
+                while pending:
+                    pending.popleft().result()
+            self._print_summary(time.perf_counter() - start_time)
+        finally:
+            if self.dead_letters is not None:
+                self.dead_letters.close()
+
+    def _send_chunk(self, body: bytes, document_count: int):
+        lines = body.split(b"\n")[:-1]  # Le corps se termine par une fin de ligne
+        pairs = list(zip(lines[0::2], lines[1::2]))
+        retry = _ChunkRetry(lines, pairs, self.max_retries)
+        failed_requests = 0
+        while retry.positions:
+            if retry.attempt:
+                time.sleep(retry_delay(retry.attempt, self.retry_backoff))
+            start = time.perf_counter()
+            try:
+                response = self.uploader.client.bulk(operations=retry.lines(), filter_path=BULK_FILTER_PATH)
+            except ApiError as e:
+                # Requête entière rejetée : renvoyée en 429 / 503, comme un rejet document par document
+                failed_requests += 1
+                retry.record(start, self._error_outcomes(len(retry.positions), e, e.status_code))
+            except Exception as e:
+                # Erreur de transport, après les retries du client : échec définitif du lot
+                failed_requests += 1
+                retry.record(start, self._error_outcomes(len(retry.positions), e, None))
+            else:
+                retry.record(start, self._response_outcomes(response, len(retry.positions)))
+
+        results, _, _, retried = retry.outcome()
+        succeeded, existing, failed = 0, 0, []
+        for pair, (ok, result) in zip(pairs, results):
+            op_type, item = next(iter(result.items()))
+            if ok:
+                succeeded += 1
+            elif op_type == "create" and item.get("status") == 409:
+                existing += 1  # Document déjà indexé (réingestion avec --op-type create)
+            else:
+                failed.append(self._failed_result(pair, item))
+        with self._lock:
+            self.stats["succeeded"] += succeeded
+            self.stats["existing"] += existing
+            self.stats["failed"] += len(failed)
+            self.stats["retried"] += retried
+            self.stats["bytes"] += len(body)
+            self.stats["requests"] += retry.attempt
+            self.stats["failed_requests"] += failed_requests
+            for result in failed:
+                self.failures.record(result)
+                if self.dead_letters is not None:
+                    self.dead_letters.write(result)
+
+    @staticmethod
+    def _response_outcomes(response, document_count: int) -> list:
+        """Retourne (ok, {op_type: item}, statut) pour chaque document d'une réponse _bulk filtrée."""
+        if not response.get("errors"):
+            return [(True, {"index": {}}, 200)] * document_count
+        outcomes = []
+        for item in response.get("items", []):
+            op_type, result = item.popitem()
+            status = result.get("status", 500)
+            outcomes.append((200 <= status < 300, {op_type: result}, status))
+        return outcomes
+
+    @staticmethod
+    def _error_outcomes(document_count: int, error: Exception, status: int) -> list:
+        """Chaque document du lot est en échec ; le type d'opération est repris de sa ligne d'action à la fin."""
+        return [(False, {None: {"error": str(error), "status": status, "exception": error}}, status)
+                for _ in range(document_count)]
+
+    @staticmethod
+    def _failed_result(pair: tuple, item: dict) -> dict:
+        """Décode la ligne d'action et la source d'un document en échec, au format de BulkSender (file des rejets)."""
+        meta, source = json.loads(pair[0]), json.loads(pair[1])
+        op_type, action = next(iter(meta.items()))
+        result = dict(action)  # _index / _id du document
+        result.update(item)
+        result["action"], result["data"] = meta, source
+        return {op_type: result}
+
+    def _print_rate(self, elapsed: float):
+        with self._lock:
+            documents, size = self.stats["succeeded"] + self.stats["existing"], self.stats["bytes"]
+        print(f"    ... {documents} documents ({documents / elapsed:,.0f} docs/s, "
+              f"{size / elapsed / (1024 * 1024):.1f} Mo/s)")
+
+    def _print_summary(self, elapsed: float):
+        stats = self.stats
+        print("\nRejeu terminé.")
+        print(f"Requêtes _bulk : {stats['requests']} ({stats['failed_requests']} en échec)")
+        print(f"Documents indexés avec succès : {stats['succeeded']}")
+        if stats["existing"]:
+            print(f"Documents déjà indexés (ignorés) : {stats['existing']}")
+        if stats["retried"]:
+            print(f"Documents renvoyés après un rejet 429 / 503 : {stats['retried']}")
+        if stats["failed"]:
+            self.failures.print_summary()
+        if self.dead_letters is not None and self.dead_letters.count > 0:
+            print(f"Documents écrits dans la file des rejets : {self.dead_letters.count} ('{self.dead_letters.path}', "
+                  f"motifs dans '{self.dead_letters.errors_path}')")
+        if elapsed > 0:
+            documents = stats["succeeded"] + stats["existing"]
+            print(f"Débit : {documents / elapsed:,.0f} docs/s, {stats['bytes'] / elapsed / (1024 * 1024):.1f} Mo/s "
+                  f"(NDJSON)")
+        self.uploader.node_stats.print_stats()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Rejoue dans Elasticsearch des fichiers NDJSON bulk produits par plaso_2_siem.py --output-dir.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("paths", nargs="+",
+                        help="Fichiers NDJSON bulk (.ndjson, .ndjson.gz, .ndjson.zst) ou répertoires --output-dir.")
+    parser.add_argument("--es-hosts", default="https://localhost:9200",
+                        help="Hôte(s) Elasticsearch, séparés par des virgules.")
+    parser.add_argument("--es-user", default="elastic", help="Nom d'utilisateur pour Elasticsearch.")
+    parser.add_argument("--es-pass", default="changeme", help="Mot de passe pour Elasticsearch.")
+    parser.add_argument("--verify-ssl", action="store_true", dest="verify_ssl", default=False,
+                        help="Active la vérification du certificat SSL (désactivée par défaut).")
+    parser.add_argument("--es-timeout", type=int, default=60,
+                        help="Délai d'attente pour les requêtes Elasticsearch (en secondes).")
+    parser.add_argument("--thread-count", type=int, default=4, help="Nombre de requêtes _bulk simultanées.")
+    parser.add_argument("--chunk-mb", type=int, default=8, help="Taille (Mo) du corps de chaque requête _bulk.")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Nombre de renvois d'un document rejeté en 429 / 503 (cluster saturé) avant de le "
+                             "considérer en échec.")
+    parser.add_argument("--retry-backoff", type=float, default=1.0,
+                        help="Attente (secondes) avant le premier renvoi, doublée à chaque renvoi (60 s au plus).")
+    parser.add_argument("--dead-letter-file", default="bulk_replay_dead_letter.ndjson",
+                        help="Fichier NDJSON bulk recevant les documents en échec (créé au premier rejet).")
+    parser.add_argument("--sniff", action="store_true", default=False,
+                        help="Découvre les nœuds de données du cluster et répartit les requêtes sur tous ces nœuds.")
+    parser.add_argument("--node-selector", choices=NODE_SELECTORS, default="round_robin",
+                        help="Choix du nœud de chaque requête : round_robin, random ou least_latency.")
+    parser.add_argument("--no-templates", action="store_false", dest="templates", default=True,
+                        help=f"N'installe pas les templates d'index enregistrés ({TEMPLATES_FILE_NAME}).")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    start_time = time.time()
+    print(f"[*] Démarrage du script à {time.strftime('%H:%M:%S', time.localtime(start_time))}")
+
+    try:
+        bulk_files, templates = collect_bulk_files(args.paths)
+        if not bulk_files:
+            raise FileNotFoundError(f"Aucun fichier NDJSON bulk trouvé dans : {', '.join(args.paths)}")
+        if os.path.abspath(args.dead_letter_file) in map(os.path.abspath, bulk_files):
+            # Le fichier rejoué grossirait pendant sa lecture
+            raise ValueError(f"--dead-letter-file ne peut pas être un des fichiers rejoués : {args.dead_letter_file}")
+        uploader = ElasticUploader(args.es_hosts.split(','), args.es_user, args.es_pass, args.verify_ssl,
+                                   args.es_timeout, args.thread_count, "parallel", max_retries=args.max_retries,
+                                   retry_backoff=args.retry_backoff, dead_letter_file=args.dead_letter_file,
+                                   sniff=args.sniff, node_selector=args.node_selector)
+        replayer = BulkReplayer(uploader, max(1, args.chunk_mb) * 1024 * 1024, args.thread_count)
+        if args.templates:
+            replayer.install_templates(templates)
+        replayer.replay(bulk_files)
+    except ConnectionError as e:
+        print(f"\n[ERREUR DE CONNEXION] {e}")
+    except Exception as e:
+        print(f"\n[ERREUR INATTENDUE] Une erreur est survenue : {e}")
+        traceback.print_exc()
+    finally:
+        elapsed_time = time.time() - start_time
+        print(f"\n[*] Fin du traitement.")
+        print(f"[*] Temps d'exécution total : {str(timedelta(seconds=int(elapsed_time)))}")
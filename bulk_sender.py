@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from elasticsearch.exceptions import ApiError
+from elasticsearch.helpers import expand_action
+
+
+class AdaptiveChunkSizer:
+    """
+    Nombre de documents par requête _bulk, ajusté en AIMD d'après la latence observée :
+    - réponse rapide (< target_latency) sur un lot plein : +increment documents ;
+    - réponse lente (> 2 x target_latency) : -25 % ;
+    - rejet 429 (file d'écriture du cluster saturée) : divisé par deux.
+    Désactivé (enabled=False), la taille reste celle de --chunk-size.
+    """
+
+    MIN_SIZE = 10
+    MAX_SIZE = 10000
+
+    def __init__(self, initial: int, target_latency: float = 1.0, enabled: bool = False):
+        self.size = max(1, initial)
+        self.target_latency = target_latency
+        self.enabled = enabled
+        self.increment = max(1, self.size // 4)
+        self.smallest = self.largest = self.size
+
+    def record(self, latency: float, document_count: int, throttled: bool):
+        if not self.enabled:
+            return
+        if throttled:
+            self.size = max(self.MIN_SIZE, self.size // 2)
+        elif latency > 2 * self.target_latency:
+            self.size = max(self.MIN_SIZE, self.size * 3 // 4)
+        elif latency < self.target_latency and document_count >= self.size:
+            # Seul un lot plein (limité par le nombre de documents, pas par les octets) justifie d'augmenter
+            self.size = min(self.MAX_SIZE, self.size + self.increment)
+        self.smallest, self.largest = min(self.smallest, self.size), max(self.largest, self.size)
+
+
+# Statuts pour lesquels un document rejeté est renvoyé : file d'écriture saturée, nœud indisponible
+RETRYABLE_STATUSES = (429, 503)
+
+# Attente maximale (secondes) entre deux renvois d'un même lot
+MAX_RETRY_BACKOFF = 60.0
+
+
+def retry_delay(attempt: int, retry_backoff: float) -> float:
+    """Attente avant le renvoi n° 'attempt' : exponentielle, avec une part aléatoire (désynchronisation)."""
+    return min(MAX_RETRY_BACKOFF, retry_backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1)
+
+
+class _ChunkRetry:
+    """État des envois d'un lot : documents encore à envoyer, résultats définitifs, statistiques."""
+
+    def __init__(self, bulk_actions: list, bulk_data: list, max_retries: int):
+        self.bulk_actions, self.bulk_data = bulk_actions, bulk_data
+        self.max_retries = max_retries
+        self.results = [None] * len(bulk_data)
+        self.positions = list(range(len(bulk_data)))
+        self.attempt = 0
+        self.latency, self.throttled, self.retried = None, False, 0
+
+    def lines(self) -> list:
+        if self.attempt == 0:
+            return self.bulk_actions
+        return [line for pos in self.positions for line in self.bulk_actions[2 * pos:2 * pos + 2]]
+
+    def data(self) -> list:
+        return [self.bulk_data[pos] for pos in self.positions]
+
+    def record(self, start: float, outcomes: list):
+        """Enregistre les résultats d'une requête ; les rejets 429 / 503 restent à renvoyer."""
+        if self.latency is None:
+            self.latency = time.perf_counter() - start
+        retry = []
+        for pos, (ok, result, status) in zip(self.positions, outcomes):
+            self.throttled = self.throttled or status == 429
+            if not ok and status in RETRYABLE_STATUSES and self.attempt < self.max_retries:
+                retry.append(pos)
+            else:
+                self.results[pos] = (ok, result)
+        self.attempt += 1
+        self.retried += len(retry)
+        self.positions = retry
+
+    def outcome(self) -> (list, float, bool, int):
+        return self.results, self.latency, self.throttled, self.retried
+
+
+class BulkSender:
+    """
+    Découpe les actions en requêtes _bulk et les envoie (remplace streaming_bulk / parallel_bulk).
+    Un lot est coupé au premier des deux seuils atteint : nombre de documents (AdaptiveChunkSizer)
+    ou taille du corps NDJSON (max_chunk_bytes ; un document plus gros part seul).
+    Les documents rejetés en 429 / 503 sont renvoyés jusqu'à 'max_retries' fois, après une attente
+    exponentielle (retry_backoff, 2 x retry_backoff, ...) ; les autres échecs sont définitifs.
+    Avec thread_count > 1, plusieurs requêtes sont en vol ; les résultats sont toujours restitués
+    dans l'ordre des actions, au même format que les helpers (ok, {op_type: item}).
+    Un document en échec porte sa source ("data") et sa ligne d'action ("action") pour la file des rejets.
+    """
+
+    def __init__(self, client, chunk_sizer: AdaptiveChunkSizer, max_chunk_bytes: int, thread_count: int = 1,
+                 request_timeout: int = None, max_retries: int = 5, retry_backoff: float = 1.0):
+        self.client = client.options(request_timeout=request_timeout) if request_timeout else client
+        self.serializer = client.transport.serializers.get_serializer("application/json")
+        self.chunk_sizer = chunk_sizer
+        self.max_chunk_bytes = max_chunk_bytes
+        self.thread_count = max(1, thread_count)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.request_count = 0
+        self.total_latency = 0.0
+        self.retried_count = 0  # Renvois de documents (un document renvoyé deux fois compte pour deux)
+
+    def _iter_chunks(self, actions):
+        """Génère des lots (lignes NDJSON sérialisées, données (meta, source) de chaque action)."""
+        bulk_actions, bulk_data, size = [], [], 0
+        for action in actions:
+            meta, source = expand_action(action)
+            meta_bytes = self.serializer.dumps(meta)
+            source_bytes = self.serializer.dumps(source)
+            action_size = len(meta_bytes) + len(source_bytes) + 2  # + 2 fins de ligne
+            if bulk_data and (len(bulk_data) >= self.chunk_sizer.size or size + action_size > self.max_chunk_bytes):
+                yield bulk_actions, bulk_data
+                bulk_actions, bulk_data, size = [], [], 0
+            bulk_actions += (meta_bytes, source_bytes)
+            bulk_data.append((meta, source))
+            size += action_size
+        if bulk_data:
+            yield bulk_actions, bulk_data
+
+    def _send_chunk(self, bulk_actions: list, bulk_data: list) -> (list, float, bool, int):
+        """
+        Envoie un lot, puis renvoie ses documents rejetés en 429 / 503 tant que max_retries le permet.
+        Retourne (résultats (ok, item) dans l'ordre, latence de la première requête, rejet 429 observé,
+        nombre de renvois).
+        """
+        retry = _ChunkRetry(bulk_actions, bulk_data, self.max_retries)
+        while retry.positions:
+            if retry.attempt:
+                time.sleep(self._retry_delay(retry.attempt))
+            start = time.perf_counter()
+            try:
+                response = self.client.bulk(operations=retry.lines())
+            except ApiError as e:
+                retry.record(start, self._error_results(retry.data(), e))
+            else:
+                retry.record(start, self._response_results(retry.data(), response.body["items"]))
+        return retry.outcome()
+
+    def _retry_delay(self, attempt: int) -> float:
+        return retry_delay(attempt, self.retry_backoff)
+
+    @staticmethod
+    def _error_results(bulk_data: list, error: ApiError) -> list:
+        """Même format que les helpers (raise_on_exception=False) : chaque document du lot est en échec."""
+        results = []
+        for meta, source in bulk_data:
+            op_type, action = next(iter(meta.items()))
+            info = {"error": str(error), "status": error.status_code, "exception": error, "data": source,
+                    "action": meta}
+            info.update(action)
+            results.append((False, {op_type: info}, error.status_code))
+        return results
+
+    @staticmethod
+    def _response_results(bulk_data: list, items: list) -> list:
+        """Retourne (ok, {op_type: item}, statut) pour chaque document d'une réponse _bulk."""
+        results = []
+        for (meta, source), item in zip(bulk_data, items):
+            op_type, result = item.popitem()
+            status = result.get("status", 500)
+            ok = 200 <= status < 300
+            if not ok:
+                result["data"] = source
+                result["action"] = meta
+            results.append((ok, {op_type: result}, status))
+        return results
+
+    def _collect(self, bulk_data: list, outcome: tuple) -> list:
+        results, latency, throttled, retried = outcome
+        self.chunk_sizer.record(latency, len(bulk_data), throttled)
+        self.retried_count += retried
+        self.request_count += 1
+        self.total_latency += latency
+        return results
+
+    def send(self, actions):
+        """Envoie toutes les actions ; génère (ok, item) pour chacune, dans l'ordre."""
+        if self.thread_count == 1:
+            for bulk_actions, bulk_data in self._iter_chunks(actions):
+                yield from self._collect(bulk_data, self._send_chunk(bulk_actions, bulk_data))
+            return
+
+        with ThreadPoolExecutor(max_workers=self.thread_count, thread_name_prefix="bulk-sender") as executor:
+            # Fenêtre bornée : au plus deux lots en attente par thread d'envoi
+            yield from self._send_windowed(actions, lambda bulk_actions, bulk_data: executor.submit(
+                self._send_chunk, bulk_actions, bulk_data), self.thread_count * 2)
+
+    def _send_windowed(self, actions, submit, window: int):
+        """Soumet les lots via submit(lignes, données) -> Future, avec au plus 'window' lots en attente."""
+        pending = deque()
+        for bulk_actions, bulk_data in self._iter_chunks(actions):
+            pending.append((bulk_data, submit(bulk_actions, bulk_data)))
+            while len(pending) >= window:
+                bulk_data, future = pending.popleft()
+                yield from self._collect(bulk_data, future.result())
+        while pending:
+            bulk_data, future = pending.popleft()
+            yield from self._collect(bulk_data, future.result())
+
+    def print_stats(self):
+        if not self.request_count:
+            return
+        print(f"Requêtes _bulk : {self.request_count} (latence moyenne {self.total_latency / self.request_count:.2f} s)")
+        if self.chunk_sizer.enabled:
+            print(f"Taille adaptative des lots : {self.chunk_sizer.size} documents "
+                  f"(min {self.chunk_sizer.smallest}, max {self.chunk_sizer.largest})")
+        if self.retried_count:
+            print(f"Documents renvoyés après un rejet 429 / 503 : {self.retried_count}")
+
+
+class AsyncBulkSender(BulkSender):
+    """
+    Variante asyncio de BulkSender (--mode async) : les requêtes _bulk partent d'une boucle asyncio exécutée
+    dans un thread dédié, avec un client AsyncElasticsearch. Un sémaphore borne les requêtes en vol
+    à 'max_in_flight' ; la transformation (synchrone) alimente la boucle par une file bornée de lots
+    (au plus 2 x max_in_flight en attente), ce qui freine la lecture quand le cluster ralentit.
+    Découpage, renvois et ordre des résultats sont ceux de BulkSender.
+    """
+
+    def __init__(self, client, async_client_factory, chunk_sizer: AdaptiveChunkSizer, max_chunk_bytes: int,
+                 max_in_flight: int = 32, request_timeout: int = None, max_retries: int = 5,
+                 retry_backoff: float = 1.0):
+        super().__init__(client, chunk_sizer, max_chunk_bytes, 1, request_timeout, max_retries, retry_backoff)
+        self.async_client_factory = async_client_factory
+        self.request_timeout = request_timeout
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_concurrent = 0
+        self._async_client = self._semaphore = None
+        self._in_flight = 0
+
+    def send(self, actions):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="bulk-async", daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+            yield from self._send_windowed(actions, lambda bulk_actions, bulk_data: asyncio.run_coroutine_threadsafe(
+                self._send_chunk_async(bulk_actions, bulk_data), loop), self.max_in_flight * 2)
+        finally:
+            if self._async_client is not None:
+                asyncio.run_coroutine_threadsafe(self._async_client.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    async def _open(self):
+        # Client et sémaphore sont créés dans la boucle qui les utilise
+        client = self.async_client_factory()
+        self._async_client = client.options(request_timeout=self.request_timeout) if self.request_timeout else client
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+    async def _send_chunk_async(self, bulk_actions: list, bulk_data: list) -> (list, float, bool, int):
+        """Équivalent asynchrone de _send_chunk ; le sémaphore n'est pas tenu pendant l'attente avant un renvoi."""
+        retry = _ChunkRetry(bulk_actions, bulk_data, self.max_retries)
+        while retry.positions:
+            if retry.attempt:
+                await asyncio.sleep(self._retry_delay(retry.attempt))
+            async with self._semaphore:
+                self._in_flight += 1
+                self.max_concurrent = max(self.max_concurrent, self._in_flight)
+                start = time.perf_counter()
+                try:
+                    response = await self._async_client.bulk(operations=retry.lines())
+                except ApiError as e:
+                    retry.record(start, self._error_results(retry.data(), e))
+                else:
+                    retry.record(start, self._response_results(retry.data(), response.body["items"]))
+                finally:
+                    self._in_flight -= 1
+        return retry.outcome()
+
+    def print_stats(self):
+        super().print_stats()
+        if self.request_count:
+            print(f"Requêtes simultanées (asyncio) : {self.max_concurrent} au plus (limite {self.max_in_flight})")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class CheckpointError(Exception):
+    """Fichier de checkpoint illisible ou ne correspondant pas à la timeline / tranche demandée."""
+
+
+class CheckpointTracker:
+    """
+    Suit l'offset (en octets) de la timeline jusqu'auquel tous les documents ont été acquittés
+    par Elasticsearch, et l'écrit périodiquement dans un fichier JSON (écriture atomique).
+
+    - Le producteur d'actions appelle mark(action_count, offset) après avoir produit toutes les actions
+      des lignes situées avant 'offset' (fin d'un lot de lignes ou d'une plage d'octets).
+    - bulk_upload appelle acknowledge(ok, result) pour chaque résultat, dans l'ordre des actions.
+
+    Un document rejeté définitivement (erreur 4xx hors 429 : mapping, parsing...) compte comme acquitté :
+    le renvoyer n'y changerait rien. Une erreur transitoire (réseau, 429, 5xx) bloque en revanche
+    l'avancée du checkpoint pour le reste de l'exécution, afin que --resume renvoie ces documents.
+    """
+
+    def __init__(self, path: str, timeline_path: str, read_range: (int, int), shard=None, interval: float = 30,
+                 settings: dict = None):
+        self.path = path
+        self.timeline_path = os.path.abspath(timeline_path)
+        self.timeline_size = os.path.getsize(timeline_path)
+        self.range_start, self.range_end = read_range
+        self.shard = f"{shard[0]}/{shard[1]}" if shard else None
+        self.interval = interval
+        # Réglages qui doivent être identiques à la reprise (opération bulk, _id stables)
+        self.settings = settings or {}
+
+        self.offset = self.range_start
+        self.acknowledged = 0  # Documents acquittés avant 'offset', exécutions précédentes comprises
+        self.blocked = False
+
+        self._acknowledged_before = 0  # Valeur de 'acknowledged' au début de cette exécution
+        self._produced = 0  # Actions produites / acquittées pendant cette exécution
+        self._acked = 0
+        self._marks = deque()  # (nombre cumulé d'actions produites, offset atteint)
+        self._lock = threading.Lock()
+        self._last_write = time.monotonic()
+
+    # --- Reprise ---
+    def load_resume_offset(self) -> int:
+        """
+        Lit le checkpoint existant et retourne l'offset de reprise.
+        Lève CheckpointError si le fichier ne correspond pas à cette timeline, à cette tranche ou à ces réglages.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            raise CheckpointError(f"Aucun checkpoint trouvé ('{self.path}')")
+        except (OSError, ValueError) as e:
+            raise CheckpointError(f"Checkpoint illisible '{self.path}' : {e}")
+
+        expected = {"timeline": self.timeline_path, "timeline_size": self.timeline_size, "shard": self.shard,
+                    "range_start": self.range_start, "range_end": self.range_end}
+        for key, value in expected.items():
+            if state.get(key) != value:
+                raise CheckpointError(f"Le checkpoint '{self.path}' ne correspond pas à cette exécution "
+                                      f"({key} : {state.get(key)!r} au lieu de {value!r})")
+
+        # Réglages de l'exécution interrompue (absents des checkpoints plus anciens, qui ne sont pas vérifiés)
+        saved_settings = state.get("settings", {})
+        for key, value in self.settings.items():
+            if saved_settings.get(key, value) != value:
+                raise CheckpointError(f"Le checkpoint '{self.path}' a été écrit avec {key} = "
+                                      f"{saved_settings[key]!r} (cette exécution : {value!r}) : reprendre avec les "
+                                      f"mêmes options --op-type / --doc-ids / --dedup")
+
+        offset = state.get("offset")
+        if not isinstance(offset, int) or not self.range_start <= offset <= self.range_end:
+            raise CheckpointError(f"Offset invalide dans le checkpoint '{self.path}' : {offset!r}")
+        self.offset = offset
+        self.acknowledged = self._acknowledged_before = state.get("documents_acknowledged", 0)
+        return offset
+
+    # --- Suivi ---
+    def mark(self, action_count: int, offset: int):
+        """'action_count' actions de plus ont été produites, et avec elles toutes celles des lignes avant 'offset'."""
+        with self._lock:
+            self._produced += action_count
+            self._marks.append((self._produced, offset))
+            self._advance()
+
+    def acknowledge(self, ok: bool, result: dict):
+        """Enregistre le résultat bulk du document suivant (dans l'ordre de production)."""
+        with self._lock:
+            self._acked += 1
+            if not ok and not self.blocked and self._is_transient_failure(result):
+                self.blocked = True
+                print(f"[Attention] Échec transitoire : le checkpoint reste à l'octet {self.offset} "
+                      f"(--resume renverra les documents suivants)")
+            self._advance()
+        if time.monotonic() - self._last_write >= self.interval:
+            self.save()
+
+    @staticmethod
+    def _is_transient_failure(result: dict) -> bool:
+        try:
+            item = next(iter(result.values()))
+            status = int(item.get("status"))
+        except (AttributeError, StopIteration, TypeError, ValueError):
+            return True  # Erreur sans statut HTTP : exception de transport
+        return status == 429 or status >= 500
+
+    def _advance(self):
+        # Les marques dont toutes les actions sont acquittées font avancer l'offset
+        while self._marks and self._marks[0][0] <= self._acked and not self.blocked:
+            produced, self.offset = self._marks.popleft()
+            self.acknowledged = self._acknowledged_before + produced
+
+    # --- Écriture ---
+    def save(self):
+        """Écrit le checkpoint de manière atomique (fichier temporaire puis remplacement)."""
+        with self._lock:
+            state = {
+                "timeline": self.timeline_path,
+                "timeline_size": self.timeline_size,
+                "shard": self.shard,
+                "range_start": self.range_start,
+                "range_end": self.range_end,
+                "settings": self.settings,
+                "offset": self.offset,
+                "documents_acknowledged": self.acknowledged,
+                "complete": self.offset >= self.range_end,
+                "updated": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+            self._last_write = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[Attention] Impossible d'écrire le checkpoint '{self.path}' : {e}")
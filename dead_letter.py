@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import time
+from collections import Counter
+
+
+def failure_reason(result: dict) -> (int, str):
+    """Retourne (statut HTTP, type d'erreur) d'un résultat bulk en échec."""
+    item = next(iter(result.values()))
+    error = item.get("error")
+    if isinstance(error, dict):
+        error_type = error.get("type", "erreur inconnue")
+    elif item.get("exception") is not None:
+        error_type = type(item["exception"]).__name__
+    else:
+        error_type = "erreur inconnue"
+    return item.get("status"), error_type
+
+
+class DeadLetterWriter:
+    """
+    File des rejets (--dead-letter-file) : les documents en échec définitif, ou encore rejetés après tous
+    les renvois, sont écrits au format NDJSON bulk (ligne d'action + source), réinjectable tel quel avec
+    bulk_replay.py. Le motif de chaque rejet est écrit dans un fichier voisin '<nom>.errors.ndjson'
+    (une ligne compacte par document, dans le même ordre). Les fichiers ne sont créés qu'au premier rejet.
+    """
+
+    def __init__(self, path: str, serializer):
+        self.path = path
+        self.errors_path = (path[:-len(".ndjson")] if path.endswith(".ndjson") else path) + ".errors.ndjson"
+        self.serializer = serializer
+        self.count = 0
+        self._file = self._errors_file = None
+
+    def write(self, result: dict):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._errors_file = open(self.errors_path, "a", encoding="utf-8")
+        op_type, item = next(iter(result.items()))
+        meta = item.get("action") or {op_type: {"_index": item.get("_index")}}
+        self._file.write(self.serializer.dumps(meta) + b"\n" + self.serializer.dumps(item.get("data", {})) + b"\n")
+        status, error_type = failure_reason(result)
+        error = item.get("error")
+        reason = error.get("reason") if isinstance(error, dict) else error
+        self._errors_file.write(json.dumps({"_index": item.get("_index"), "_id": item.get("_id"), "status": status,
+                                            "type": error_type, "reason": reason}, default=str) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._errors_file.close()
+            self._file = self._errors_file = None
+
+
+class FailureReporter:
+    """
+    Remplace l'affichage de chaque document en échec : les 'sample_count' premiers rejets sont affichés
+    sur une ligne, puis seul un décompte par motif est affiché, au plus une fois toutes les 'interval' secondes.
+    """
+
+    def __init__(self, sample_count: int = 5, interval: float = 10):
+        self.sample_count = sample_count
+        self.interval = interval
+        self.reasons = Counter()  # (statut, type d'erreur) -> nombre de documents
+        self._last_report = time.monotonic()
+        self._reported = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.reasons.values())
+
+    def record(self, result: dict):
+        status, error_type = failure_reason(result)
+        self.reasons[(status, error_type)] += 1
+        if self.count <= self.sample_count:
+            item = next(iter(result.values()))
+            error = item.get("error")
+            reason = error.get("reason") if isinstance(error, dict) else error
+            print(f"[ERREUR D'ENVOI] {item.get('_index')} : {status} {error_type} - {str(reason)[:300]}")
+            if self.count == self.sample_count:
+                print(f"[ERREUR D'ENVOI] Rejets suivants résumés toutes les {self.interval:g} s")
+            self._reported = self.count
+        elif time.monotonic() - self._last_report >= self.interval:
+            self.print_summary(prefix="[ERREUR D'ENVOI] ")
+
+    def print_summary(self, prefix: str = ""):
+        if self.count == self._reported and prefix:
+            return
+        self._last_report = time.monotonic()
+        self._reported = self.count
+        details = ", ".join(f"{status} {error_type} x{count}"
+                            for (status, error_type), count in self.reasons.most_common())
+        print(f"{prefix}Documents en échec : {self.count} ({details})")
@@ -1,12 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
+import re
 import traceback
 
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import streaming_bulk, parallel_bulk
+from elasticsearch import AsyncElasticsearch, Elasticsearch
 from elasticsearch.exceptions import ApiError
+from elasticsearch.serializer import JsonSerializer, NdjsonSerializer
+from elastic_transport import AiohttpHttpNode, Urllib3HttpNode
+
+from bulk_sender import AdaptiveChunkSizer, AsyncBulkSender, BulkSender
+from dead_letter import DeadLetterWriter, FailureReporter
+from node_pool import NodeStats, data_node_callback, selector_class, timed_node_class
+from plaso_processors import json_codec
+from plaso_processors.output_schema import count_fields
+
+try:
+    import aiohttp  # Transport HTTP d'AsyncElasticsearch (--mode async)
+except ImportError:
+    aiohttp = None
 
 
 def json_default_serializer(obj):
@@ -22,14 +34,111 @@ def json_default_serializer(obj):
         raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
 
 
+class CodecJsonSerializer(JsonSerializer):
+    """Sérialiseur du client Elasticsearch s'appuyant sur la couche json_codec (orjson/msgspec/stdlib)."""
+
+    def json_dumps(self, data) -> bytes:
+        return json_codec.dumps_bytes(data, default=self.default)
+
+    def json_loads(self, data: bytes):
+        return json_codec.loads(data)
+
+
+class CodecNdjsonSerializer(CodecJsonSerializer, NdjsonSerializer):
+    """Variante NDJSON (corps des requêtes _bulk) du sérialiseur json_codec."""
+    mimetype = "application/x-ndjson"
+
+
+# Réglages des index pendant un chargement massif (--ingest-profile fast) : pas de refresh, pas de réplique,
+# translog vidé en asynchrone. Restaurés (valeur précédente ou défaut du cluster) à la fin de l'envoi.
+FAST_INGEST_SETTINGS = {"index.refresh_interval": "-1", "index.number_of_replicas": 0,
+                        "index.translog.durability": "async"}
+
+INGEST_PROFILES = ("default", "fast")
+
+# Politiques ILM de rollover des flux de données (--index-partition <catégorie>=data_stream, --rollover-size)
+ROLLOVER_POLICY_PREFIX = "forensic_rollover_"
+ROLLOVER_SIZE_PATTERN = re.compile(r"^\d+(b|kb|mb|gb|tb|pb)$")
+
+
+def rollover_policy_name(rollover_size: str) -> str:
+    return f"{ROLLOVER_POLICY_PREFIX}{rollover_size}"
+
+
+def build_rollover_policy(rollover_size: str) -> dict:
+    """Politique ILM : nouvel index de stockage dès qu'un shard primaire atteint 'rollover_size' (ex: 50gb)."""
+    return {"phases": {"hot": {"actions": {"rollover": {"max_primary_shard_size": rollover_size}}}}}
+
+
+def build_index_template(index_pattern: str, priority: int, settings: dict = None, mappings: dict = None,
+                         rollover_size: str = None) -> dict:
+    """
+    Corps du template d'index (partagé avec la sortie NDJSON hors ligne). 'settings' complète les réglages
+    d'index (profil d'ingestion, nombre de shards). 'mappings' : mapping explicite généré depuis les schémas
+    de sortie des processeurs (--mapping-mode) ; à défaut, seul estimestamp est forcé (mapping dynamique).
+    'rollover_size' : template de flux de données (@timestamp mappé), rollover ILM à cette taille de shard.
+    """
+    mappings = mappings or {
+        "properties": {
+            "estimestamp": {"type": "date", "format": "strict_date_optional_time||epoch_millis"}}}
+    template_body = {
+        "index_patterns": [index_pattern],
+        "priority": priority,  # Priorité 400 pour éviter les conflits avec les anciens templates
+        "template": {
+            "settings": {"index.mapping.total_fields.limit": 2000, **(settings or {})},
+            "mappings": mappings
+        }
+    }
+    if rollover_size:
+        template_body["data_stream"] = {}
+        template_body["template"]["settings"]["index.lifecycle.name"] = rollover_policy_name(rollover_size)
+        template_body["template"]["mappings"] = {
+            **mappings, "properties": {"@timestamp": {"type": "date", "format": "strict_date_optional_time"},
+                                       **mappings["properties"]}}
+    return template_body
+
+
+def index_template_name(name: str) -> str:
+    return f"forensic_{name}_template"
+
+
 class ElasticUploader:
     """Gère la connexion et l'envoi en masse des documents à Elasticsearch."""
 
     def __init__(self, es_hosts: list, es_user: str, es_pass: str, verify_ssl: bool, es_timeout: int, thread_count: int,
-                 mode: str):
+                 mode: str, max_chunk_mb: int = 10, adaptive_chunking: bool = False, target_latency: float = 1.0,
+                 max_retries: int = 5, retry_backoff: float = 1.0, dead_letter_file: str = None,
+                 max_in_flight: int = 32, connections_per_node: int = None, sniff: bool = False,
+                 node_selector: str = "round_robin", ingest_profile: str = "default", index_shards: int = None,
+                 force_merge: bool = False):
+        if mode == 'async' and aiohttp is None:
+            raise ImportError("Le module 'aiohttp' est requis pour --mode async (pip install elasticsearch[async])")
         self.es_timeout = es_timeout
         self.thread_count = thread_count
         self.mode = mode
+        # Découpage des requêtes _bulk : nombre de documents (--chunk-size, adaptatif) et budget en octets
+        self.max_chunk_bytes = max(1, max_chunk_mb) * 1024 * 1024
+        self.adaptive_chunking = adaptive_chunking
+        self.target_latency = target_latency
+        # Renvoi des rejets 429 / 503 et file des rejets définitifs (NDJSON bulk réinjectable)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_file = dead_letter_file
+        # Mode async : nombre maximal de requêtes _bulk en vol
+        self.max_in_flight = max_in_flight
+        # Pool de connexions : requêtes mesurées par nœud, choix du nœud (--node-selector), sniffing optionnel
+        self.node_stats = NodeStats()
+        self.node_selector = node_selector
+        self.sniff = sniff
+        # Profil d'ingestion : réglages des templates et des index pendant l'envoi, restaurés ensuite
+        self.ingest_profile = ingest_profile
+        self.index_shards = index_shards
+        self.force_merge = force_merge
+        self._template_patterns = {}  # nom du template -> (pattern, priorité, mapping explicite, taille de rollover)
+        self._rollover_policies = set()
+        self._restore_settings = {}  # index existant -> réglages à rétablir après l'envoi
+        concurrency = max_in_flight if mode == 'async' else thread_count if mode == 'parallel' else 1
+        self.connections_per_node = connections_per_node or max(10, concurrency)
         try:
             # Paramètres de résilience de la connexion
             es_options = {
@@ -37,85 +146,218 @@ class ElasticUploader:
                 "verify_certs": verify_ssl,
                 "request_timeout": es_timeout,  # Timeout général de la requête
                 "max_retries": 10,
-                "retry_on_timeout": True
+                "retry_on_timeout": True,
+                "connections_per_node": self.connections_per_node,
+                "node_selector_class": selector_class(node_selector, self.node_stats),
+                # Encodage des corps bulk avec le backend JSON sélectionné (json_codec)
+                "serializers": {
+                    "application/json": CodecJsonSerializer(),
+                    "application/x-ndjson": CodecNdjsonSerializer()
+                }
             }
             if not verify_ssl:
                 import warnings
                 from urllib3.exceptions import InsecureRequestWarning
                 warnings.filterwarnings('ignore', category=InsecureRequestWarning)
                 es_options["ca_certs"] = False
+            if sniff:
+                # Découverte des nœuds de données du cluster au démarrage, puis après chaque nœud en échec
+                es_options.update({"sniff_on_start": True, "sniff_on_node_failure": True,
+                                   "min_delay_between_sniffing": 60, "sniffed_node_callback": data_node_callback})
 
-            self.client = Elasticsearch(es_hosts, **es_options)
+            self.client = Elasticsearch(es_hosts, node_class=timed_node_class(Urllib3HttpNode, self.node_stats),
+                                        **es_options)
+            # Le client asynchrone (mode async) est créé par le BulkSender, dans sa boucle asyncio
+            self._async_client_options = (es_hosts, es_options)
             if not self.client.ping(): raise ConnectionError("La connexion à Elasticsearch a échoué.")
             print("Connexion à Elasticsearch réussie.")
+            nodes = self.client.transport.node_pool.all()
+            print(f"Nœuds utilisés : {', '.join(node.base_url for node in nodes)} ({node_selector}, "
+                  f"{self.connections_per_node} connexions par nœud" + (", sniffing" if sniff else "") + ")")
         except Exception as e:
             raise ConnectionError(f"Impossible d'initialiser le client Elasticsearch : {e}")
 
-    def _create_index_template(self, template_name: str, index_pattern: str, priority: int):
-        """Crée ou met à jour un template d'index pour forcer le mapping de @timestamp."""
-        template_body = {
-            "index_patterns": [index_pattern],
-            "priority": priority,  # Priorité 400 pour éviter les conflits avec les anciens templates
-            "template": {
-                "settings": {"index.mapping.total_fields.limit": 2000},
-                "mappings": {
-                    "properties": {
-                        "estimestamp": {"type": "date", "format": "strict_date_optional_time||epoch_millis"}}}
-            }
-        }
+    def _create_async_client(self) -> AsyncElasticsearch:
+        """Client AsyncElasticsearch aux mêmes options (pool, sniffing, statistiques par nœud)."""
+        es_hosts, es_options = self._async_client_options
+        return AsyncElasticsearch(es_hosts, node_class=timed_node_class(AiohttpHttpNode, self.node_stats), **es_options)
+
+    def _create_index_template(self, template_name: str, index_pattern: str, priority: int, mappings: dict = None,
+                               rollover_size: str = None, bulk_load: bool = True):
+        """Crée ou met à jour un template d'index (mapping explicite 'mappings', sinon seul estimestamp forcé)."""
+        settings = {"index.number_of_shards": self.index_shards} if self.index_shards else {}
+        if bulk_load and self.ingest_profile == "fast":
+            settings.update(FAST_INGEST_SETTINGS)
+        self.put_index_template(template_name, build_index_template(index_pattern, priority, settings, mappings,
+                                                                    rollover_size))
+
+    def _put_rollover_policy(self, policy_name: str):
+        """Crée (une fois par exécution) la politique ILM de rollover d'un template de flux de données."""
+        if policy_name in self._rollover_policies:
+            return
+        rollover_size = policy_name[len(ROLLOVER_POLICY_PREFIX):]
+        self.client.ilm.put_lifecycle(name=policy_name, policy=build_rollover_policy(rollover_size))
+        self._rollover_policies.add(policy_name)
+        print(f"Politique ILM '{policy_name}' créée/mise à jour (rollover à {rollover_size} par shard primaire).")
+
+    def put_index_template(self, template_name: str, template_body: dict):
+        """Installe un template d'index (corps au format build_index_template)."""
+        index_pattern, priority = ", ".join(template_body["index_patterns"]), template_body["priority"]
+        mappings = template_body["template"].get("mappings", {})
+        mapping_info = ""
+        if "dynamic" in mappings:
+            mapping_info = f", {count_fields(mappings)} champs, dynamic: {mappings['dynamic']}"
+        policy_name = template_body["template"]["settings"].get("index.lifecycle.name", "")
+        if "data_stream" in template_body:
+            mapping_info += ", flux de données"
         try:
+            if policy_name.startswith(ROLLOVER_POLICY_PREFIX):
+                self._put_rollover_policy(policy_name)
             # Utilisation de put_index_template pour la compatibilité
             self.client.indices.put_index_template(name=template_name, index_patterns=template_body["index_patterns"],
                                                    priority=template_body["priority"],
-                                                   template=template_body["template"])
+                                                   template=template_body["template"],
+                                                   data_stream=template_body.get("data_stream"))
             print(
-                f"Template d'index '{template_name}' pour le pattern '{index_pattern}' créé/mis à jour (Prio: {priority}).")
+                f"Template d'index '{template_name}' pour le pattern '{index_pattern}' créé/mis à jour "
+                f"(Prio: {priority}{mapping_info}).")
         except Exception as e:
             print(f"[Attention] Impossible de créer le template d'index '{template_name}'. Erreur: {e}")
 
-    def setup_templates(self, priority: int = 400, **kwargs):
-        """Configure les templates pour les différents types de logs. kwargs = {name: pattern}"""
+    def setup_templates(self, priority: int = 400, mappings: dict = None, data_streams: dict = None, **kwargs):
+        """
+        Configure les templates pour les différents types de logs. kwargs = {name: pattern}
+        'mappings' : {name: mapping explicite} (TimelineTransformer.index_mappings), None = mapping dynamique.
+        'data_streams' : {name: taille de rollover} des index écrits dans un flux de données.
+        """
         for name, pattern in kwargs.items():
-            self._create_index_template(f"forensic_{name}_template", pattern, priority)
+            index_mappings, rollover_size = (mappings or {}).get(name), (data_streams or {}).get(name)
+            self._template_patterns[index_template_name(name)] = (pattern, priority, index_mappings, rollover_size)
+            self._create_index_template(index_template_name(name), pattern, priority, index_mappings, rollover_size)
+
+    # --- Profil d'ingestion ---
+    def prepare_bulk_load(self):
+        """
+        --ingest-profile fast : applique FAST_INGEST_SETTINGS aux index existants des templates (reprise,
+        réingestion) après avoir relevé leurs réglages actuels ; les nouveaux index les reçoivent du template.
+        """
+        if self.ingest_profile != "fast" or not self._template_patterns:
+            return
+        indices = ",".join(pattern for pattern, *_ in self._template_patterns.values())
+        try:
+            current = self.client.indices.get_settings(index=indices, name=list(FAST_INGEST_SETTINGS),
+                                                       flat_settings=True, allow_no_indices=True,
+                                                       ignore_unavailable=True, expand_wildcards="open")
+            for index_name, body in current.body.items():
+                settings = body.get("settings", {})
+                self._restore_settings[index_name] = {key: settings.get(key) for key in FAST_INGEST_SETTINGS}
+            if self._restore_settings:
+                self.client.indices.put_settings(index=",".join(self._restore_settings),
+                                                 settings=FAST_INGEST_SETTINGS)
+            print(f"Profil d'ingestion 'fast' : refresh désactivé, 0 réplique, translog asynchrone "
+                  f"({len(self._restore_settings)} index existants, nouveaux index via les templates).")
+        except Exception as e:
+            print(f"[Attention] Impossible d'appliquer le profil d'ingestion 'fast' aux index existants. Erreur: {e}")
+
+    def restore_after_bulk_load(self):
+        """
+        Fin de l'envoi (réussi ou non) : templates et index reprennent leurs réglages de production
+        (valeurs relevées avant l'envoi, sinon défaut du cluster), puis refresh et force-merge optionnel.
+        """
+        if not self._template_patterns or (self.ingest_profile != "fast" and not self.force_merge):
+            return
+        indices = ",".join(pattern for pattern, *_ in self._template_patterns.values())
+        try:
+            if self.ingest_profile == "fast":
+                for template_name, (pattern, priority, mappings, rollover_size) in self._template_patterns.items():
+                    self._create_index_template(template_name, pattern, priority, mappings, rollover_size,
+                                                bulk_load=False)
+                loaded = self.client.indices.get_settings(index=indices, name=list(FAST_INGEST_SETTINGS),
+                                                          flat_settings=True, allow_no_indices=True,
+                                                          ignore_unavailable=True, expand_wildcards="open")
+                # Un appel par jeu de réglages : les index créés pendant l'envoi reviennent au défaut (None)
+                restore_groups = {}
+                for index_name in loaded.body:
+                    settings = self._restore_settings.get(index_name, dict.fromkeys(FAST_INGEST_SETTINGS))
+                    restore_groups.setdefault(tuple(settings.items()), []).append(index_name)
+                for settings, index_names in restore_groups.items():
+                    self.client.indices.put_settings(index=",".join(index_names), settings=dict(settings))
+                self.client.indices.refresh(index=indices, allow_no_indices=True, ignore_unavailable=True)
+                print(f"Réglages de production rétablis sur {len(loaded.body)} index (refresh, répliques, translog).")
+            if self.force_merge:
+                # Fusion en tâche de fond : elle se poursuit sur le cluster après la fin du script
+                response = self.client.indices.forcemerge(index=indices, max_num_segments=1, allow_no_indices=True,
+                                                          ignore_unavailable=True, wait_for_completion=False)
+                print(f"Force-merge (1 segment) lancé sur '{indices}' (tâche {response.body.get('task', '?')}).")
+        except Exception as e:
+            print(f"[Attention] Impossible de rétablir les réglages des index '{indices}'. Erreur: {e}")
+
+    @staticmethod
+    def _is_already_indexed(result: dict) -> bool:
+        item = result.get("create")
+        return isinstance(item, dict) and item.get("status") == 409
 
-    def bulk_upload(self, actions_generator, chunk_size: int):
-        """Envoie des documents en utilisant streaming_bulk ou parallel_bulk."""
+    def bulk_upload(self, actions_generator, chunk_size: int, checkpoint=None):
+        """
+        Envoie des documents par requêtes _bulk (BulkSender) : séquentielles en mode streaming,
+        'thread_count' requêtes simultanées en mode parallel.
+        Les lots sont limités à 'chunk_size' documents (valeur de départ en mode adaptatif) et à max_chunk_bytes.
+        'checkpoint' (CheckpointTracker, optionnel) reçoit chaque résultat, dans l'ordre des actions.
+        Les documents en échec sont résumés à l'écran (FailureReporter) et écrits dans la file des rejets.
+        """
+        chunk_limits = f"lots de {chunk_size} documents" + (" (adaptatif)" if self.adaptive_chunking else "") + \
+                       f" / {self.max_chunk_bytes // (1024 * 1024)} Mo"
 
-        # Choisir la fonction d'envoi
-        if self.mode == 'parallel':
-            bulk_func = parallel_bulk
-            print(f"\nEnvoi en mode PARALLÈLE ({self.thread_count} threads) par lots de {chunk_size}...")
-            # Paramètres spécifiques à parallel_bulk
-            kwargs = {"thread_count": self.thread_count}
+        # Choisir le nombre de requêtes simultanées
+        if self.mode == 'async':
+            print(f"\nEnvoi en mode ASYNCHRONE ({self.max_in_flight} requêtes en vol au plus) par {chunk_limits}...")
+        elif self.mode == 'parallel':
+            print(f"\nEnvoi en mode PARALLÈLE ({self.thread_count} threads) par {chunk_limits}...")
+            thread_count = self.thread_count
         else:  # streaming mode
-            bulk_func = streaming_bulk
-            print(f"\nEnvoi en mode STREAMING (séquentiel) par lots de {chunk_size}...")
-            kwargs = {}
+            print(f"\nEnvoi en mode STREAMING (séquentiel) par {chunk_limits}...")
+            thread_count = 1
 
-        success_count, fail_count = 0, 0
+        chunk_sizer = AdaptiveChunkSizer(chunk_size, self.target_latency, self.adaptive_chunking)
+        if self.mode == 'async':
+            sender = AsyncBulkSender(self.client, self._create_async_client, chunk_sizer, self.max_chunk_bytes,
+                                     self.max_in_flight, request_timeout=self.es_timeout,
+                                     max_retries=self.max_retries, retry_backoff=self.retry_backoff)
+        else:
+            sender = BulkSender(self.client, chunk_sizer, self.max_chunk_bytes, thread_count,
+                                # Transmission du timeout au niveau de l'opération bulk (sécurité)
+                                request_timeout=self.es_timeout,
+                                max_retries=self.max_retries, retry_backoff=self.retry_backoff)
+        failures = FailureReporter()
+        dead_letters = DeadLetterWriter(self.dead_letter_file, sender.serializer) if self.dead_letter_file else None
+        success_count, existing_count = 0, 0
         try:
-            # Le request_timeout de 60s/500s est hérité du client self.client
-            for ok, result in bulk_func(
-                    client=self.client,
-                    actions=actions_generator,
-                    chunk_size=chunk_size,
-                    # Transmission du timeout au niveau de l'opération bulk (sécurité)
-                    request_timeout=self.es_timeout,
-                    raise_on_error=False,
-                    raise_on_exception=False,
-                    **kwargs
-            ):
+            for ok, result in sender.send(actions_generator):
+                if checkpoint is not None:
+                    checkpoint.acknowledge(ok, result)
                 if ok:
                     success_count += 1
+                elif self._is_already_indexed(result):
+                    # 'create' sur un _id existant : document déjà ingéré (réingestion), ce n'est pas une erreur
+                    existing_count += 1
                 else:
-                    fail_count += 1
-                    # Utiliser le sérialiseur par défaut pour gérer les ApiError
-                    print(
-                        f"\n[ERREUR D'ENVOI] Document échoué : {json.dumps(result, indent=2, default=json_default_serializer)}")
+                    failures.record(result)
+                    if dead_letters is not None:
+                        dead_letters.write(result)
 
             print("\nEnvoi terminé.")
             print(f"Documents envoyés avec succès : {success_count}")
-            if fail_count > 0:
-                print(f"Documents en échec : {fail_count}")
+            if existing_count > 0:
+                print(f"Documents déjà indexés (ignorés) : {existing_count}")
+            if failures.count > 0:
+                failures.print_summary()
+            if dead_letters is not None and dead_letters.count > 0:
+                print(f"Documents écrits dans la file des rejets : {dead_letters.count} ('{dead_letters.path}', "
+                      f"motifs dans '{dead_letters.errors_path}')")
+            sender.print_stats()
+            self.node_stats.print_stats()
         except Exception as e:
-            print(f"Une erreur critique est survenue durant l'envoi en streaming : {traceback.format_exc()}")
\ No newline at end of file
+            print(f"Une erreur critique est survenue durant l'envoi en streaming : {traceback.format_exc()}")
+        finally:
+            if dead_letters is not None:
+                dead_letters.close()
\ No newline at end of file
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+
+
+class BloomFilter:
+    """
+    Filtre de Bloom à taille fixe, pour repérer les événements déjà vus sans conserver leurs clés.
+    La mémoire est fixée à la construction d'après 'capacity' (nombre d'événements distincts attendus)
+    et 'error_rate' (probabilité de prendre à tort un nouvel événement pour un doublon).
+    Les clés sont des empreintes de 16 octets (blake2b) : les k positions en sont dérivées
+    par double hachage, sans recalcul de hash.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-7):
+        if capacity < 1:
+            raise ValueError(f"Capacité du filtre invalide : {capacity}")
+        if not 0 < error_rate < 1:
+            raise ValueError(f"Taux d'erreur du filtre invalide : {error_rate}")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bit_count = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0  # Clés ajoutées (les doublons détectés ne sont pas comptés)
+        self.saturated = False
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+    def check_and_add(self, digest: bytes) -> bool:
+        """Retourne True si 'digest' a (probablement) déjà été vu ; sinon l'ajoute et retourne False."""
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        bits, bit_count = self.bits, self.bit_count
+        positions = [(h1 + i * h2) % bit_count for i in range(self.hash_count)]
+        if all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions):
+            return True
+        for pos in positions:
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+        if self.count > self.capacity and not self.saturated:
+            self.saturated = True
+            print(f"[Attention] Filtre de déduplication saturé ({self.capacity} événements) : le risque de "
+                  f"supprimer à tort un événement dépasse {self.error_rate:g} (augmentez --dedup-capacity)")
+        return False
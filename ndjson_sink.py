@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import json
+import os
+import re
+import traceback
+
+from elasticsearch.helpers import expand_action
+
+from elastic_uploader import CodecJsonSerializer, build_index_template, index_template_name
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Extensions des fichiers produits selon la compression (--output-compression)
+FILE_EXTENSIONS = {"none": ".ndjson", "gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+# Templates d'index à installer avant de rejouer les fichiers (lu par bulk_replay.py)
+TEMPLATES_FILE_NAME = "_index_templates.json"
+
+
+class NdjsonBulkSink:
+    """
+    Remplace ElasticUploader (--output-dir) : écrit les actions sous forme de fichiers NDJSON prêts pour l'API _bulk,
+    au lieu de les envoyer. Un jeu de fichiers par index consolidé ('<index>-00001.ndjson', ...), chacun limité
+    à 'max_file_bytes' octets de NDJSON (avant compression), éventuellement compressé en gzip ou zstd.
+    Les lignes sont identiques à celles qu'enverraient streaming_bulk / parallel_bulk (même sérialiseur).
+    """
+
+    mode = "fichiers NDJSON"
+
+    def __init__(self, output_dir: str, max_file_mb: int = 256, compression: str = "none"):
+        if compression not in FILE_EXTENSIONS:
+            raise ValueError(f"Compression inconnue : {compression} (attendu : {', '.join(FILE_EXTENSIONS)})")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("Le module 'zstandard' est requis pour --output-compression zstd (pip install zstandard)")
+        self.output_dir = output_dir
+        self.max_file_bytes = max(1, max_file_mb) * 1024 * 1024
+        self.compression = compression
+        self.serializer = CodecJsonSerializer()
+        self._files = {}  # index -> [fichier ouvert, numéro, octets écrits]
+        self.files_written = []
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Sortie NDJSON hors ligne : '{output_dir}' ({compression}, {max(1, max_file_mb)} Mo max par fichier)")
+
+    def setup_templates(self, priority: int = 400, mappings: dict = None, data_streams: dict = None, **kwargs):
+        """Enregistre les templates d'index (même contenu que ElasticUploader) pour la réinjection."""
+        templates = {index_template_name(name): build_index_template(pattern, priority,
+                                                                     mappings=(mappings or {}).get(name),
+                                                                     rollover_size=(data_streams or {}).get(name))
+                     for name, pattern in kwargs.items()}
+        path = os.path.join(self.output_dir, TEMPLATES_FILE_NAME)
+        existing = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                existing = json.load(f)
+        existing.update(templates)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(existing, f, indent=2)
+        print(f"Templates d'index enregistrés dans '{path}'.")
+
+    def prepare_bulk_load(self):
+        """Sans objet hors ligne : les templates enregistrés portent les réglages de production."""
+
+    def restore_after_bulk_load(self):
+        """Sans objet hors ligne."""
+
+    def bulk_upload(self, actions_generator, chunk_size: int, checkpoint=None):
+        """
+        Écrit les actions dans les fichiers NDJSON. Tous les 'chunk_size' documents, les fichiers sont vidés
+        sur disque puis les documents acquittés auprès du checkpoint (comme une requête bulk réussie).
+        """
+        print(f"\nÉcriture des fichiers NDJSON bulk dans '{self.output_dir}'...")
+        written_count, unacknowledged = 0, []
+        try:
+            for action in actions_generator:
+                meta, source = expand_action(action)
+                index_name = meta[next(iter(meta))]["_index"]
+                data = self.serializer.dumps(meta) + b"\n" + self.serializer.dumps(source) + b"\n"
+                self._write(index_name, data)
+                written_count += 1
+                if checkpoint is not None:
+                    unacknowledged.append(meta)
+                    if len(unacknowledged) >= chunk_size:
+                        self._acknowledge(checkpoint, unacknowledged)
+                        unacknowledged = []
+            if checkpoint is not None:
+                self._acknowledge(checkpoint, unacknowledged)
+
+            print("\nÉcriture terminée.")
+            print(f"Documents écrits : {written_count} ({len(self.files_written)} fichiers)")
+        except Exception as e:
+            print(f"Une erreur critique est survenue durant l'écriture des fichiers NDJSON : {traceback.format_exc()}")
+        finally:
+            self.close()
+
+    def _acknowledge(self, checkpoint, metas: list):
+        for entry in self._files.values():
+            entry[0].flush()
+        for meta in metas:
+            op_type = next(iter(meta))
+            checkpoint.acknowledge(True, {op_type: {"_index": meta[op_type]["_index"], "status": 201}})
+
+    def _write(self, index_name: str, data: bytes):
+        entry = self._files.get(index_name)
+        if entry is not None and entry[2] + len(data) > self.max_file_bytes and entry[2] > 0:
+            entry[0].close()
+            entry = self._open(index_name, entry[1] + 1)
+        elif entry is None:
+            entry = self._open(index_name, self._next_file_number(index_name))
+        entry[0].write(data)
+        entry[2] += len(data)
+
+    def _open(self, index_name: str, number: int) -> list:
+        path = os.path.join(self.output_dir, f"{index_name}-{number:05d}{FILE_EXTENSIONS[self.compression]}")
+        if self.compression == "gzip":
+            handle = gzip.open(path, "wb", compresslevel=6)
+        elif self.compression == "zstd":
+            handle = zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"), closefd=True)
+        else:
+            handle = open(path, "wb")
+        self.files_written.append(path)
+        entry = self._files[index_name] = [handle, number, 0]
+        return entry
+
+    def _next_file_number(self, index_name: str) -> int:
+        """Numéro suivant le dernier fichier existant de cet index (une reprise n'écrase pas les fichiers déjà produits)."""
+        pattern = re.compile(rf"^{re.escape(index_name)}-(\d+)\.ndjson(\.gz|\.zst)?$")
+        numbers = [int(match.group(1)) for match in map(pattern.match, os.listdir(self.output_dir)) if match]
+        return max(numbers, default=0) + 1
+
+    def close(self):
+        for handle, _, _ in self._files.values():
+            handle.close()
+        self._files = {}
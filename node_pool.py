@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inspect
+import random
+import threading
+import time
+
+from elastic_transport import NodeSelector, RoundRobinSelector
+
+# Stratégies de choix du nœud pour chaque requête (--node-selector)
+NODE_SELECTORS = ("round_robin", "random", "least_latency")
+
+# Poids de la dernière mesure dans la latence moyenne mobile d'un nœud
+LATENCY_SMOOTHING = 0.2
+
+
+def data_node_callback(node_info: dict, node_config):
+    """Sniffing : ne conserve que les nœuds de données (les nœuds maîtres / coordinateurs dédiés sont écartés)."""
+    roles = node_info.get("roles", [])
+    if any(role == "data" or role.startswith("data_") for role in roles):
+        return node_config
+    return None
+
+
+class NodeStats:
+    """Compteurs par nœud (URL) : requêtes, échecs, rejets 429, octets envoyés, latence moyenne et mobile."""
+
+    def __init__(self):
+        self._nodes = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, base_url: str) -> dict:
+        entry = self._nodes.get(base_url)
+        if entry is None:
+            entry = self._nodes[base_url] = {"requests": 0, "failures": 0, "throttled": 0, "bytes": 0,
+                                             "latency": 0.0, "ewma": None, "in_flight": 0}
+        return entry
+
+    def start(self, base_url: str, body_size: int):
+        with self._lock:
+            entry = self._entry(base_url)
+            entry["in_flight"] += 1
+            entry["bytes"] += body_size
+
+    def finish(self, base_url: str, latency: float, status: int = None):
+        with self._lock:
+            entry = self._entry(base_url)
+            entry["in_flight"] -= 1
+            entry["requests"] += 1
+            entry["latency"] += latency
+            if status is None or status >= 500:
+                entry["failures"] += 1
+            elif status == 429:
+                entry["throttled"] += 1
+            if status is not None:
+                ewma = entry["ewma"]
+                entry["ewma"] = latency if ewma is None else ewma + LATENCY_SMOOTHING * (latency - ewma)
+
+    def load_score(self, base_url: str) -> tuple:
+        """
+        Charge estimée d'un nœud : latence mobile x (requêtes en vol + 1). Un nœud pas encore mesuré
+        passe avant les autres, à égalité départagé par ses requêtes en vol.
+        """
+        entry = self._nodes.get(base_url)
+        if entry is None:
+            return 0, 0
+        if entry["ewma"] is None:
+            return 0, entry["in_flight"]
+        return 1, entry["ewma"] * (entry["in_flight"] + 1)
+
+    def print_stats(self):
+        with self._lock:
+            nodes = sorted(self._nodes.items())
+        if not any(entry["requests"] for _, entry in nodes):
+            return
+        print("Répartition par nœud :")
+        for base_url, entry in nodes:
+            if not entry["requests"]:
+                continue
+            print(f"    {base_url:<35} {entry['requests']:>7} requêtes, {entry['bytes'] / (1024 * 1024):>9.1f} Mo, "
+                  f"latence moyenne {entry['latency'] / entry['requests']:.2f} s, "
+                  f"{entry['failures']} échecs, {entry['throttled']} rejets 429")
+
+
+def timed_node_class(base_class, stats: NodeStats):
+    """Sous-classe du nœud HTTP (synchrone ou asynchrone) qui mesure chaque requête dans 'stats'."""
+    if inspect.iscoroutinefunction(base_class.perform_request):
+        class TimedAsyncNode(base_class):
+            async def perform_request(self, method, target, body=None, **kwargs):
+                stats.start(self.base_url, len(body or b""))
+                start, status = time.perf_counter(), None
+                try:
+                    response = await super().perform_request(method, target, body, **kwargs)
+                    status = response.meta.status
+                    return response
+                finally:
+                    stats.finish(self.base_url, time.perf_counter() - start, status)
+
+        return TimedAsyncNode
+
+    class TimedNode(base_class):
+        def perform_request(self, method, target, body=None, **kwargs):
+            stats.start(self.base_url, len(body or b""))
+            start, status = time.perf_counter(), None
+            try:
+                response = super().perform_request(method, target, body, **kwargs)
+                status = response.meta.status
+                return response
+            finally:
+                stats.finish(self.base_url, time.perf_counter() - start, status)
+
+    return TimedNode
+
+
+class SharedRoundRobinSelector(RoundRobinSelector):
+    """Round-robin partagé entre les threads d'envoi (celui du client tourne séparément dans chaque thread)."""
+
+    def __init__(self, node_configs):
+        super().__init__(node_configs)
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def select(self, nodes):
+        with self._lock:
+            self._position = (self._position + 1) % len(nodes)
+            return nodes[self._position]
+
+
+class LeastLatencySelector(NodeSelector):
+    """
+    Choisit le nœud dont la latence mobile, multipliée par ses requêtes en vol, est la plus faible :
+    un nœud lent ou déjà chargé reçoit moins de requêtes (NodeStats.load_score).
+    """
+
+    stats = None  # NodeStats, fixé par selector_class()
+
+    def select(self, nodes):
+        # Tirage aléatoire pour départager les égalités, sans jamais comparer les nœuds eux-mêmes
+        return min(nodes, key=lambda node: (self.stats.load_score(node.base_url), random.random()))
+
+
+def selector_class(name: str, stats: NodeStats):
+    """Classe de sélection des nœuds (node_selector_class du client) pour --node-selector."""
+    if name == "least_latency":
+        return type("BoundLeastLatencySelector", (LeastLatencySelector,), {"stats": stats})
+    if name == "round_robin":
+        return SharedRoundRobinSelector
+    return name
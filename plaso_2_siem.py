@@ -3,29 +3,25 @@
 
 import argparse
 import json
-import re
+import multiprocessing
 import os
 import traceback
 import time
+from collections import deque
 from datetime import timedelta
-from elastic_uploader import ElasticUploader
-from types import GeneratorType
-
-from plaso_processors.base_processor import BaseEventProcessor
-from plaso_processors.evtx_processor import PlasoEvtxProcessor
-from plaso_processors.registry_processor import PlasoRegistryProcessor
-from plaso_processors.mft_processor import PlasoMftProcessor
-from plaso_processors.lnk_processor import PlasoLnkProcessor
-from plaso_processors.prefetch_processor import PlasoPrefetchProcessor
-from plaso_processors.srum_processor import PlasoSrumProcessor
-from plaso_processors.browser_history_processor import PlasoBrowserHistoryProcessor
-from plaso_processors.amcache_processor import PlasoAmcacheProcessor
-from plaso_processors.generic_processor import PlasoGenericProcessor
-from plaso_processors.appcompatcache_processor import PlasoAppCompatCacheProcessor
-from plaso_processors.userassist_processor import PlasoUserAssistProcessor
-from plaso_processors.runkey_processor import PlasoRunKeyProcessor
-from plaso_processors.usb_processor import PlasoUsbProcessor
-from plaso_processors.mru_processor import PlasoMruProcessor
+from action_queue import ActionQueue
+from checkpoint import CheckpointTracker
+from elastic_uploader import INGEST_PROFILES, ROLLOVER_SIZE_PATTERN, ElasticUploader, index_template_name
+from ndjson_sink import NdjsonBulkSink
+from node_pool import NODE_SELECTORS
+from plaso_processors import json_codec
+from plaso_processors.output_schema import MAPPING_MODES
+from schema_preflight import SchemaPreflight
+
+from timeline_reader import (STDIN_PATH, compute_byte_ranges, detect_compression, is_stream_input, iter_data_lines,
+                             iter_range_lines, iter_stream_lines, parse_shard, split_byte_range, split_zstd_frames)
+from timeline_transformer import (TimelineTransformer, init_worker, parse_index_partition, transform_lines_in_worker,
+                                  transform_range_in_worker, transform_zstd_range_in_worker)
 
 
 class PlasoPipeline:
@@ -34,111 +30,154 @@ class PlasoPipeline:
     parsés à Elasticsearch via des processeurs dédiés.
     """
 
+    # Entrée en flux (stdin, FIFO) : délai sans nouvelle donnée au-delà duquel les lots en cours sont transmis
+    STREAM_IDLE_FLUSH_SECONDS = 1.0
+
     def __init__(self, case_name, machine_name, timeline_path, es_hosts, es_user, es_pass, chunk_size, verify_ssl,
-                 es_timeout, thread_count, mode):
+                 es_timeout, thread_count, mode, workers=1, worker_range_mb=8, shard=None,
+                 json_backend="auto", evtx_raw_retention="full", checkpoint_file=None, resume=False,
+                 checkpoint_interval=30, doc_ids=False, op_type="index", dedup_capacity=0, output_dir=None,
+                 output_max_mb=256, output_compression="none", max_chunk_mb=10, adaptive_chunking=False,
+                 target_latency=1.0, max_retries=5, retry_backoff=1.0, dead_letter_file=None,
+                 max_in_flight=32, queue_max_docs=20000, queue_max_mb=256, connections_per_node=None, sniff=False,
+                 node_selector="round_robin", ingest_profile="default", index_shards=None, force_merge=False,
+                 mapping_mode="dynamic", preflight=False, preflight_output=None, mapping_file=None,
+                 index_partitions=None, rollover_size="50gb"):
         self.case_name = self._sanitize_for_index(case_name)
         self.machine_name = machine_name.lower().replace(" ", "_")
         self.timeline_path = timeline_path
         self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        self.worker_range_bytes = max(1, worker_range_mb) * 1024 * 1024
+        # (i, N) : ne traiter que la i-ème des N tranches du fichier (ingestion répartie sur plusieurs hôtes)
+        self.shard = shard
 
         self.index_prefix = f"plaso_{self.case_name}_{self.machine_name}"
-
-        self.uploader = ElasticUploader(es_hosts, es_user, es_pass, verify_ssl, es_timeout, thread_count, mode)
-
-        # MAPPING VERS LES NOUVEAUX INDEX PLUS LARGES
-        # IMPORTANT : L'ordre est crucial. Les regex les plus spécifiques doivent être testées AVANT les regex génériques.
-        self.parser_regex_map = {
-            # --- PROCESS (Artefacts d'exécution - Prioritaires car souvent 'winreg') ---
-            "amcache": re.compile(r'winreg/amcache'),  # Spécifique (winreg)
-            "userassist": re.compile(r'userassist'),  # Spécifique (winreg)
-            "appcompatcache": re.compile(r'appcompatcache'),
-            "srum": re.compile(r'esedb/srum'),
-            "prefetch": re.compile(r'prefetch'),
-
-            # --- HIVE SPÉCIFIQUES (Registre Windows) ---
-            "runkey": re.compile(r'winreg/windows_run'),  # Spécifique
-            "usb": re.compile(r'winreg/windows_usb_devices'),  # Spécifique
-            "mru": re.compile(r'winreg/(bagmru|mrulistex)'),  # Spécifique
-
-            # --- HIVE GÉNÉRIQUE (Registre Windows - Doit être après les spécifiques) ---
-            "hive": re.compile(r'winreg'),  # Générique (attrape tout le reste de winreg)
-
-            # --- EVTX ---
-            "evtx": re.compile(r'winevtx'),
-
-            # --- BROWSER ---
-            "browser_history": re.compile(r'(sqlite/((chrome|firefox|edge).*history))'),
-
-            # --- FILES ---
-            "lnk": re.compile(r'lnk'),
-            "mft": re.compile(r'(filestat)|(usnjrnl)|(mft)'),
-
-            # --- OTHER / FALLBACK ---
-            "other": re.compile(r'.*')  # Prend tout le reste
-        }
-
-        # Dictionnaire pour mapper le type d'artefact (clé du processeur) au nom de l'INDEX CONSOLIDÉ
-        self.index_category_map = {
-            "evtx": "evtx",
-            "runkey": "hive",
-            "usb": "hive",
-            "mru": "hive",
-            "hive": "hive",
-            "srum": "process",
-            "amcache": "process",
-            "appcompatcache": "process",
-            "prefetch": "process",
-            "userassist": "process",
-            "browser_history": "browser_artefacts",
-            "lnk": "files",
-            "mft": "files",
-            "other": "others"
-        }
-
-        self.processors = {
-            "srum": PlasoSrumProcessor(),
-            "amcache": PlasoAmcacheProcessor(),
-            "appcompatcache": PlasoAppCompatCacheProcessor(),
-            "runkey": PlasoRunKeyProcessor(),
-            "usb": PlasoUsbProcessor(),
-            "mru": PlasoMruProcessor(),
-            "userassist": PlasoUserAssistProcessor(),
-            "browser_history": PlasoBrowserHistoryProcessor(),
-            "evtx": PlasoEvtxProcessor(),
-            "hive": PlasoRegistryProcessor(),
-            "mft": PlasoMftProcessor(),
-            "lnk": PlasoLnkProcessor(),
-            "prefetch": PlasoPrefetchProcessor(),
-            "other": PlasoGenericProcessor()
-        }
+        self.json_backend = json_codec.set_backend(json_backend)
+
+        # Timeline compressée (.gz / .zst), entrée standard ('-') ou FIFO : lue en flux, sans offsets exploitables
+        # pour --shard ou les checkpoints. La compression d'un flux est détectée à la lecture.
+        self.stream_input = is_stream_input(timeline_path)
+        self.compression = None if self.stream_input else detect_compression(timeline_path)
+        if (self.stream_input or self.compression) and (shard or checkpoint_file):
+            raise ValueError(f"--shard et --checkpoint-file nécessitent un fichier timeline non compressé "
+                             f"('{timeline_path}')")
+
+        # --checkpoint-file avec --dedup : le filtre de Bloom repart vide à la reprise, les événements vus avant
+        # l'interruption sont oubliés. Il n'est pas sauvegardé avec le checkpoint (il contient aussi des événements
+        # transformés mais pas encore acquittés, qui seraient alors perdus) : les doublons des événements déjà
+        # envoyés sont écartés par Elasticsearch. Dès la première exécution, les documents reçoivent donc des _id
+        # stables et sont envoyés en 'create', pour que ceux d'une reprise entrent en collision avec eux.
+        if checkpoint_file and dedup_capacity and op_type != "create":
+            print("[*] --checkpoint-file avec --dedup : opération bulk 'create' (_id stables) pour écarter à la "
+                  "reprise les doublons d'événements déjà envoyés.")
+            op_type = "create"
+
+        # Checkpoint : offset jusqu'auquel tous les documents sont acquittés (vérifié avant toute connexion).
+        # Une reprise doit produire les mêmes _id et la même opération bulk que l'exécution interrompue.
+        self.checkpoint = None
+        self.resume = resume
+        if checkpoint_file:
+            self.checkpoint = CheckpointTracker(checkpoint_file, timeline_path, self._get_read_range(), shard,
+                                                checkpoint_interval,
+                                                {"op_type": op_type, "doc_ids": doc_ids or op_type == "create"})
+            if resume:
+                self.checkpoint.load_resume_offset()
+
+        # Flux de données (--index-partition <catégorie>=data_stream) : rollover ILM à cette taille de shard primaire
+        if not ROLLOVER_SIZE_PATTERN.match(rollover_size):
+            raise ValueError(f"Taille de rollover invalide : {rollover_size} (attendu : nombre suivi de b, kb, mb, "
+                             f"gb, tb ou pb, ex: 50gb)")
+        self.rollover_size = rollover_size
+
+        # --output-dir : les actions sont écrites en fichiers NDJSON bulk au lieu d'être envoyées
+        self.output_dir = output_dir
+        # --preflight : les actions sont analysées (types des champs, conflits de mapping) au lieu d'être envoyées
+        self.preflight = preflight
+        if preflight and (output_dir or checkpoint_file):
+            raise ValueError("--preflight n'envoie ni n'écrit aucun document : incompatible avec --output-dir et "
+                             "--checkpoint-file")
+        if preflight:
+            self.uploader = SchemaPreflight(preflight_output or f"{self.index_prefix}_preflight_templates.json")
+        elif output_dir:
+            self.uploader = NdjsonBulkSink(output_dir, output_max_mb, output_compression)
+        else:
+            # Documents rejetés définitivement : '<préfixe d'index>_dead_letter.ndjson' par défaut (créé au premier rejet)
+            self.uploader = ElasticUploader(es_hosts, es_user, es_pass, verify_ssl, es_timeout, thread_count, mode,
+                                            max_chunk_mb, adaptive_chunking, target_latency, max_retries,
+                                            retry_backoff, dead_letter_file or f"{self.index_prefix}_dead_letter.ndjson",
+                                            max_in_flight, connections_per_node, sniff, node_selector,
+                                            ingest_profile, index_shards, force_merge)
+
+        # File bornée entre la transformation (thread producteur) et l'envoi
+        self.queue_max_docs = queue_max_docs
+        self.queue_max_bytes = max(1, queue_max_mb) * 1024 * 1024
+
+        # Options du transformateur, transmises telles quelles aux processus de travail
+        self.transformer_options = {"evtx_raw_retention": evtx_raw_retention, "doc_ids": doc_ids, "op_type": op_type,
+                                    "dedup_capacity": dedup_capacity, "index_partitions": index_partitions}
+        self.transformer = TimelineTransformer(self.index_prefix, **self.transformer_options)
         print("[*] Processeurs initialisés.")
 
+        # Mapping des templates : explicite, généré depuis les schémas de sortie des processeurs, ou dynamique
+        if mapping_mode not in MAPPING_MODES:
+            raise ValueError(f"Mode de mapping inconnu : {mapping_mode} (attendu : {', '.join(MAPPING_MODES)})")
+        self.mapping_mode = mapping_mode
+        self.mapping_file = mapping_file
+
     def _sanitize_for_index(self, name: str) -> str:
         return ''.join(c if c.isalnum() or c in '-_' else '_' for c in name).lower()
 
-    def identify_artefact_type(self, event: dict) -> str:
-        parser = event.get("parser", "")
-        # La boucle respecte l'ordre d'insertion du dictionnaire (Python 3.7+)
-        for key, value_regex in self.parser_regex_map.items():
-            if re.search(value_regex, parser):
-                return key
-        return "other"
-
     def run(self):
         print("\n--- CONFIGURATION ---")
         print(f"  Fichier Timeline : {self.timeline_path}")
         print(f"  Index Prefix     : {self.index_prefix}")
         print(f"  Taille des Lots  : {self.chunk_size}")
         print(f"  Mode d'envoi     : {self.uploader.mode}")
-        print(f"  Timeout (s)      : {self.uploader.es_timeout}")
+        if self.preflight:
+            print(f"  Pré-analyse      : {self.uploader.output_path}")
+        elif self.output_dir:
+            print(f"  Sortie NDJSON    : {self.output_dir}")
+        else:
+            print(f"  Timeout (s)      : {self.uploader.es_timeout}")
+            print(f"  Profil ingestion : {self.uploader.ingest_profile}"
+                  + (f" ({self.uploader.index_shards} shards)" if self.uploader.index_shards else ""))
+        print(f"  Processus        : {self.workers}")
+        print(f"  File d'attente   : {self.queue_max_docs} documents / {self.queue_max_bytes // (1024 * 1024)} Mo")
+        print(f"  Backend JSON     : {self.json_backend}")
+        if self.mapping_file:
+            print(f"  Mapping          : fichier {self.mapping_file}")
+        else:
+            print("  Mapping          : " + ("dynamique" if self.mapping_mode == "dynamic"
+                                              else f"explicite (dynamic: {self.mapping_mode})"))
+        print(f"  Brut EVTX        : {self.transformer_options['evtx_raw_retention']}")
+        partitions = {category: partitioning for category, partitioning
+                      in self.transformer.index_partitioning.items() if partitioning != "none"}
+        if partitions:
+            print("  Découpage index  : " + ", ".join(
+                f"{category}={partitioning}" + (f" (rollover {self.rollover_size})"
+                                                if partitioning == "data_stream" else "")
+                for category, partitioning in partitions.items()))
+        print(f"  Opération bulk   : {self.transformer.op_type}"
+              + (" (_id stables)" if self.transformer.doc_ids else ""))
+        if self.transformer.dedup_filter is not None:
+            print(f"  Déduplication    : {self.transformer.dedup_filter.capacity} événements "
+                  f"({self.transformer.dedup_filter.size_bytes // (1024 * 1024)} Mo par processus)")
+        if self.shard:
+            print(f"  Shard            : {self.shard[0]}/{self.shard[1]}")
+        if self.checkpoint:
+            print(f"  Checkpoint       : {self.checkpoint.path}" + (" (reprise)" if self.resume else ""))
         print("---------------------\n")
 
-        # Générer et envoyer les actions
-        actions_generator = self._process_timeline_file()
+        # Générer et envoyer les actions : la transformation alimente l'envoi via une file bornée
+        action_queue = ActionQueue(self.queue_max_docs, self.queue_max_bytes)
+        actions_generator = action_queue.stream(self._process_timeline_file())
 
         # Mettre en place les templates ES pour les nouvelles catégories (Priorité 400)
         self.uploader.setup_templates(
             priority=400,
+            mappings=self._template_mappings(),
+            data_streams=dict.fromkeys(self.transformer.data_stream_categories(), self.rollover_size),
             evtx=f"{self.index_prefix}_evtx*",
             hive=f"{self.index_prefix}_hive*",
             process=f"{self.index_prefix}_process*",
@@ -147,84 +186,58 @@ class PlasoPipeline:
             others=f"{self.index_prefix}_others*"
         )
 
-        self.uploader.bulk_upload(actions_generator, self.chunk_size)
+        # --ingest-profile fast : réglages de chargement massif, rétablis même si l'envoi échoue
+        self.uploader.prepare_bulk_load()
+        try:
+            self.uploader.bulk_upload(actions_generator, self.chunk_size, checkpoint=self.checkpoint)
+        finally:
+            self.uploader.restore_after_bulk_load()
+            if self.checkpoint:
+                self.checkpoint.save()
+                print(f"[*] Checkpoint : octet {self.checkpoint.offset} / {self.checkpoint.range_end} acquitté "
+                      f"({self.checkpoint.path})")
+
+    def _template_mappings(self) -> dict:
+        """
+        Mappings des templates par index consolidé : ceux d'un fichier de templates (--mapping-file, par exemple
+        écrit par --preflight), sinon ceux générés depuis les schémas de sortie des processeurs (--mapping-mode).
+        """
+        if not self.mapping_file:
+            return self.transformer.index_mappings(self.mapping_mode)
+        with open(self.mapping_file, "r", encoding="utf-8") as f:
+            templates = json.load(f)
+        categories = set(self.transformer.index_category_map.values())
+        return {category: templates[index_template_name(category)]["template"]["mappings"]
+                for category in categories if index_template_name(category) in templates}
+
+    def _get_read_range(self) -> (int, int):
+        """Retourne la plage d'octets [début, fin) à traiter : tout le fichier ou la tranche demandée par --shard."""
+        if self.shard:
+            shard_index, shard_count = self.shard
+            return compute_byte_ranges(self.timeline_path, shard_count)[shard_index - 1]
+        return 0, os.path.getsize(self.timeline_path)
 
     def _process_timeline_file(self):
-        print(f"[*] Début de la lecture du fichier timeline : {self.timeline_path}")
+        source = "entrée standard" if self.timeline_path == STDIN_PATH else self.timeline_path
+        print(f"[*] Début de la lecture du fichier timeline : {source}")
         it = 0
         try:
-            with open(self.timeline_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    it += 1
-
-                    if it % (self.chunk_size * 10) == 0:  # Log de progression
-                        print(f"    ... Ligne {it} atteinte")
-                    stripped_line = line.strip()
-                    if not stripped_line:
-                        continue
-                    try:
-                        event = json.loads(stripped_line)
-                        event["event_raw_string"] = stripped_line
-
-                        artefact_type_key = self.identify_artefact_type(event)
-                        processor = self.processors.get(artefact_type_key, self.processors["other"])
-
-                        processor_result = processor.process_event(event)
-
-                        if isinstance(processor_result, GeneratorType):
-                            events_to_yield = processor_result
-                        elif isinstance(processor_result, tuple) and len(processor_result) == 2:
-                            events_to_yield = [processor_result]
-                        else:
-                            print(
-                                f"[Attention] Le processeur '{artefact_type_key}' a retourné un résultat inattendu: {type(processor_result)}. Traitement générique de l'erreur.")
-                            processed_doc = {"message": f"Processor '{artefact_type_key}' returned malformed result.",
-                                             "raw_event": event.get("event_raw_string")}
-                            specific_index_key = "other"
-                            events_to_yield = [(processed_doc, specific_index_key)]
-
-                        for item in events_to_yield:
-                            try:
-                                processed_doc, specific_index_key = item
-                            except ValueError as ve:
-                                print(f"[ERREUR D'UNPACKING] Échec à la ligne {it} ({artefact_type_key}). Erreur: {ve}")
-                                error_doc = {
-                                    "message": f"Unpacking error: {ve}. Original item: {item}",
-                                    "raw_event_line": stripped_line,
-                                    "artefact_type": "error_data"
-                                }
-                                specific_index_key = "other"
-                                processed_doc = error_doc
-                            except Exception as e:
-                                print(f"[ERREUR CRITIQUE] Échec à la ligne {it} ({artefact_type_key}). Erreur: {e}")
-                                error_doc = {
-                                    "message": f"Critical iteration error: {e}",
-                                    "raw_event_line": stripped_line,
-                                    "artefact_type": "critical_error"
-                                }
-                                specific_index_key = "other"
-                                processed_doc = error_doc
-
-                            # CONSERVATION DE LA CLÉ SPÉCIFIQUE DANS LE DOCUMENT
-                            processed_doc["artefact_type"] = specific_index_key
-
-                            # DÉTERMINATION DE L'INDEX CONSOLIDÉ
-                            index_category_key = self.index_category_map.get(specific_index_key, "others")
-
-                            index_name = f"{self.index_prefix}_{index_category_key}"
-
-                            yield {
-                                "_index": index_name,
-                                "_source": processed_doc
-                            }
-
-                    except json.JSONDecodeError:
-                        print(f"[Attention] Ligne JSON invalide ignorée (ligne {it})")
-                        continue
-                    except Exception as e:
-                        print(f"[ERREUR] Échec du traitement de la ligne {it}. Erreur: {e}")
-                        print(f"  Ligne: {stripped_line[:200]}...")
-                        traceback.print_exc()
+            if self.stream_input or self.compression:
+                it = yield from self._process_stream()
+            else:
+                start, end = self._get_read_range()
+                if self.shard:
+                    print(f"[*] Tranche {self.shard[0]}/{self.shard[1]} : octets {start} à {end}")
+                if self.checkpoint and self.resume:
+                    start = self.checkpoint.offset
+                    print(f"[*] Reprise depuis le checkpoint : octet {start} / {end}")
+
+                if self.workers > 1:
+                    it = yield from self._process_range_parallel(start, end)
+                else:
+                    it = yield from self._process_lines(iter_range_lines(self.timeline_path, start, end), end)
+                if self.checkpoint:
+                    self.checkpoint.mark(0, end)
 
         except FileNotFoundError:
             print(f"[ERREUR FATALE] Le fichier timeline '{self.timeline_path}' n'a pas été trouvé.")
@@ -234,7 +247,193 @@ class PlasoPipeline:
             traceback.print_exc()
             exit(1)
 
-        print(f"[*] Lecture du fichier terminée. Total de {it} lignes traitées.")
+        if self.workers > 1:
+            print(f"[*] Lecture du fichier terminée. Total de {it} octets traités.")
+        else:
+            print(f"[*] Lecture du fichier terminée. Total de {it} lignes traitées.")
+        self.transformer.print_stats(self.transformer.collect_stats())
+
+    def _process_lines(self, lines, end: int):
+        """
+        Mode séquentiel : transforme les lignes [(offset de fin, ligne nettoyée), ...] par lots
+        (process_batch des processeurs). Une ligne None (entrée en flux restée muette) vide le lot en cours.
+        Retourne le nombre de lignes lues.
+        """
+        it = 0
+        batch = []
+        for line_end, stripped_line in lines:
+            if stripped_line is None:
+                if batch:
+                    yield from self._transform_batch(batch, line_end)
+                    batch = []
+                continue
+            it += 1
+
+            if it % (self.chunk_size * 10) == 0:  # Log de progression
+                print(f"    ... Ligne {it} atteinte")
+            batch.append((stripped_line, f"ligne {it}"))
+            if len(batch) >= self.transformer.PROCESS_BATCH_SIZE:
+                yield from self._transform_batch(batch, line_end)
+                batch = []
+        if batch:
+            yield from self._transform_batch(batch, end)
+        return it
+
+    def _transform_batch(self, batch: list, batch_end: int):
+        """Transforme un lot de lignes ; 'batch_end' est l'offset de fin de sa dernière ligne (checkpoint)."""
+        actions = self.transformer.transform_lines(batch)
+        yield from actions
+        if self.checkpoint:
+            self.checkpoint.mark(len(actions), batch_end)
+
+    def _process_range_parallel(self, start: int, end: int):
+        """
+        Répartit la transformation (lecture, json.loads, identification, processeurs) sur un pool de processus.
+        La plage est découpée en sous-plages alignées sur les lignes : chaque processus lit lui-même
+        la sienne via mmap, le processus principal ne fait que distribuer des offsets.
+        Les résultats sont restitués dans l'ordre du fichier : les actions produites sont identiques
+        à celles du mode séquentiel. Retourne le nombre d'octets traités.
+        """
+        ranges = split_byte_range(self.timeline_path, start, end, self.worker_range_bytes)
+        print(f"[*] Transformation multi-processus : {self.workers} processus, {len(ranges)} plages d'octets")
+        max_pending = self.workers * 2
+        pending = deque()
+        done_bytes = 0
+        init_args = (self.index_prefix, self.json_backend, self.transformer_options)
+        with multiprocessing.Pool(self.workers, initializer=init_worker, initargs=init_args) as pool:
+            for range_start, range_end in ranges:
+                pending.append((range_start, range_end,
+                                pool.apply_async(transform_range_in_worker,
+                                                 (self.timeline_path, range_start, range_end))))
+                # Fenêtre bornée : évite d'accumuler les résultats en mémoire si l'envoi est plus lent
+                while len(pending) >= max_pending:
+                    done_bytes = yield from self._drain_pending(pending, done_bytes, end - start)
+            while pending:
+                done_bytes = yield from self._drain_pending(pending, done_bytes, end - start)
+        return done_bytes
+
+    def _process_stream(self):
+        """
+        Timeline lue en flux par un thread dédié : fichier compressé (décompressé à la volée), entrée standard
+        ou FIFO (psort dans un tube, traité au fur et à mesure de sa production). Avec --workers, un fichier zstd
+        multi-trames est découpé en groupes de trames décompressés en parallèle par les processus de travail ;
+        sinon les lignes lues sont distribuées par lots.
+        """
+        if self.stream_input:
+            print("[*] Lecture en flux : les lignes sont traitées au fur et à mesure de leur arrivée")
+            # Entrée muette : les lots en cours sont transformés et transmis sans attendre d'être pleins
+            idle_timeout = self.STREAM_IDLE_FLUSH_SECONDS
+        else:
+            print(f"[*] Timeline compressée ({self.compression}) : décompression à la volée")
+            idle_timeout = None
+        lines = iter_stream_lines(self.timeline_path, self.compression, idle_timeout)
+        if self.workers == 1:
+            return (yield from self._process_lines(lines, 0))
+        if self.compression == "zstd":
+            frame_ranges = split_zstd_frames(self.timeline_path, self.worker_range_bytes)
+            if len(frame_ranges) > 1:
+                return (yield from self._process_zstd_frames_parallel(frame_ranges))
+
+        print(f"[*] Transformation multi-processus : {self.workers} processus, lots de lignes lues en flux")
+        max_pending = self.workers * 2
+        pending = deque()
+        done_bytes = 0
+        init_args = (self.index_prefix, self.json_backend, self.transformer_options)
+        with multiprocessing.Pool(self.workers, initializer=init_worker, initargs=init_args) as pool:
+            batch, batch_start, line_end = [], 0, 0
+            for line_end, stripped_line in lines:
+                if stripped_line is None:
+                    # Entrée muette : le lot en cours part tel quel et les résultats déjà prêts sont restitués
+                    if batch:
+                        pending.append((batch_start, line_end,
+                                        pool.apply_async(transform_lines_in_worker, (batch,))))
+                        batch, batch_start = [], line_end
+                    while pending and pending[0][2].ready():
+                        done_bytes = yield from self._drain_pending(pending, done_bytes, 0)
+                    continue
+                batch.append((stripped_line, f"octet {line_end}"))
+                # Lots d'environ --worker-range-mb octets (décompressés), comme les plages du mode fichier
+                if line_end - batch_start >= self.worker_range_bytes:
+                    pending.append((batch_start, line_end, pool.apply_async(transform_lines_in_worker, (batch,))))
+                    batch, batch_start = [], line_end
+                    while len(pending) >= max_pending:
+                        done_bytes = yield from self._drain_pending(pending, done_bytes, 0)
+            if batch:
+                pending.append((batch_start, line_end, pool.apply_async(transform_lines_in_worker, (batch,))))
+            while pending:
+                done_bytes = yield from self._drain_pending(pending, done_bytes, 0)
+        return done_bytes
+
+    def _process_zstd_frames_parallel(self, frame_ranges: list):
+        """
+        Chaque processus décompresse et transforme un groupe de trames zstd. Les lignes à cheval sur deux groupes
+        (les trames ne sont pas alignées sur les lignes) sont recollées et transformées par le processus principal.
+        Retourne le nombre d'octets compressés traités.
+        """
+        print(f"[*] Décompression et transformation multi-processus : {self.workers} processus, "
+              f"{len(frame_ranges)} groupes de trames zstd")
+        total_bytes = os.path.getsize(self.timeline_path)
+        max_pending = self.workers * 2
+        pending = deque()
+        progress = (b"", 0)  # (fin de ligne en attente du groupe suivant, octets compressés traités)
+        init_args = (self.index_prefix, self.json_backend, self.transformer_options)
+        with multiprocessing.Pool(self.workers, initializer=init_worker, initargs=init_args) as pool:
+            for range_start, range_end in frame_ranges:
+                pending.append((range_start, range_end,
+                                pool.apply_async(transform_zstd_range_in_worker,
+                                                 (self.timeline_path, range_start, range_end))))
+                while len(pending) >= max_pending:
+                    progress = yield from self._drain_zstd_frames(pending, progress, total_bytes)
+            while pending:
+                progress = yield from self._drain_zstd_frames(pending, progress, total_bytes)
+        carry, done_bytes = progress
+        if carry:
+            yield from self._transform_fragment(carry, "fin de fichier")
+        return done_bytes
+
+    def _drain_zstd_frames(self, pending: deque, progress: tuple, total_bytes: int):
+        """Restitue les actions du plus ancien groupe de trames, précédées de celles de la ligne recollée."""
+        carry, done_bytes = progress
+        range_start, range_end, result = pending.popleft()
+        head, tail, actions, stats, dedup_keys = result.get()
+        self.transformer.stats.update(stats)
+        if tail is None:  # Groupe sans fin de ligne : il prolonge la ligne en cours
+            carry += head
+        else:
+            yield from self._transform_fragment(carry + head, f"trames {range_start}-{range_end}")
+            if dedup_keys is not None:
+                actions = self.transformer.drop_known_events(actions, dedup_keys)
+            yield from actions
+            carry = tail
+        range_size = range_end - range_start
+        done_bytes += range_size
+        if total_bytes and done_bytes * 20 // total_bytes > (done_bytes - range_size) * 20 // total_bytes:
+            print(f"    ... {done_bytes // (1024 * 1024)} / {total_bytes // (1024 * 1024)} Mo compressés traités")
+        return carry, done_bytes
+
+    def _transform_fragment(self, data: bytes, line_ref: str):
+        """Transforme dans le processus principal une ligne recollée à partir de deux groupes de trames."""
+        lines = [(stripped_line, line_ref) for _, stripped_line in iter_data_lines(data)]
+        if lines:
+            yield from self.transformer.transform_lines(lines)
+
+    def _drain_pending(self, pending: deque, done_bytes: int, total_bytes: int):
+        """Restitue les actions de la plus ancienne plage soumise et retourne le total d'octets traités."""
+        range_start, range_end, result = pending.popleft()
+        actions, stats, dedup_keys = result.get()
+        # Les compteurs des processus de travail sont agrégés dans ceux du transformateur principal
+        self.transformer.stats.update(stats)
+        if dedup_keys is not None:
+            actions = self.transformer.drop_known_events(actions, dedup_keys)
+        yield from actions
+        if self.checkpoint:
+            self.checkpoint.mark(len(actions), range_end)
+        range_size = range_end - range_start
+        done_bytes += range_size
+        # Log de progression tous les 5 % environ
+        if total_bytes and done_bytes * 20 // total_bytes > (done_bytes - range_size) * 20 // total_bytes:
+            print(f"    ... {done_bytes // (1024 * 1024)} / {total_bytes // (1024 * 1024)} Mo traités")
+        return done_bytes
 
 
 def parse_arguments():
@@ -243,7 +442,9 @@ def parse_arguments():
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
     parser.add_argument("-t", "--timeline", required=True,
-                        help="Chemin vers le fichier timeline Plaso au format JSON Lines (jsonl).")
+                        help="Chemin vers le fichier timeline Plaso au format JSON Lines (jsonl), éventuellement "
+                             "compressé (.gz, .zst). '-' lit l'entrée standard (psort dans un tube) ; une FIFO est "
+                             "aussi acceptée.")
     parser.add_argument("-c", "--case-name", required=True, help="Nom du cas (utilisé dans le nom de l'index).")
     parser.add_argument("-m", "--machine-name", required=True,
                         help="Nom de la machine (utilisé dans le nom de l'index).")
@@ -256,10 +457,116 @@ def parse_arguments():
                         help="Active la vérification du certificat SSL (désactivée par défaut).")
     parser.add_argument("--es-timeout", type=int, default=60,
                         help="Délai d'attente pour les requêtes Elasticsearch (en secondes).")
-    parser.add_argument("--thread-count", type=int, default=4, help="Nombre de threads à utiliser pour parallel_bulk.")
-    parser.add_argument("--mode", choices=['streaming', 'parallel'], default='parallel',
-                        help="Mode d'envoi vers Elasticsearch.")
-    return parser.parse_args()
+    parser.add_argument("--thread-count", type=int, default=4,
+                        help="Nombre de requêtes _bulk simultanées en mode parallel.")
+    parser.add_argument("--mode", choices=['streaming', 'parallel', 'async'], default='parallel',
+                        help="Mode d'envoi vers Elasticsearch (async : client asyncio, voir --max-in-flight).")
+    parser.add_argument("--ingest-profile", choices=INGEST_PROFILES, default="default",
+                        help="fast : pendant l'envoi, refresh désactivé, 0 réplique et translog asynchrone sur les "
+                             "templates et les index ; réglages de production rétablis à la fin (même en cas d'échec).")
+    parser.add_argument("--index-shards", type=int, default=None,
+                        help="Nombre de shards primaires des index créés (défaut : celui du cluster).")
+    parser.add_argument("--force-merge", action="store_true", default=False,
+                        help="Lance un force-merge (1 segment) des index à la fin de l'envoi.")
+    parser.add_argument("--mapping-mode", choices=MAPPING_MODES, default="dynamic",
+                        help="Mapping des templates d'index : dynamic = mapping dynamique (défaut, celui attendu par "
+                             "les vues Kibana de kibana_view/) ; false = mapping explicite généré depuis les schémas "
+                             "des processeurs, champs non déclarés conservés dans _source sans être indexés ; "
+                             "strict = documents avec un champ non déclaré rejetés.")
+    parser.add_argument("--mapping-file", default=None,
+                        help="Fichier de templates d'index (format _index_templates.json, par exemple écrit par "
+                             "--preflight) dont les mappings remplacent ceux générés par --mapping-mode.")
+    parser.add_argument("--index-partition", type=parse_index_partition, action="append", default=[],
+                        metavar="CATEGORIE=MODE",
+                        help="Découpage d'un index consolidé (répétable, ex: --index-partition files=month) : "
+                             "year / month = un index par année / mois d'estimestamp (<index>-2023.05, "
+                             "<index>-undated sans date), data_stream = flux de données avec rollover par taille "
+                             "(--rollover-size), none = un seul index (défaut).")
+    parser.add_argument("--rollover-size", default="50gb",
+                        help="Taille de shard primaire déclenchant le rollover des flux de données (défaut : 50gb).")
+    parser.add_argument("--preflight", action="store_true", default=False,
+                        help="Pré-analyse sans envoi : fait passer la timeline par les processeurs, relève le type "
+                             "des champs par index, signale les champs qui seraient rejetés par le mapping et écrit "
+                             "des templates au mapping inféré (--preflight-output).")
+    parser.add_argument("--preflight-output", default=None,
+                        help="Fichier des templates inférés par --preflight, réutilisable avec --mapping-file "
+                             "(défaut : <préfixe d'index>_preflight_templates.json).")
+    parser.add_argument("--connections-per-node", type=int, default=None,
+                        help="Taille du pool de connexions HTTP de chaque nœud (défaut : nombre de requêtes "
+                             "simultanées, au moins 10).")
+    parser.add_argument("--sniff", action="store_true", default=False,
+                        help="Découvre les nœuds de données du cluster à partir de --es-hosts et répartit l'envoi "
+                             "sur tous ces nœuds (nouvelle découverte après un nœud en échec).")
+    parser.add_argument("--node-selector", choices=NODE_SELECTORS, default="round_robin",
+                        help="Choix du nœud de chaque requête : round_robin, random ou least_latency (latence "
+                             "récente x requêtes en vol la plus faible).")
+    parser.add_argument("--queue-max-docs", type=int, default=20000,
+                        help="Nombre maximal de documents transformés en attente d'envoi (file entre la "
+                             "transformation et l'envoi).")
+    parser.add_argument("--queue-max-mb", type=int, default=256,
+                        help="Volume maximal (Mo, estimé) de documents transformés en attente d'envoi.")
+    parser.add_argument("--max-in-flight", type=int, default=32,
+                        help="Nombre maximal de requêtes _bulk simultanées en mode async.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus pour la transformation des événements (1 = séquentiel).")
+    parser.add_argument("--worker-range-mb", type=int, default=8,
+                        help="Taille (Mo) des plages d'octets lues par chaque processus de travail (avec --workers > 1).")
+    parser.add_argument("--json-backend", choices=["auto", "orjson", "msgspec", "stdlib"], default="auto",
+                        help="Bibliothèque JSON pour le décodage des lignes et l'encodage des requêtes bulk "
+                             "(auto = la plus rapide installée).")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="Ne traiter que la tranche i/N du fichier (ex: 2/4), pour répartir l'ingestion sur plusieurs hôtes.")
+    parser.add_argument("--evtx-raw-retention", choices=["none", "event_data", "full"], default="full",
+                        help="Données brutes EVTX conservées : full = ligne d'origine (event_raw_string) et XML "
+                             "complet (Data_json_string), event_data = EventData seul (winlog.event_data_str), "
+                             "none = aucune.")
+    parser.add_argument("--doc-ids", action="store_true", default=False,
+                        help="Attribue à chaque document un _id stable (hash Plaso de l'événement, timestamp, rang) : "
+                             "une réingestion écrase les documents au lieu de les dupliquer.")
+    parser.add_argument("--op-type", choices=["index", "create"], default="index",
+                        help="Opération bulk : index (écrase) ou create (les documents déjà indexés sont ignorés "
+                             "par Elasticsearch). create active --doc-ids.")
+    parser.add_argument("--dedup", action="store_true", default=False,
+                        help="Supprime avant traitement les événements identiques déjà rencontrés (snapshots VSS, "
+                             "copies d'EVTX) à l'aide d'un filtre de Bloom de taille fixe. Le filtre n'est pas "
+                             "conservé par --resume : avec --checkpoint-file, implique --op-type create.")
+    parser.add_argument("--dedup-capacity", type=int, default=20_000_000,
+                        help="Nombre d'événements distincts attendus : fixe la mémoire du filtre de --dedup "
+                             "(environ 4 octets par événement, dans chaque processus).")
+    parser.add_argument("--max-chunk-mb", type=int, default=10,
+                        help="Taille maximale (Mo) du corps d'une requête _bulk : un lot est coupé dès que "
+                             "--chunk-size documents ou ce volume sont atteints.")
+    parser.add_argument("--adaptive-chunking", action="store_true", default=False,
+                        help="Ajuste le nombre de documents par lot (à partir de --chunk-size) selon la latence "
+                             "des requêtes et les rejets 429 du cluster.")
+    parser.add_argument("--target-latency", type=float, default=1.0,
+                        help="Latence visée (secondes) par requête _bulk avec --adaptive-chunking.")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Nombre de renvois d'un document rejeté en 429 / 503 (cluster saturé) avant de le "
+                             "considérer en échec.")
+    parser.add_argument("--retry-backoff", type=float, default=1.0,
+                        help="Attente (secondes) avant le premier renvoi, doublée à chaque renvoi (60 s au plus).")
+    parser.add_argument("--dead-letter-file", default=None,
+                        help="Fichier NDJSON bulk recevant les documents en échec, réinjectable avec bulk_replay.py "
+                             "(défaut : <préfixe d'index>_dead_letter.ndjson, créé au premier rejet).")
+    parser.add_argument("--output-dir", default=None,
+                        help="Écrit les actions dans des fichiers NDJSON prêts pour l'API _bulk (un jeu de fichiers "
+                             "par index) au lieu de les envoyer à Elasticsearch. À rejouer avec bulk_replay.py.")
+    parser.add_argument("--output-max-mb", type=int, default=256,
+                        help="Taille maximale (Mo de NDJSON, avant compression) de chaque fichier de --output-dir.")
+    parser.add_argument("--output-compression", choices=["none", "gzip", "zstd"], default="none",
+                        help="Compression des fichiers de --output-dir.")
+    parser.add_argument("--checkpoint-file", default=None,
+                        help="Fichier de checkpoint : y enregistre périodiquement l'offset de la timeline jusqu'auquel "
+                             "tous les documents sont acquittés par Elasticsearch.")
+    parser.add_argument("--checkpoint-interval", type=int, default=30,
+                        help="Intervalle (en secondes) entre deux écritures du checkpoint.")
+    parser.add_argument("--resume", action="store_true", default=False,
+                        help="Reprend l'ingestion à l'offset enregistré dans --checkpoint-file.")
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint_file:
+        parser.error("--resume nécessite --checkpoint-file")
+    return args
 
 
 if __name__ == "__main__":
@@ -281,7 +588,42 @@ if __name__ == "__main__":
             verify_ssl=args.verify_ssl,
             es_timeout=args.es_timeout,
             thread_count=args.thread_count,
-            mode=args.mode
+            mode=args.mode,
+            workers=args.workers,
+            worker_range_mb=args.worker_range_mb,
+            shard=args.shard,
+            json_backend=args.json_backend,
+            evtx_raw_retention=args.evtx_raw_retention,
+            checkpoint_file=args.checkpoint_file,
+            resume=args.resume,
+            checkpoint_interval=args.checkpoint_interval,
+            doc_ids=args.doc_ids,
+            op_type=args.op_type,
+            dedup_capacity=args.dedup_capacity if args.dedup else 0,
+            output_dir=args.output_dir,
+            output_max_mb=args.output_max_mb,
+            output_compression=args.output_compression,
+            max_chunk_mb=args.max_chunk_mb,
+            adaptive_chunking=args.adaptive_chunking,
+            target_latency=args.target_latency,
+            max_retries=args.max_retries,
+            retry_backoff=args.retry_backoff,
+            dead_letter_file=args.dead_letter_file,
+            max_in_flight=args.max_in_flight,
+            queue_max_docs=args.queue_max_docs,
+            queue_max_mb=args.queue_max_mb,
+            connections_per_node=args.connections_per_node,
+            sniff=args.sniff,
+            node_selector=args.node_selector,
+            ingest_profile=args.ingest_profile,
+            index_shards=args.index_shards,
+            force_merge=args.force_merge,
+            mapping_mode=args.mapping_mode,
+            preflight=args.preflight,
+            preflight_output=args.preflight_output,
+            mapping_file=args.mapping_file,
+            index_partitions=dict(args.index_partition),
+            rollover_size=args.rollover_size
         )
         pipeline.run()
     except (ConnectionError) as e:
@@ -9,6 +9,23 @@ class PlasoAmcacheProcessor(BaseEventProcessor):
     Processeur Plaso pour les événements Amcache (winreg/amcache).
     """
 
+    # Champs Plaso transmis tels quels (schéma de sortie : voir output_schema.py)
+    OUTPUT_SCHEMA = {
+        "full_path": "keyword",
+        "name": "keyword",
+        "sha1": "keyword",
+        "sha256_hash": "keyword",
+        "file_size": "long",
+        "file_description": "keyword",
+        "file_version": "keyword",
+        "product_name": "keyword",
+        "company_name": "keyword",
+        "publisher": "keyword",
+        "version": "keyword",
+        "program_identifier": "keyword",
+        "language_code": "keyword",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur Amcache")
 
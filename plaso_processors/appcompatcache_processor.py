@@ -7,6 +7,12 @@ from .base_processor import BaseEventProcessor
 class PlasoAppCompatCacheProcessor(BaseEventProcessor):
     """Processeur Plaso pour les événements AppCompatCache (winreg/appcompatcache)."""
 
+    OUTPUT_SCHEMA = {
+        "key_path": "keyword",
+        "path": "keyword",
+        "entry_index": "integer",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur AppCompatCache")
 
@@ -16,13 +22,12 @@ class PlasoAppCompatCacheProcessor(BaseEventProcessor):
             # 1. Gestion du Timestamp
             # Le 'date_time' (FILETIME) représente le LastWriteTime de la clé,
             # ce qui est le timestamp le plus fiable pour cet artefact.
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                event["estimestamp"] = self._format_dt_to_es(dt_filetime)
+            es_filetime = self._filetime_to_es(event.get("date_time", {}).get("timestamp"))
+            if es_filetime:
+                event["estimestamp"] = es_filetime
             else:
                 # Fallback sur le timestamp plaso (moins probable d'être utile ici)
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                event["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                event["estimestamp"] = self._unix_micro_to_es(event.get("timestamp"))
 
             # 2. Nettoyage
             # Les champs 'path' et 'cached_entry_type' seront conservés.
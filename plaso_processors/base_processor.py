@@ -1,13 +1,29 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 import re
 
+from . import timestamps
+
+
+class BatchItemError:
+    """Exception levée par process_event pour un événement d'un lot ; le transformateur la signale pour la ligne."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
 
 class BaseEventProcessor:
     """Classe de base abstraite pour tous les processeurs d'événements Plaso."""
 
+    # Schéma de sortie : chemin pointé d'un champ produit -> type court (output_schema.FIELD_TYPES).
+    # Sert à générer le mapping explicite de l'index consolidé ; les champs communs sont dans BASE_OUTPUT_SCHEMA.
+    OUTPUT_SCHEMA = {}
+
     # Époque pour les OLE Automation Timestamps (30/12/1899)
     _OLE_EPOCH = datetime(1899, 12, 30, tzinfo=timezone.utc)
 
@@ -15,6 +31,28 @@ class BaseEventProcessor:
         """Méthode de traitement principale pour un événement Plaso."""
         raise NotImplementedError("La méthode process_event doit être implémentée par la sous-classe.")
 
+    def process_batch(self, events: list) -> list:
+        """
+        Traite un lot d'événements du même type d'artefact. Retourne une liste alignée sur 'events'
+        contenant, pour chaque événement, le même résultat que process_event.
+        Par défaut, appelle process_event sur chaque événement ; les sous-classes peuvent vectoriser.
+        Une exception levée pour un événement est retournée à sa place dans un BatchItemError.
+        """
+        return [self._process_event_in_batch(event) for event in events]
+
+    def _process_event_in_batch(self, event: dict, *args):
+        try:
+            return self.process_event(event, *args)
+        except Exception as e:
+            return BatchItemError(e)
+
+    def pop_stats(self) -> Counter:
+        """
+        Retourne les compteurs propres au processeur accumulés depuis le dernier appel, puis les remet à zéro.
+        Aucun compteur par défaut : les sous-classes qui en tiennent surchargent cette méthode.
+        """
+        return Counter()
+
     @staticmethod
     def drop_useless_fields(event: dict):
         """
@@ -44,6 +82,40 @@ class BaseEventProcessor:
             event.pop(field, None)
         return event
 
+    # --- Chemin rapide : conversion directe en chaîne ISO pour Elasticsearch (voir timestamps.py) ---
+    # Chaque méthode donne le même résultat que _format_dt_to_es(_parse_*_to_dt(valeur)), sans objet datetime.
+    _filetime_to_es = staticmethod(timestamps.filetime_to_es)
+    _unix_micro_to_es = staticmethod(timestamps.unix_micro_to_es)
+    _ole_automation_date_to_es = staticmethod(timestamps.ole_automation_date_to_es)
+    _webkit_to_es = staticmethod(timestamps.webkit_to_es)
+
+    def _event_timestamps_to_es(self, event: dict) -> (str, str):
+        """
+        Retourne le couple (FILETIME de 'date_time' converti, timestamp Plaso converti) d'un événement.
+        Lève une exception si 'date_time' est mal formé, comme l'accès direct des processeurs.
+        """
+        return (self._filetime_to_es(event.get("date_time", {}).get("timestamp")),
+                self._unix_micro_to_es(event.get("timestamp")))
+
+    @staticmethod
+    def _batch_timestamps_to_es(events: list) -> list:
+        """
+        Version par lot de _event_timestamps_to_es : les deux conversions sont faites en une passe
+        vectorisée (NumPy s'il est installé). L'entrée vaut None pour un événement dont 'date_time'
+        est mal formé : process_event refait alors le calcul et gère l'erreur comme d'habitude.
+        """
+        filetimes, unix_micros, malformed = [], [], []
+        for event in events:
+            try:
+                filetimes.append(event.get("date_time", {}).get("timestamp"))
+                malformed.append(False)
+            except Exception:
+                filetimes.append(None)
+                malformed.append(True)
+            unix_micros.append(event.get("timestamp"))
+        pairs = zip(timestamps.filetime_to_es_many(filetimes), timestamps.unix_micro_to_es_many(unix_micros))
+        return [None if is_malformed else pair for is_malformed, pair in zip(malformed, pairs)]
+
     @staticmethod
     def _parse_filetime_to_dt(filetime_int):
         """
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from datetime import datetime, timedelta, timezone
 from .base_processor import BaseEventProcessor
 
 
@@ -11,6 +10,19 @@ class PlasoBrowserHistoryProcessor(BaseEventProcessor):
     Confine les champs spécifiques dans des sous-objets pour éviter les conflits de mapping.
     """
 
+    # Sous-objets confinés (type d'événement Plaso, ':' -> '_') : un champ 'flattened' chacun
+    OUTPUT_SCHEMA = {
+        "browser": "keyword",
+        "event_type": "keyword",
+        "history_page_visited": "flattened",
+        "history_file_downloaded": "flattened",
+        "places_page_visited": "flattened",
+        "places_bookmark": "flattened",
+        "places_bookmark_folder": "flattened",
+        "places_bookmark_annotation": "flattened",
+        "downloads_download": "flattened",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur Browser History")
 
@@ -31,28 +43,23 @@ class PlasoBrowserHistoryProcessor(BaseEventProcessor):
             timestamp_val = date_time_obj.get("timestamp")
             class_name = date_time_obj.get("__class_name__", "")
 
-            dt_obj = None
+            es_timestamp = None
 
             if timestamp_val:
                 if class_name == "WebKitTime":
                     # WebKitTime: Microsecondes depuis 1601-01-01
-                    try:
-                        epoch = datetime(1601, 1, 1, tzinfo=timezone.utc)
-                        dt_obj = epoch + timedelta(microseconds=timestamp_val)
-                    except Exception:
-                        dt_obj = None
+                    es_timestamp = self._webkit_to_es(timestamp_val)
                 else:
                     # Tentative générique (souvent FILETIME ou autre)
                     # Si ce n'est pas WebKitTime, on peut essayer le FILETIME standard
                     # ou se replier sur le timestamp Plaso.
-                    dt_obj = self._parse_filetime_to_dt(timestamp_val)
+                    es_timestamp = self._filetime_to_es(timestamp_val)
 
-            if dt_obj:
-                processed_doc["estimestamp"] = self._format_dt_to_es(dt_obj)
+            if es_timestamp:
+                processed_doc["estimestamp"] = es_timestamp
             else:
                 # Fallback sur le timestamp normalisé par Plaso (Unix Microseconds)
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                processed_doc["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                processed_doc["estimestamp"] = self._unix_micro_to_es(event.get("timestamp"))
 
             # 3. Analyser le 'data_type' pour le confinement
             # Ex: "chrome:history:file_downloaded"
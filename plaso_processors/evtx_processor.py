@@ -4,16 +4,65 @@
 import json
 import os
 import re
-import xmltodict
+from collections import Counter
 from datetime import datetime
+from . import timestamps
+from .evtx_xml import EvtxRecord, flatten_event_data, xml_to_dict
 from .base_processor import BaseEventProcessor
 
 
+# Politiques de conservation des données brutes EVTX dans le document final :
+#   - "full"       : Data_json_string (XML complet en JSON) + winlog.event_data_str pour les événements génériques
+#   - "event_data" : uniquement winlog.event_data_str (EventData à plat en JSON), pour tous les événements
+#   - "none"       : aucune donnée brute, seulement les champs extraits par les handlers
+RAW_RETENTION_POLICIES = ("none", "event_data", "full")
+
+
+def _as_dict(raw_log):
+    """Structure xmltodict d'un événement, qu'il soit fourni en dict ou en EvtxRecord."""
+    return raw_log.to_dict() if isinstance(raw_log, EvtxRecord) else raw_log
+
+
+# Les champs texte stockés dans les documents (Data_json_string, event_data_str, triggers_raw...) restent encodés
+# par json.dumps avec ses réglages par défaut, et non par json_codec : leur valeur ne dépend pas du backend JSON
+# et reste identique à celle des ingestions précédentes (recherches exactes, recherches enregistrées).
+def _dumps_raw_log(raw_log) -> str:
+    return json.dumps(_as_dict(raw_log))
+
+
+class LazyField:
+    """
+    Champ dérivé coûteux (sérialisation JSON, formatage de date...) dont le calcul est différé.
+    Les documents des handlers en contiennent ; resolve_lazy_fields() ne calcule que ceux
+    qui n'ont pas été retirés du document entre-temps.
+    """
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def resolve(self):
+        return self.func(*self.args)
+
+
+def resolve_lazy_fields(doc: dict) -> dict:
+    """Remplace (sur place, récursivement dans les dict) chaque LazyField par sa valeur calculée."""
+    for key, value in doc.items():
+        if isinstance(value, LazyField):
+            doc[key] = value.resolve()
+        elif isinstance(value, dict):
+            resolve_lazy_fields(value)
+    return doc
+
+
 # --- DÉBUT DE LA CLASSE EVTXHANDLER (IMPORTÉE DE evtx_processor.py) ---
 # (Intégrée ici pour garder le fichier autonome)
 class EvtxHandler:
     """
     Contient la logique de parsing pour les différents Event ID des logs EVTX.
+    Les documents retournés peuvent contenir des LazyField, à finaliser avec resolve_lazy_fields().
     """
 
     def __init__(self):
@@ -52,35 +101,15 @@ class EvtxHandler:
                                     60: self.handle_bits_client, 61: self.handle_bits_client}
 
     def _get_system_data(self, raw_log: dict) -> dict:
+        if isinstance(raw_log, EvtxRecord): return raw_log.system
         return raw_log.get("Event", {}).get("System", {})
 
     def _get_event_data(self, raw_log: dict) -> dict:
-        event_data = raw_log.get("Event", {}).get("EventData")
-        if event_data is None: return {}
-        if not isinstance(event_data, dict): return {}
-        if "Data" not in event_data: return event_data
-
-        parsed_output = {}
-        data_items = event_data.get("Data")
-        if not data_items:
-            for key, value in event_data.items():
-                if key != 'Data': parsed_output[key] = value
-            return parsed_output
-
-        if not isinstance(data_items, list): data_items = [data_items]
-
-        # --- FIX: Always include raw Data list for unnamed parameters (like PowerShell 400/600) ---
-        parsed_output["Data"] = data_items
-
-        for item in data_items:
-            if isinstance(item, dict) and '@Name' in item:
-                parsed_output[item['@Name']] = item.get('#text')
-
-        for key, value in event_data.items():
-            if key != 'Data': parsed_output[key] = value
-        return parsed_output
+        if isinstance(raw_log, EvtxRecord): return raw_log.event_data
+        return flatten_event_data(raw_log.get("Event", {}).get("EventData"))
 
     def _get_user_data(self, raw_log: dict) -> dict:
+        if isinstance(raw_log, EvtxRecord): return raw_log.user_data
         return raw_log.get("Event", {}).get("UserData", {})
 
     def _format_timestamp(self, time_str: str) -> str:
@@ -111,15 +140,16 @@ class EvtxHandler:
             except (ValueError, TypeError):
                 pass
 
-        return {"@timestamp": self._format_timestamp(time_created),
+        # Champs coûteux différés (LazyField) : PlasoEvtxProcessor retire '@timestamp' et 'event.original'
+        return {"@timestamp": LazyField(self._format_timestamp, time_created),
                 "host": {"name": system_data.get("Computer")},
                 "winlog": {"provider_name": system_data.get("Provider", {}).get("Name"), "event_id": final_event_id,
                            "channel": system_data.get("Channel")},
-                "event": {"kind": "event", "category": "host", "original": json.dumps(raw_log)}}
+                "event": {"kind": "event", "category": "host", "original": LazyField(_dumps_raw_log, raw_log)}}
 
     def handle_generic_evtx(self, raw_log: dict) -> dict:
         doc = self._create_base_document(raw_log)
-        doc["winlog"]["event_data_str"] = json.dumps(self._get_event_data(raw_log))
+        doc["winlog"]["event_data_str"] = LazyField(json.dumps, self._get_event_data(raw_log))
         return doc
 
     def handle_security_logon(self, raw_log: dict) -> dict:
@@ -209,10 +239,10 @@ class EvtxHandler:
         # Parsing du XML de la tâche pour extraire l'action (Command/Arguments)
         if task_content:
             try:
-                # Le XML peut être échappé ou inclus directement, xmltodict gère bien les structures
+                # Le XML peut être échappé ou inclus directement, xml_to_dict (format xmltodict) gère bien les structures
                 # Il faut parfois nettoyer le XML s'il est brut dans une string
                 if task_content.startswith("<?xml"):
-                    task_xml = xmltodict.parse(task_content)
+                    task_xml = xml_to_dict(task_content)
 
                     # Navigation dans la structure XML de la tâche (Task > Actions > Exec)
                     # Note: La structure peut varier légèrement
@@ -269,9 +299,11 @@ class EvtxHandler:
         doc = self._create_base_document(raw_log)
         data = self._get_event_data(raw_log)
         doc.update({"event": {**doc["event"], "action": "powershell_script_block_execution"},
-                    "process": {"pid": data.get("HostId"), "name": data.get("HostName")},
+                    "process": {"name": data.get("HostName")},
+                    # HostId est un GUID, pas un PID : même champ que les événements 400 / 600
                     "powershell": {"script_block_id": data.get("ScriptBlockId"),
-                                   "script_block_text": data.get("ScriptBlockText"), "path": data.get("Path")}})
+                                   "script_block_text": data.get("ScriptBlockText"), "path": data.get("Path"),
+                                   "host": {"id": data.get("HostId")}}})
         return doc
 
     def handle_ps_module_logging(self, raw_log: dict) -> dict:
@@ -541,8 +573,66 @@ class EvtxHandler:
 class PlasoEvtxProcessor(BaseEventProcessor):
     """Processeur Plaso pour les événements EVTX (winevtx)."""
 
-    def __init__(self):
-        print("  [*] Initialisation du processeur EVTX")
+    # Nombre maximal de noms de fichiers EVTX distincts mémorisés pour la résolution du canal
+    EVTX_TYPE_CACHE_SIZE = 1024
+
+    # Champs Plaso conservés et arbre 'winlog_parsed' produit par les handlers d'EvtxHandler
+    OUTPUT_SCHEMA = {
+        "Data_json_string": "raw",
+        "evtx_type": "keyword",
+        "event_identifier": "integer",
+        "event_level": "integer",
+        "record_number": "long",
+        "source_name": "compat_keyword",
+        "computer_name": "keyword",
+        "user_sid": "keyword",
+        **{f"winlog_parsed.{path}": field_type for path, field_type in {
+            "event.kind": "keyword", "event.category": "keyword", "event.action": "keyword",
+            "event.type": "keyword", "event.outcome": "keyword", "event.provider": "keyword",
+            "winlog.provider_name": "keyword", "winlog.channel": "keyword", "winlog.event_id": "integer",
+            "winlog.event_data_str": "raw", "winlog.logon.type": "keyword",
+            "winlog.event_data.privileges": "keyword", "winlog.session_id": "keyword",
+            "source.ip": "ip", "source.port": "integer", "source.domain": "keyword",
+            "source.user.name": "keyword", "source.process.pid": "long",
+            "user.name": "keyword", "user.domain": "keyword", "user.id": "keyword",
+            "source_user.name": "keyword",
+            "error.code": "keyword", "error.message": "text",
+            "process.executable": "keyword", "process.name": "keyword", "process.pid": "long",
+            "process.command_line": "text", "process.parent.pid": "long",
+            "process.parent.ParentProcessName": "keyword",
+            "task.name": "keyword", "task.command": "keyword", "task.arguments": "text",
+            "task.action": "keyword", "task.result_code": "keyword", "task.triggers_raw": "raw",
+            "task.content_raw": "raw", "task.xml_parsing_error": "text",
+            "service.name": "keyword", "service.path": "keyword", "service.start_type": "keyword",
+            "service.account": "keyword",
+            "powershell.script_block_id": "keyword", "powershell.script_block_text": "text",
+            "powershell.path": "keyword", "powershell.context": "text", "powershell.payload": "text",
+            "powershell.engine_state": "keyword", "powershell.previous_engine_state": "keyword",
+            "powershell.sequence_number": "keyword", "powershell.runspace_id": "keyword",
+            "powershell.pipeline_id": "keyword", "powershell.engine_version": "keyword",
+            "powershell.script_name": "keyword", "powershell.host.name": "keyword",
+            "powershell.host.version": "keyword", "powershell.host.id": "keyword",
+            "powershell.command.name": "keyword", "powershell.command.type": "keyword",
+            "powershell.command.path": "keyword", "powershell.command.line": "text",
+            "powershell.provider.name": "keyword", "powershell.provider.new_state": "keyword",
+            "wmi.namespace": "keyword", "wmi.query": "text", "wmi.query_language": "keyword",
+            "wmi.operation": "keyword", "wmi.consumer": "text", "wmi.component": "keyword",
+            "wmi.filter_name": "keyword", "wmi.consumer_name": "keyword", "wmi.binding_xml_raw": "raw",
+            "threat.name": "keyword", "threat.severity": "keyword", "threat.path": "keyword",
+            "bits.job_id": "keyword", "bits.job_title": "keyword", "bits.transfer_id": "keyword",
+            "bits.owner": "keyword",
+            "file.name": "keyword", "file.size": "long", "file.mtime": "keyword",
+            "network.bytes_Transfered": "long", "network.total_bytes": "long",
+            "url.original": "keyword",
+        }.items()},
+    }
+
+    def __init__(self, raw_retention: str = "full"):
+        print(f"  [*] Initialisation du processeur EVTX (Données brutes: {raw_retention})")
+        if raw_retention not in RAW_RETENTION_POLICIES:
+            raise ValueError(f"Politique de conservation EVTX inconnue '{raw_retention}' "
+                             f"(valeurs possibles : {', '.join(RAW_RETENTION_POLICIES)})")
+        self.raw_retention = raw_retention
         self.evtx_handler = EvtxHandler()
 
         # Copié de plaso_2_siem.py
@@ -573,12 +663,64 @@ class PlasoEvtxProcessor(BaseEventProcessor):
             "bits": self.evtx_handler.BITS_EVENT_HANDLERS,
         }
 
+        # Précompilation : regex des fichiers EVTX et table de dispatch à plat (canal, EventID) -> handler
+        self._log_file_regexes = [(re.compile(pattern, re.IGNORECASE), log_type)
+                                  for pattern, log_type in self.LOG_FILE_MAP.items()]
+        self._evtx_type_cache = {}
+        self.handler_dispatch = {
+            (log_type, event_id): handler_func
+            for log_type, handler_map in self.EVTX_HANDLER_MAP.items()
+            for event_id, handler_func in handler_map.items()
+        }
+
+        # Nombre d'événements traités par chaque handler (permet de voir lesquels dominent)
+        self.handler_hits = Counter()
+
     def get_specific_evtx_type(self, original_filename):
         if not original_filename: return None
-        for pattern, log_type in self.LOG_FILE_MAP.items():
-            if re.search(pattern, original_filename, re.IGNORECASE):
-                return log_type
-        return None
+        # Un fichier EVTX contient des millions d'événements : le canal est résolu une seule fois par nom de fichier
+        try:
+            return self._evtx_type_cache[original_filename]
+        except KeyError:
+            pass
+        log_type = None
+        for pattern_regex, candidate_type in self._log_file_regexes:
+            if pattern_regex.search(original_filename):
+                log_type = candidate_type
+                break
+        if len(self._evtx_type_cache) >= self.EVTX_TYPE_CACHE_SIZE:
+            self._evtx_type_cache.clear()
+        self._evtx_type_cache[original_filename] = log_type
+        return log_type
+
+    def pop_stats(self) -> Counter:
+        """Retourne le nombre d'appels par handler EVTX (clés 'evtx_handler:<nom>') et le remet à zéro."""
+        stats = Counter({f"evtx_handler:{name}": count for name, count in self.handler_hits.items()})
+        self.handler_hits = Counter()
+        return stats
+
+    def _finalize_event(self, event: dict) -> dict:
+        """
+        Nettoyage final du document : champs Plaso verbeux, et ligne brute de la timeline (event_raw_string,
+        XML complet inclus) sauf avec la politique 'full'.
+        """
+        self.drop_useless_fields(event)
+        if self.raw_retention != "full":
+            event.pop("event_raw_string", None)
+        return event
+
+    def _apply_raw_retention(self, processed_data: dict, evtx_record: EvtxRecord):
+        """Ajoute ou retire winlog.event_data_str du document du handler selon la politique de conservation."""
+        if self.raw_retention == "full":
+            return
+        winlog = processed_data.get("winlog")
+        if not isinstance(winlog, dict):
+            return
+        if self.raw_retention == "event_data":
+            if "event_data_str" not in winlog:
+                winlog["event_data_str"] = LazyField(json.dumps, evtx_record.event_data)
+        else:
+            winlog.pop("event_data_str", None)
 
     def process_event(self, event: dict) -> (dict, str):
         """Traite un événement EVTX de Plaso."""
@@ -586,23 +728,32 @@ class PlasoEvtxProcessor(BaseEventProcessor):
             xml_string = event.get("xml_string")
             if not xml_string:
                 # S'il n'y a pas de XML, on ne peut pas faire grand chose
-                return self.drop_useless_fields(event), "evtx"
+                return self._finalize_event(event), "evtx"
 
-            xml_as_json = xmltodict.parse(xml_string)
+            evtx_record = EvtxRecord.from_xml(xml_string)
 
             # MODIFIÉ: Stocker en tant que chaîne JSON pour éviter les conflits de mapping
-            event["Data_json_string"] = json.dumps(xml_as_json)
+            if self.raw_retention == "full":
+                event["Data_json_string"] = json.dumps(evtx_record.to_dict())
 
             # --- Logique de Timestamp ---
-            dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            dt_xml = self._parse_iso_string_to_dt(
-                xml_as_json.get("Event", {}).get("System", {}).get("TimeCreated", {}).get("@SystemTime")
-            )
-            valid_dts = [dt for dt in [dt_plaso, dt_filetime, dt_xml] if dt]
-            final_dt = max(valid_dts) if valid_dts else None
+            # Le plus récent des trois timestamps (Plaso, FILETIME, SystemTime du XML), en µs entières
+            xml_time = evtx_record.system.get("TimeCreated", {}).get("@SystemTime")
+            us_xml = timestamps.iso_z_to_us(xml_time)
+            if us_xml is not None or not xml_time:
+                valid_us = [us for us in (timestamps.unix_micro_to_us(event.get("timestamp")),
+                                          timestamps.filetime_to_us(event.get("date_time", {}).get("timestamp")),
+                                          us_xml) if us is not None]
+                event["estimestamp"] = timestamps.format_us(max(valid_us)) if valid_us else None
+            else:
+                # SystemTime dans une forme inhabituelle (décalage horaire...) : chemin datetime d'origine
+                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
+                dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
+                dt_xml = self._parse_iso_string_to_dt(xml_time)
+                valid_dts = [dt for dt in [dt_plaso, dt_filetime, dt_xml] if dt]
+                final_dt = max(valid_dts) if valid_dts else None
 
-            event["estimestamp"] = self._format_dt_to_es(final_dt)
+                event["estimestamp"] = self._format_dt_to_es(final_dt)
 
             # --- Logique de Parsing Spécifique (EvtxHandler) ---
             filename = event.get("filename", "")
@@ -618,32 +769,32 @@ class PlasoEvtxProcessor(BaseEventProcessor):
                 event_id = 0  # Fallback
 
             processed_data = None
-            handler_func = None
-
-            if specific_type:
-                handler_map = self.EVTX_HANDLER_MAP.get(specific_type)
-                if handler_map:
-                    handler_func = handler_map.get(event_id)
+            handler_func = self.handler_dispatch.get((specific_type, event_id)) if specific_type else None
 
             if handler_func:
                 try:
                     # Le handler a toujours besoin de l'objet, pas de la chaîne
-                    processed_data = handler_func(xml_as_json)
+                    processed_data = handler_func(evtx_record)
+                    self.handler_hits[handler_func.__name__] += 1
                 except Exception as e:
                     # print(f"[WARN] Handler {handler_func.__name__} échec pour EventID {event_id}: {e}")
-                    processed_data = self.evtx_handler.handle_generic_evtx(xml_as_json)
+                    processed_data = self.evtx_handler.handle_generic_evtx(evtx_record)
+                    self.handler_hits[f"{handler_func.__name__} (échec, générique)"] += 1
             else:
-                processed_data = self.evtx_handler.handle_generic_evtx(xml_as_json)
+                processed_data = self.evtx_handler.handle_generic_evtx(evtx_record)
+                self.handler_hits["handle_generic_evtx"] += 1
 
             if processed_data:
                 processed_data.pop("@timestamp", None)
                 processed_data.pop("host", None)
                 if "event" in processed_data:
                     processed_data["event"].pop("original", None)
-                event["winlog_parsed"] = processed_data
+                self._apply_raw_retention(processed_data, evtx_record)
+                # Seuls les champs différés encore présents sont calculés
+                event["winlog_parsed"] = resolve_lazy_fields(processed_data)
 
             # --- Nettoyage et Finalisation ---
-            self.drop_useless_fields(event)
+            self._finalize_event(event)
 
             index_key = "evtx"
 
@@ -651,4 +802,4 @@ class PlasoEvtxProcessor(BaseEventProcessor):
 
         except Exception as e:
             # print(f"[ERREUR] Échec de process_evtx_event: {e}")
-            return self.drop_useless_fields(event), "evtx"
\ No newline at end of file
+            return self._finalize_event(event), "evtx"
\ No newline at end of file
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Extraction rapide du XML des événements EVTX (remplace xmltodict sur le chemin critique).
+# Le constructeur branche directement ses callbacks sur expat et produit exactement la même structure
+# que xmltodict.parse (attributs préfixés par '@', texte dans '#text', éléments répétés en liste,
+# espaces superflus supprimés) : Data_json_string et les handlers EVTX restent inchangés.
+# EvtxRecord expose ensuite les accès dont ont besoin les handlers (System, EventData à plat, UserData)
+# en ne les calculant qu'une fois par événement.
+
+from xml.parsers import expat
+
+
+class _XmlDictBuilder:
+    """Callbacks expat construisant le dict au format xmltodict (sans la généricité inutile ici)."""
+
+    __slots__ = ("item", "data", "stack")
+
+    def __init__(self):
+        self.item = None
+        self.data = []
+        self.stack = []
+
+    def start_element(self, name, attrs):
+        self.stack.append((self.item, self.data))
+        # attrs est la liste ordonnée [nom1, valeur1, nom2, valeur2, ...] (ordered_attributes)
+        if attrs:
+            self.item = {"@" + attrs[i]: attrs[i + 1] for i in range(0, len(attrs), 2)}
+        else:
+            self.item = None
+        self.data = []
+
+    def end_element(self, name):
+        data = "".join(self.data).strip() or None if self.data else None
+        item = self.item
+        self.item, self.data = self.stack.pop()
+
+        if item is not None:
+            if data:
+                item["#text"] = data
+            value = item
+        else:
+            value = data
+
+        parent = self.item
+        if parent is None:
+            parent = self.item = {}
+        if name in parent:
+            existing = parent[name]
+            if isinstance(existing, list):
+                existing.append(value)
+            else:
+                parent[name] = [existing, value]
+        else:
+            parent[name] = value
+
+    def characters(self, data):
+        self.data.append(data)
+
+
+def xml_to_dict(xml_input) -> dict:
+    """
+    Équivalent de xmltodict.parse(xml_input) avec ses options par défaut.
+    Lève xml.parsers.expat.ExpatError si le XML est invalide.
+    """
+    if isinstance(xml_input, str):
+        xml_input = xml_input.encode("utf-8")
+    builder = _XmlDictBuilder()
+    # Encodage forcé comme dans xmltodict : la déclaration '<?xml ... encoding="UTF-16"?>' est ignorée
+    parser = expat.ParserCreate("utf-8")
+    parser.ordered_attributes = True
+    parser.buffer_text = True
+    parser.StartElementHandler = builder.start_element
+    parser.EndElementHandler = builder.end_element
+    parser.CharacterDataHandler = builder.characters
+    parser.Parse(xml_input, True)
+    return builder.item
+
+
+class EvtxRecord:
+    """
+    Événement EVTX parsé. Se comporte comme le dict retourné par xmltodict (get, [], in)
+    pour les handlers existants, et met en cache les sections System, EventData (à plat) et UserData.
+    """
+
+    __slots__ = ("tree", "_system", "_event_data", "_user_data")
+
+    _UNSET = object()
+
+    def __init__(self, tree: dict):
+        self.tree = tree if tree is not None else {}
+        self._system = self._event_data = self._user_data = self._UNSET
+
+    @classmethod
+    def from_xml(cls, xml_string) -> "EvtxRecord":
+        return cls(xml_to_dict(xml_string))
+
+    # --- Compatibilité dict (structure xmltodict) ---
+    def get(self, key, default=None):
+        return self.tree.get(key, default)
+
+    def __getitem__(self, key):
+        return self.tree[key]
+
+    def __contains__(self, key):
+        return key in self.tree
+
+    def to_dict(self) -> dict:
+        return self.tree
+
+    # --- Accès mis en cache ---
+    @property
+    def system(self) -> dict:
+        if self._system is self._UNSET:
+            self._system = self.tree.get("Event", {}).get("System", {})
+        return self._system
+
+    @property
+    def user_data(self) -> dict:
+        if self._user_data is self._UNSET:
+            self._user_data = self.tree.get("Event", {}).get("UserData", {})
+        return self._user_data
+
+    @property
+    def event_data(self) -> dict:
+        """EventData à plat : {Name: texte} pour chaque <Data Name=...>, plus la liste brute 'Data'."""
+        if self._event_data is self._UNSET:
+            self._event_data = flatten_event_data(self.tree.get("Event", {}).get("EventData"))
+        return self._event_data
+
+
+def flatten_event_data(event_data) -> dict:
+    """Aplatit la section EventData (structure xmltodict) en dictionnaire {Name: valeur}."""
+    if event_data is None: return {}
+    if not isinstance(event_data, dict): return {}
+    if "Data" not in event_data: return event_data
+
+    parsed_output = {}
+    data_items = event_data.get("Data")
+    if not data_items:
+        for key, value in event_data.items():
+            if key != 'Data': parsed_output[key] = value
+        return parsed_output
+
+    if not isinstance(data_items, list): data_items = [data_items]
+
+    # --- FIX: Always include raw Data list for unnamed parameters (like PowerShell 400/600) ---
+    parsed_output["Data"] = data_items
+
+    for item in data_items:
+        if isinstance(item, dict) and '@Name' in item:
+            parsed_output[item['@Name']] = item.get('#text')
+
+    for key, value in event_data.items():
+        if key != 'Data': parsed_output[key] = value
+    return parsed_output
@@ -14,21 +14,23 @@ class PlasoGenericProcessor(BaseEventProcessor):
     def __init__(self):
         print("  [*] Initialisation du processeur Générique (Mode: Raw String)")
 
-    def process_event(self, event: dict) -> (dict, str):
+    def process_batch(self, events: list) -> list:
+        """Traite un lot d'événements génériques : les timestamps du lot sont convertis en une seule passe."""
+        return [self._process_event_in_batch(event, batch_timestamps)
+                for event, batch_timestamps in zip(events, self._batch_timestamps_to_es(events))]
+
+    def process_event(self, event: dict, batch_timestamps=None) -> (dict, str):
         """
         Traite un événement générique de Plaso en le stockant comme une chaîne brute.
+        'batch_timestamps' : couple (FILETIME, timestamp Plaso) déjà converti par process_batch.
         """
         try:
             # 1. Créer un nouveau document propre
             processed_doc = {}
 
             # 2. Gestion du Timestamp (meilleur effort)
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                processed_doc["estimestamp"] = self._format_dt_to_es(dt_filetime)
-            else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                processed_doc["estimestamp"] = self._format_dt_to_es(dt_plaso)
+            es_filetime, es_plaso = batch_timestamps or self._event_timestamps_to_es(event)
+            processed_doc["estimestamp"] = es_filetime or es_plaso
 
             processed_doc["data_type"] = event.get("data_type")
             processed_doc["parser"] = event.get("parser")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Couche de (dé)sérialisation JSON interchangeable.
+# Utilise orjson ou msgspec s'ils sont installés, sinon le module json de la bibliothèque standard.
+# Les bibliothèques rapides refusent certains cas limites que la stdlib accepte (entiers de plus de 64 bits,
+# surrogates isolés, clés non-str...) : dans ces cas, on se replie sur la stdlib pour l'élément concerné,
+# ce qui garantit le même résultat quel que soit le backend.
+# Réservée au décodage des lignes de la timeline et aux corps des requêtes bulk : les champs texte JSON stockés
+# dans les documents (Data_json_string...) sont produits par json.dumps, au format de la stdlib.
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+BACKEND_PRIORITY = ("orjson", "msgspec", "stdlib")
+
+
+def available_backends() -> list:
+    """Liste des backends utilisables dans cet environnement, du plus rapide au plus lent."""
+    installed = {"orjson": orjson is not None, "msgspec": msgspec is not None, "stdlib": True}
+    return [name for name in BACKEND_PRIORITY if installed[name]]
+
+
+def _stdlib_dumps_bytes(obj, default=None) -> bytes:
+    # Même format que orjson/msgspec : compact et sans échappement des caractères non ASCII
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogatepass")
+
+
+def _orjson_loads(data):
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return json.loads(data)
+
+
+def _orjson_dumps_bytes(obj, default=None) -> bytes:
+    try:
+        return orjson.dumps(obj, default=default)
+    except TypeError:
+        return _stdlib_dumps_bytes(obj, default)
+
+
+def _msgspec_loads(data):
+    try:
+        return _msgspec_decoder.decode(data)
+    except (msgspec.DecodeError, ValueError):
+        return json.loads(data)
+
+
+def _msgspec_dumps_bytes(obj, default=None) -> bytes:
+    try:
+        if default is None:
+            return _msgspec_encoder.encode(obj)
+        return msgspec.json.encode(obj, enc_hook=default)
+    except (msgspec.EncodeError, TypeError, OverflowError):
+        return _stdlib_dumps_bytes(obj, default)
+
+
+_msgspec_decoder = msgspec.json.Decoder() if msgspec is not None else None
+_msgspec_encoder = msgspec.json.Encoder() if msgspec is not None else None
+
+_BACKENDS = {
+    "orjson": (_orjson_loads, _orjson_dumps_bytes),
+    "msgspec": (_msgspec_loads, _msgspec_dumps_bytes),
+    "stdlib": (json.loads, _stdlib_dumps_bytes),
+}
+
+_backend_name = "stdlib"
+_loads = json.loads
+_dumps_bytes = _stdlib_dumps_bytes
+
+
+def set_backend(name: str = "auto") -> str:
+    """
+    Sélectionne le backend ('auto', 'orjson', 'msgspec' ou 'stdlib') et retourne le nom retenu.
+    Lève ValueError si le backend demandé n'est pas installé.
+    """
+    global _backend_name, _loads, _dumps_bytes
+    backends = available_backends()
+    if name == "auto":
+        name = backends[0]
+    elif name not in backends:
+        raise ValueError(f"Backend JSON '{name}' indisponible (installés : {', '.join(backends)})")
+    _backend_name = name
+    _loads, _dumps_bytes = _BACKENDS[name]
+    return name
+
+
+def get_backend() -> str:
+    return _backend_name
+
+
+def loads(data):
+    """Décode une chaîne ou des octets JSON. Lève json.JSONDecodeError si l'entrée est invalide."""
+    return _loads(data)
+
+
+def dumps_bytes(obj, default=None) -> bytes:
+    """Encode un objet en JSON compact (UTF-8)."""
+    return _dumps_bytes(obj, default)
+
+
+def dumps(obj, default=None) -> str:
+    """Encode un objet en chaîne JSON compacte."""
+    return _dumps_bytes(obj, default).decode("utf-8", "surrogatepass")
+
+
+set_backend("auto")
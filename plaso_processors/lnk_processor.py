@@ -11,30 +11,55 @@ class PlasoLnkProcessor(BaseEventProcessor):
     Consolide les multiples champs de chemin en un champ unique 'lnk_path'.
     """
 
+    OUTPUT_SCHEMA = {
+        "lnk_path": "keyword",
+        "lnk_timestamp_type": "keyword",
+        "local_path": "keyword",
+        "network_target": "keyword",
+        "link_target": "keyword",
+        "shell_item_path": "keyword",
+        "relative_path": "keyword",
+        "working_directory": "keyword",
+        "command_line_arguments": "text",
+        "description": "text",
+        "icon_location": "keyword",
+        "volume_label": "keyword",
+        "drive_serial_number": "keyword",
+        "drive_type": "keyword",
+        "file_size": "long",
+        "file_attribute_flags": "long",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur LNK")
         # Regex pour nettoyer les artifacts de shell items (ex: "<My Computer> C:\...")
         self.shell_item_cleaner = re.compile(r'^<[^>]+>\s*')
 
-    def process_event(self, event: dict) -> (dict, str):
-        """Traite un événement LNK de Plaso."""
+    def process_batch(self, events: list) -> list:
+        """Traite un lot d'événements LNK : les timestamps du lot sont convertis en une seule passe."""
+        return [self._process_event_in_batch(event, batch_timestamps)
+                for event, batch_timestamps in zip(events, self._batch_timestamps_to_es(events))]
+
+    def process_event(self, event: dict, batch_timestamps=None) -> (dict, str):
+        """
+        Traite un événement LNK de Plaso.
+        'batch_timestamps' : couple (FILETIME, timestamp Plaso) déjà converti par process_batch.
+        """
         try:
             timestamp_desc = event.get("timestamp_desc", "")
 
             # 1. Gestion du Timestamp
             # Priorité au FATDateTime si présent (typique des LNK), sinon timestamp standard
             if timestamp_desc == "Not a time" or event.get("timestamp") == 0:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                event["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                if batch_timestamps:
+                    event["estimestamp"] = batch_timestamps[1]
+                else:
+                    event["estimestamp"] = self._unix_micro_to_es(event.get("timestamp"))
             else:
                 # C'est un vrai timestamp (Creation, Modif, etc.)
-                dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-                if dt_filetime:
-                    event["estimestamp"] = self._format_dt_to_es(dt_filetime)
-                else:
-                    # Fallback pour FATDateTime ou autre
-                    dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                    event["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                # Fallback sur le timestamp Plaso pour FATDateTime ou autre
+                es_filetime, es_plaso = batch_timestamps or self._event_timestamps_to_es(event)
+                event["estimestamp"] = es_filetime or es_plaso
 
             # 2. Renommer le descripteur
             if "timestamp_desc" in event:
@@ -8,6 +8,23 @@ from .base_processor import BaseEventProcessor
 class PlasoMftProcessor(BaseEventProcessor):
     """Processeur Plaso pour les événements MFT (fs:stat)."""
 
+    OUTPUT_SCHEMA = {
+        "file_reference": "keyword",
+        "parent_file_reference": "keyword",
+        "mft_timestamp_type": "keyword",
+        "name": "keyword",
+        "file_entry_type": "keyword",
+        "file_system_type": "keyword",
+        "file_size": "long",
+        "attribute_type": "long",
+        "file_attribute_flags": "long",
+        "update_reason_flags": "long",
+        "update_sequence_number": "long",
+        "update_source_flags": "long",
+        "path_hints": "keyword",
+        "symbolic_link_target": "keyword",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur MFT")
 
@@ -21,16 +38,20 @@ class PlasoMftProcessor(BaseEventProcessor):
             "Creation Time": "creation",
         }
 
-    def process_event(self, event: dict) -> (dict, str):
-        """Traite un événement MFT de Plaso."""
+    def process_batch(self, events: list) -> list:
+        """Traite un lot d'événements MFT : les timestamps du lot sont convertis en une seule passe."""
+        return [self._process_event_in_batch(event, batch_timestamps)
+                for event, batch_timestamps in zip(events, self._batch_timestamps_to_es(events))]
+
+    def process_event(self, event: dict, batch_timestamps=None) -> (dict, str):
+        """
+        Traite un événement MFT de Plaso.
+        'batch_timestamps' : couple (FILETIME, timestamp Plaso) déjà converti par process_batch.
+        """
         try:
-            # 1. Gestion du Timestamp (FILETIME)
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                event["estimestamp"] = self._format_dt_to_es(dt_filetime)
-            else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                event["estimestamp"] = self._format_dt_to_es(dt_plaso)
+            # 1. Gestion du Timestamp (FILETIME, sinon timestamp Plaso)
+            es_filetime, es_plaso = batch_timestamps or self._event_timestamps_to_es(event)
+            event["estimestamp"] = es_filetime or es_plaso
 
             # --- CORRECTION DU CONFLIT DE MAPPING ---
             # Le champ 'file_reference' contient parfois des chaînes comme '1519-1',
@@ -12,6 +12,16 @@ class PlasoMruProcessor(BaseEventProcessor):
     un document Elasticsearch pour CHAQUE entrée.
     """
 
+    OUTPUT_SCHEMA = {
+        "key_path": "keyword",
+        "entries": "keyword",
+        "mru_index": "integer",
+        "mru_value_order": "integer",
+        "mru_path": "keyword",
+        "mru_shell_item": "keyword",
+        "mru_raw_entry": "keyword",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur MRU")
         # Regex pour extraire les champs clés de l'entrée MRU
@@ -30,12 +40,9 @@ class PlasoMruProcessor(BaseEventProcessor):
         """
         try:
             # 1. Calcul du Timestamp unique
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                es_timestamp = self._format_dt_to_es(dt_filetime)
-            else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                es_timestamp = self._format_dt_to_es(dt_plaso)
+            es_timestamp = self._filetime_to_es(event.get("date_time", {}).get("timestamp"))
+            if not es_timestamp:
+                es_timestamp = self._unix_micro_to_es(event.get("timestamp"))
 
             # 2. Champs de base à conserver pour chaque entrée
             base_doc = {
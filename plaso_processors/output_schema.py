@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Schémas de sortie des processeurs (OUTPUT_SCHEMA) et génération des mappings explicites des index consolidés.
+# Un schéma associe le chemin pointé d'un champ ("winlog_parsed.process.pid") à un type court de FIELD_TYPES.
+# Les templates déclarent ainsi tous les champs produits : plus de mise à jour du mapping pendant l'envoi.
+
+# Types courts -> mapping Elasticsearch. Les numériques et les IP tolèrent les valeurs mal formées
+# (conservées dans _source, non indexées) plutôt que de rejeter le document.
+FIELD_TYPES = {
+    "date": {"type": "date", "format": "strict_date_optional_time||epoch_millis"},
+    "keyword": {"type": "keyword", "ignore_above": 1024},
+    # Keyword doté du sous-champ '.keyword' créé par le mapping dynamique : les recherches enregistrées Kibana
+    # (kibana_view/all_view.ndjson) filtrent sur 'artefact_type.keyword', 'source_name.keyword'...
+    "compat_keyword": {"type": "keyword", "ignore_above": 1024,
+                       "fields": {"keyword": {"type": "keyword", "ignore_above": 256}}},
+    "text": {"type": "text"},
+    "long": {"type": "long", "ignore_malformed": True},
+    "integer": {"type": "integer", "ignore_malformed": True},
+    "double": {"type": "double", "ignore_malformed": True},
+    "boolean": {"type": "boolean"},
+    "ip": {"type": "ip", "ignore_malformed": True},
+    # Objet aux clés imprévisibles (champs Plaso confinés) : un seul champ dans le mapping
+    "flattened": {"type": "flattened", "ignore_above": 1024},
+    # Blob brut (XML, JSON, ligne d'origine) : conservé dans _source, ni indexé ni agrégeable
+    "raw": {"type": "keyword", "index": False, "doc_values": False},
+}
+
+# Valeurs de --mapping-mode : 'dynamic' = mapping dynamique d'origine (seul estimestamp est déclaré),
+# 'false' = champs non déclarés conservés dans _source sans être indexés, 'strict' = document rejeté
+MAPPING_MODES = ("dynamic", "false", "strict")
+
+# Champs communs à tous les index : ajoutés par le transformateur ou par les documents d'erreur des processeurs
+BASE_OUTPUT_SCHEMA = {
+    "estimestamp": "date",
+    "artefact_type": "compat_keyword",
+    "parser": "keyword",
+    "data_type": "compat_keyword",
+    "timestamp_desc": "keyword",
+    "filename": "keyword",
+    "message": "text",
+    "event_raw_string": "raw",
+    "raw_event_line": "raw",
+    "raw_event": "raw",
+}
+
+
+def merge_schemas(*schemas: dict) -> dict:
+    """Fusionne des schémas de sortie ; un même champ déclaré avec deux types différents lève une ValueError."""
+    merged = {}
+    for schema in schemas:
+        for path, field_type in schema.items():
+            if field_type not in FIELD_TYPES:
+                raise ValueError(f"Type de champ inconnu '{field_type}' pour '{path}' "
+                                 f"(attendu : {', '.join(FIELD_TYPES)})")
+            if merged.setdefault(path, field_type) != field_type:
+                raise ValueError(f"Champ '{path}' déclaré à la fois '{merged[path]}' et '{field_type}'")
+    return merged
+
+
+def build_mappings(schema: dict, mapping_mode: str) -> dict:
+    """Mapping explicite ('mappings' d'un template) d'un schéma de sortie pour --mapping-mode false / strict."""
+    if mapping_mode not in MAPPING_MODES[1:]:
+        raise ValueError(f"Mode de mapping explicite inconnu : {mapping_mode} (attendu : false, strict)")
+    return {"dynamic": mapping_mode,
+            "properties": nest_properties({path: FIELD_TYPES[field_type] for path, field_type in schema.items()})}
+
+
+def nest_properties(fields: dict) -> dict:
+    """'properties' imbriquées d'un mapping à partir de {chemin pointé: mapping du champ simple}."""
+    properties = {}
+    for path in sorted(fields):
+        *parents, name = path.split(".")
+        node = properties
+        for parent in parents:
+            entry = node.setdefault(parent, {"properties": {}})
+            if "properties" not in entry:
+                raise ValueError(f"Champ '{path}' : '{parent}' est déjà déclaré comme champ simple")
+            node = entry["properties"]
+        if name in node:
+            raise ValueError(f"Champ '{path}' : déjà déclaré comme objet")
+        node[name] = dict(fields[path])
+    return properties
+
+
+def flatten_properties(mappings: dict, prefix: str = "") -> dict:
+    """Inverse de nest_properties : {chemin pointé: mapping du champ simple} d'un mapping."""
+    fields = {}
+    for name, field in mappings.get("properties", {}).items():
+        if "properties" in field:
+            fields.update(flatten_properties(field, f"{prefix}{name}."))
+        else:
+            fields[prefix + name] = field
+    return fields
+
+
+def count_fields(mappings: dict) -> int:
+    """Nombre de champs simples d'un mapping (objets intermédiaires exclus)."""
+    return sum(count_fields(field) if "properties" in field else 1
+               for field in mappings.get("properties", {}).values())
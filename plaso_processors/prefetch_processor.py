@@ -10,6 +10,18 @@ class PlasoPrefetchProcessor(BaseEventProcessor):
     MODIFIÉ: Dénormalise la liste 'mapped_files' en créant un document par fichier chargé.
     """
 
+    OUTPUT_SCHEMA = {
+        "prefetch_timestamp_type": "keyword",
+        "executable": "keyword",
+        "run_count": "integer",
+        "prefetch_hash": "keyword",
+        "version": "keyword",
+        "path_hints": "keyword",
+        "volume_serial_numbers": "keyword",
+        "volume_device_paths": "keyword",
+        "mapped_file": "keyword",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur Prefetch")
 
@@ -21,13 +33,10 @@ class PlasoPrefetchProcessor(BaseEventProcessor):
         try:
             # 1. Gestion du Timestamp (FILETIME)
             # Le champ 'date_time' (FILETIME) représente le 'Previous Last Time Executed'
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                es_timestamp = self._format_dt_to_es(dt_filetime)
-            else:
+            es_timestamp = self._filetime_to_es(event.get("date_time", {}).get("timestamp"))
+            if not es_timestamp:
                 # Fallback sur le timestamp plaso
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                es_timestamp = self._format_dt_to_es(dt_plaso)
+                es_timestamp = self._unix_micro_to_es(event.get("timestamp"))
 
             # 2. Renommer le descripteur de timestamp
             timestamp_type = event.pop("timestamp_desc", None)
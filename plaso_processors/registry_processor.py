@@ -12,6 +12,16 @@ class PlasoRegistryProcessor(BaseEventProcessor):
     ET parse les configurations spécifiques comme TimeZoneInformation.
     """
 
+    OUTPUT_SCHEMA = {
+        "key_path": "keyword",
+        "hive_type": "keyword",
+        "reg_value_name": "keyword",
+        "reg_value_data": "keyword",
+        "reg_value_type": "keyword",
+        "reg_configuration_raw": "text",
+        "origin": "keyword",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur Registre")
         self.HIVE_FILE_MAP = {
@@ -32,19 +42,21 @@ class PlasoRegistryProcessor(BaseEventProcessor):
                 return log_type
         return None
 
-    def process_event(self, event: dict):  # -> (dict, str) ou Generator
+    def process_batch(self, events: list) -> list:
+        """Traite un lot d'événements de Registre : les timestamps du lot sont convertis en une seule passe."""
+        return [self._process_event_in_batch(event, batch_timestamps)
+                for event, batch_timestamps in zip(events, self._batch_timestamps_to_es(events))]
+
+    def process_event(self, event: dict, batch_timestamps=None):  # -> (dict, str) ou Generator
         """
         Traite un événement de Registre de Plaso. Retourne un générateur de documents (dict, str).
+        'batch_timestamps' : couple (FILETIME, timestamp Plaso) déjà converti par process_batch.
         """
 
         # 1. Pré-traitement du Timestamp et de la Hive
         try:
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                es_timestamp = self._format_dt_to_es(dt_filetime)
-            else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                es_timestamp = self._format_dt_to_es(dt_plaso)
+            es_filetime, es_plaso = batch_timestamps or self._event_timestamps_to_es(event)
+            es_timestamp = es_filetime or es_plaso
 
             filename = event.get("filename", "")
             specific_type = self.get_specific_hive_type(filename)
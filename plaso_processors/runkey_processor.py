@@ -7,6 +7,11 @@ from .base_processor import BaseEventProcessor
 class PlasoRunKeyProcessor(BaseEventProcessor):
     """Processeur Plaso pour les clés de persistance Run/RunOnce (winreg/windows_run)."""
 
+    OUTPUT_SCHEMA = {
+        "key_path": "keyword",
+        "entries": "keyword",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur RunKeys")
 
@@ -15,12 +20,11 @@ class PlasoRunKeyProcessor(BaseEventProcessor):
         try:
             # 1. Gestion du Timestamp
             # Le 'date_time' (FILETIME) représente le LastWriteTime de la clé.
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                event["estimestamp"] = self._format_dt_to_es(dt_filetime)
+            es_filetime = self._filetime_to_es(event.get("date_time", {}).get("timestamp"))
+            if es_filetime:
+                event["estimestamp"] = es_filetime
             else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                event["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                event["estimestamp"] = self._unix_micro_to_es(event.get("timestamp"))
 
             # 2. Nettoyage
             # Le champ 'values' (contenant le nom et la data de la clé) sera conservé.
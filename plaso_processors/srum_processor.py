@@ -12,6 +12,25 @@ class PlasoSrumProcessor(BaseEventProcessor):
     garantir l'absence de conflits de mapping Elasticsearch.
     """
 
+    # Valeurs converties en chaînes : les compteurs redeviennent numériques à l'indexation (coercition ES)
+    OUTPUT_SCHEMA = {
+        "application": "keyword",
+        "identifier": "keyword",
+        "user_identifier": "keyword",
+        "interface_luid": "keyword",
+        "bytes_sent": "long",
+        "bytes_received": "long",
+        "foreground_cycle_time": "long",
+        "background_cycle_time": "long",
+        "foreground_bytes_read": "long",
+        "foreground_bytes_written": "long",
+        "background_bytes_read": "long",
+        "background_bytes_written": "long",
+        "face_time": "long",
+        "foreground_number_for_flushes": "long",
+        "foreground_number_for_write_operations": "long",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur SRUM (Mode: Force String)")
 
@@ -26,13 +45,12 @@ class PlasoSrumProcessor(BaseEventProcessor):
 
             # 2. Gestion du Timestamp (conserve le type date)
             ole_timestamp = event.get("date_time", {}).get("timestamp")
-            dt_ole = self._parse_ole_automation_date_to_dt(ole_timestamp)
+            es_ole = self._ole_automation_date_to_es(ole_timestamp)
 
-            if dt_ole:
-                processed_doc["estimestamp"] = self._format_dt_to_es(dt_ole)
+            if es_ole:
+                processed_doc["estimestamp"] = es_ole
             else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                processed_doc["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                processed_doc["estimestamp"] = self._unix_micro_to_es(event.get("timestamp"))
 
             # 3. Liste des champs Plaso internes à ignorer (ne pas inclure)
             plaso_fields_to_drop = [
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Conversion rapide des timestamps Plaso (FILETIME, Unix µs, OLE Automation, WebKit, ISO 8601 'Z')
+# directement en chaîne ISO 8601 pour Elasticsearch, sans passer par datetime/strptime/isoformat.
+# Tous les calculs se font en microsecondes entières depuis l'époque Unix (UTC) ; le préfixe
+# 'AAAA-MM-JJTHH:MM:SS.' est mis en cache par seconde (une timeline contient beaucoup d'événements
+# dans la même seconde).
+# Le résultat est identique, octet pour octet, à celui de BaseEventProcessor._format_dt_to_es appliqué
+# aux anciens helpers _parse_*_to_dt (mêmes arrondis, mêmes cas limites renvoyant None).
+
+import math
+import re
+from datetime import date, timedelta
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_US_PER_SECOND = 1000000
+_SECONDS_PER_DAY = 86400
+
+# Ordinal (date.toordinal) de l'époque Unix
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Décalage FILETIME (1601-01-01) / WebKit -> époque Unix, en microsecondes
+_EPOCH_1601_OFFSET_US = (_UNIX_EPOCH_ORDINAL - date(1601, 1, 1).toordinal()) * _SECONDS_PER_DAY * _US_PER_SECOND
+# Époque OLE Automation (1899-12-30), en microsecondes depuis l'époque Unix
+_OLE_EPOCH_US = (date(1899, 12, 30).toordinal() - _UNIX_EPOCH_ORDINAL) * _SECONDS_PER_DAY * _US_PER_SECOND
+
+# Bornes de datetime (années 1 à 9999) : au-delà, les anciens helpers renvoyaient None
+MIN_US = (date.min.toordinal() - _UNIX_EPOCH_ORDINAL) * _SECONDS_PER_DAY * _US_PER_SECOND
+MAX_US = (date.max.toordinal() - _UNIX_EPOCH_ORDINAL + 1) * _SECONDS_PER_DAY * _US_PER_SECOND - 1
+
+# Format EVTX 'SystemTime' (ex: 2023-05-01T12:34:56.1234567Z) ; les autres formes passent par strptime
+_ISO_Z_REGEX = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?Z", re.ASCII)
+
+# Conversion par lots (NumPy) : en dessous de cette taille, la boucle scalaire est plus rapide
+NUMPY_MIN_BATCH = 64
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+# FILETIME dont le quotient FILETIME / 10 est dans [2^52, 2^54[ (années ~1743 à ~2172) : sur cet intervalle,
+# l'arrondi de la division flottante est reproductible en arithmétique entière (voir _filetime_array_to_us)
+_FILETIME_ARRAY_MIN, _FILETIME_ARRAY_MAX = 10 * 2 ** 52, 10 * 2 ** 54 - 1
+
+SECOND_PREFIX_CACHE_SIZE = 65536
+_second_prefix_cache = {}
+_day_prefix_cache = {}
+
+
+def _day_prefix(day: int) -> str:
+    prefix = _day_prefix_cache.get(day)
+    if prefix is None:
+        prefix = date.fromordinal(_UNIX_EPOCH_ORDINAL + day).isoformat() + "T"
+        _day_prefix_cache[day] = prefix
+    return prefix
+
+
+def format_us(us: int) -> str:
+    """Formate des microsecondes Unix (dans [MIN_US, MAX_US]) en 'AAAA-MM-JJTHH:MM:SS.ffffffZ'."""
+    seconds, micro = divmod(us, _US_PER_SECOND)
+    prefix = _second_prefix_cache.get(seconds)
+    if prefix is None:
+        day, second_of_day = divmod(seconds, _SECONDS_PER_DAY)
+        hour, rest = divmod(second_of_day, 3600)
+        minute, second = divmod(rest, 60)
+        prefix = "%s%02d:%02d:%02d." % (_day_prefix(day), hour, minute, second)
+        if len(_second_prefix_cache) >= SECOND_PREFIX_CACHE_SIZE:
+            _second_prefix_cache.clear()
+        _second_prefix_cache[seconds] = prefix
+    return "%s%06dZ" % (prefix, micro)
+
+
+def _in_range(us):
+    return us if MIN_US <= us <= MAX_US else None
+
+
+def filetime_to_us(filetime_int):
+    """FILETIME (intervalles de 100 ns depuis 1601) -> µs Unix, ou None (mêmes règles que _parse_filetime_to_dt)."""
+    if not isinstance(filetime_int, int): return None
+    try:
+        # Division flottante puis arrondi au pair, comme timedelta(microseconds=filetime_int / 10)
+        return _in_range(round(filetime_int / 10) - _EPOCH_1601_OFFSET_US)
+    except (OverflowError, ValueError):
+        return None
+
+
+def unix_micro_to_us(unix_micro):
+    """Timestamp Unix (µs) -> µs Unix, ou None (mêmes règles que _parse_unix_micro_to_dt)."""
+    if not isinstance(unix_micro, int): return None
+    try:
+        # Reproduit datetime.fromtimestamp(unix_micro / 1e6) : passage par un flottant en secondes,
+        # partie fractionnaire arrondie au pair à la microseconde
+        fraction, whole = math.modf(unix_micro / 1e6)
+        micro = round(fraction * 1e6)
+        seconds = int(whole)
+        if micro >= _US_PER_SECOND:
+            seconds, micro = seconds + 1, micro - _US_PER_SECOND
+        elif micro < 0:
+            seconds, micro = seconds - 1, micro + _US_PER_SECOND
+        return _in_range(seconds * _US_PER_SECOND + micro)
+    except (OverflowError, ValueError):
+        return None
+
+
+def ole_automation_date_to_us(ole_float):
+    """OLE Automation Date (jours depuis 1899-12-30) -> µs Unix, ou None."""
+    if not isinstance(ole_float, (float, int)): return None
+    try:
+        # L'arrondi de timedelta(days=float) est conservé tel quel
+        delta = timedelta(days=ole_float)
+    except (OverflowError, ValueError):
+        return None
+    return _in_range(_OLE_EPOCH_US + (delta.days * _SECONDS_PER_DAY + delta.seconds) * _US_PER_SECOND
+                     + delta.microseconds)
+
+
+def webkit_to_us(webkit_time):
+    """WebKitTime (µs depuis 1601) -> µs Unix, ou None (équivalent de epoch_1601 + timedelta(microseconds=...))."""
+    try:
+        if isinstance(webkit_time, int):
+            microseconds = webkit_time
+        elif isinstance(webkit_time, float):
+            microseconds = round(webkit_time)
+        else:
+            return None
+        return _in_range(microseconds - _EPOCH_1601_OFFSET_US)
+    except (OverflowError, ValueError):
+        return None
+
+
+def iso_z_to_us(iso_string):
+    """
+    Chaîne ISO 8601 UTC terminée par 'Z' (format EVTX SystemTime) -> µs Unix.
+    Retourne None si la chaîne n'a pas exactement cette forme : l'appelant doit alors
+    se replier sur _parse_iso_string_to_dt (décalages horaires, valeurs invalides...).
+    """
+    if not isinstance(iso_string, str): return None
+    match = _ISO_Z_REGEX.fullmatch(iso_string)
+    if match is None: return None
+    year, month, day, hour, minute, second, fraction = match.groups()
+    hour, minute, second = int(hour), int(minute), int(second)
+    if hour > 23 or minute > 59 or second > 59: return None
+    try:
+        ordinal = date(int(year), int(month), int(day)).toordinal()
+    except ValueError:
+        return None
+    # Au-delà de 6 chiffres, la fraction est tronquée (pas arrondie), comme dans _parse_iso_string_to_dt
+    micro = int(fraction[:6].ljust(6, "0")) if fraction else 0
+    seconds = (ordinal - _UNIX_EPOCH_ORDINAL) * _SECONDS_PER_DAY + hour * 3600 + minute * 60 + second
+    return seconds * _US_PER_SECOND + micro
+
+
+def filetime_to_es(filetime_int):
+    us = filetime_to_us(filetime_int)
+    return None if us is None else format_us(us)
+
+
+def unix_micro_to_es(unix_micro):
+    us = unix_micro_to_us(unix_micro)
+    return None if us is None else format_us(us)
+
+
+def ole_automation_date_to_es(ole_float):
+    us = ole_automation_date_to_us(ole_float)
+    return None if us is None else format_us(us)
+
+
+def webkit_to_es(webkit_time):
+    us = webkit_to_us(webkit_time)
+    return None if us is None else format_us(us)
+
+
+# --- CONVERSION PAR LOTS (NumPy, optionnel) ---
+# Mêmes résultats que les fonctions scalaires ; les valeurs que le calcul vectorisé ne couvre pas
+# (non entières, hors int64, hors intervalle exact) passent par la fonction scalaire.
+
+def _split_int64(values, low=_INT64_MIN, high=_INT64_MAX):
+    """Sépare les entiers (hors bool) de [low, high] des autres valeurs : retourne (positions, entiers, autres positions)."""
+    positions, ints, other_positions = [], [], []
+    for position, value in enumerate(values):
+        if type(value) is int and low <= value <= high:
+            positions.append(position)
+            ints.append(value)
+        else:
+            other_positions.append(position)
+    return positions, ints, other_positions
+
+
+def _format_us_array(us_array) -> list:
+    """Formate un tableau int64 de µs Unix (déjà dans [MIN_US, MAX_US]) en chaînes ISO 'Z'."""
+    strings = numpy.datetime_as_string(us_array.astype("datetime64[us]"), unit="us")
+    return [string + "Z" for string in strings.tolist()]
+
+
+def _filetime_array_to_us(filetimes):
+    """
+    round(FILETIME / 10) sur un tableau int64, en arithmétique entière.
+    Python arrondit d'abord le quotient exact au flottant le plus proche (pas de 1 sur [2^52, 2^53[,
+    de 2 sur [2^53, 2^54[), au pair en cas d'égalité, puis round() ne change plus rien.
+    """
+    quotient, remainder = numpy.divmod(filetimes, 10)
+    # Pas de 1 : arrondi au pair de FILETIME / 10
+    step_one = quotient + ((remainder > 5) | ((remainder == 5) & (quotient % 2 == 1)))
+    # Pas de 2 : arrondi de FILETIME / 20 au pair, multiplié par 2
+    half_quotient, half_remainder = numpy.divmod(filetimes, 20)
+    step_two = 2 * (half_quotient + ((half_remainder > 10) | ((half_remainder == 10) & (half_quotient % 2 == 1))))
+    return numpy.where(filetimes >= 10 * 2 ** 53, step_two, step_one) - _EPOCH_1601_OFFSET_US
+
+
+def _unix_micro_array_to_us(unix_micros):
+    """Même calcul que unix_micro_to_us (flottant en secondes, modf, arrondi au pair) sur un tableau int64."""
+    fraction, whole = numpy.modf(unix_micros.astype(numpy.float64) / 1e6)
+    micro = numpy.rint(fraction * 1e6).astype(numpy.int64)
+    seconds = whole.astype(numpy.int64)
+    seconds = seconds + (micro >= _US_PER_SECOND) - (micro < 0)
+    micro = numpy.where(micro >= _US_PER_SECOND, micro - _US_PER_SECOND,
+                        numpy.where(micro < 0, micro + _US_PER_SECOND, micro))
+    return seconds * _US_PER_SECOND + micro
+
+
+def _convert_many(values, scalar_func, array_func, low=_INT64_MIN, high=_INT64_MAX) -> list:
+    if numpy is None or len(values) < NUMPY_MIN_BATCH:
+        return [scalar_func(value) for value in values]
+    positions, ints, other_positions = _split_int64(values, low, high)
+    if len(positions) < NUMPY_MIN_BATCH:
+        return [scalar_func(value) for value in values]
+
+    results = [None] * len(values)
+    us_array = array_func(numpy.array(ints, dtype=numpy.int64))
+    in_range = (us_array >= MIN_US) & (us_array <= MAX_US)
+    formatted = iter(_format_us_array(us_array[in_range]))
+    for position, valid in zip(positions, in_range.tolist()):
+        results[position] = next(formatted) if valid else None
+    for position in other_positions:
+        results[position] = scalar_func(values[position])
+    return results
+
+
+def filetime_to_es_many(values) -> list:
+    """Équivalent de [filetime_to_es(v) for v in values], vectorisé avec NumPy s'il est installé."""
+    return _convert_many(values, filetime_to_es, _filetime_array_to_us, _FILETIME_ARRAY_MIN, _FILETIME_ARRAY_MAX)
+
+
+def unix_micro_to_es_many(values) -> list:
+    """Équivalent de [unix_micro_to_es(v) for v in values], vectorisé avec NumPy s'il est installé."""
+    return _convert_many(values, unix_micro_to_es, _unix_micro_array_to_us)
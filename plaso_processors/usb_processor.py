@@ -7,6 +7,16 @@ from .base_processor import BaseEventProcessor
 class PlasoUsbProcessor(BaseEventProcessor):
     """Processeur Plaso pour les artefacts USB (winreg/windows_usb_devices)."""
 
+    OUTPUT_SCHEMA = {
+        "key_path": "keyword",
+        "subkey_name": "keyword",
+        "device_type": "keyword",
+        "vendor": "keyword",
+        "product": "keyword",
+        "revision": "keyword",
+        "serial": "keyword",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur USB Devices")
 
@@ -15,12 +25,11 @@ class PlasoUsbProcessor(BaseEventProcessor):
         try:
             # 1. Gestion du Timestamp
             # Le 'date_time' (FILETIME) est le LastWriteTime de la clé de périphérique.
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
-            if dt_filetime:
-                event["estimestamp"] = self._format_dt_to_es(dt_filetime)
+            es_filetime = self._filetime_to_es(event.get("date_time", {}).get("timestamp"))
+            if es_filetime:
+                event["estimestamp"] = es_filetime
             else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                event["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                event["estimestamp"] = self._unix_micro_to_es(event.get("timestamp"))
 
             # 2. Nettoyage
             # Les champs 'key_path', 'device_type', 'serial_number' etc. seront conservés.
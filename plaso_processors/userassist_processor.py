@@ -7,6 +7,16 @@ from .base_processor import BaseEventProcessor
 class PlasoUserAssistProcessor(BaseEventProcessor):
     """Processeur Plaso pour les événements UserAssist (winreg/userassist)."""
 
+    OUTPUT_SCHEMA = {
+        "key_path": "keyword",
+        "value_name": "keyword",
+        "userassist_timestamp_type": "keyword",
+        "entry_index": "integer",
+        "number_of_executions": "integer",
+        "application_focus_count": "integer",
+        "application_focus_duration": "long",
+    }
+
     def __init__(self):
         print("  [*] Initialisation du processeur UserAssist")
 
@@ -19,14 +29,13 @@ class PlasoUserAssistProcessor(BaseEventProcessor):
             # Nous allons prioriser le FILETIME (LastWriteTime) s'il existe,
             # sinon, utiliser le timestamp de l'événement.
 
-            dt_filetime = self._parse_filetime_to_dt(event.get("date_time", {}).get("timestamp"))
+            es_filetime = self._filetime_to_es(event.get("date_time", {}).get("timestamp"))
 
-            if dt_filetime:
-                event["estimestamp"] = self._format_dt_to_es(dt_filetime)
+            if es_filetime:
+                event["estimestamp"] = es_filetime
 
             else:
-                dt_plaso = self._parse_unix_micro_to_dt(event.get("timestamp"))
-                event["estimestamp"] = self._format_dt_to_es(dt_plaso)
+                event["estimestamp"] = self._unix_micro_to_es(event.get("timestamp"))
 
             # 2. Renommer le descripteur de timestamp
             if "timestamp_desc" in event:
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import fnmatch
+import json
+import re
+import traceback
+from collections import Counter
+
+from elastic_uploader import build_index_template, index_template_name
+from plaso_processors.output_schema import FIELD_TYPES, flatten_properties, nest_properties
+
+# Chaînes reconnues comme dates par le mapping dynamique d'Elasticsearch (date_detection)
+DATE_PATTERN = re.compile(r"^\d{4}[-/]\d{2}[-/]\d{2}([T ]\d{2}:\d{2}(:\d{2}([.,]\d{1,9})?)?)?(Z|[+-]\d{2}:?\d{2})?$")
+# Chaînes converties sans erreur en nombre par un champ numérique (coerce)
+NUMERIC_PATTERN = re.compile(r"^\s*[+-]?\d+(\.\d+)?([eE][+-]?\d+)?\s*$")
+
+SCALAR_KINDS = frozenset({"boolean", "long", "double", "date", "string", "numeric_string"})
+NUMERIC_KINDS = frozenset({"long", "double", "numeric_string"})
+
+# Mapping dynamique : le premier document fixe le type. Un champ n'est sûr que si ses types observés sont
+# compatibles quel que soit l'ordre d'arrivée des documents.
+DYNAMIC_COMPATIBLE_KINDS = (NUMERIC_KINDS, frozenset({"string", "numeric_string"}))
+
+# Mapping explicite : types observés acceptés par chaque type Elasticsearch
+ACCEPTED_KINDS = {
+    "keyword": SCALAR_KINDS,
+    "text": SCALAR_KINDS,
+    "ip": SCALAR_KINDS - {"boolean", "double"},
+    "long": NUMERIC_KINDS,
+    "integer": NUMERIC_KINDS,
+    "double": NUMERIC_KINDS,
+    "date": frozenset({"date", "long", "numeric_string"}),
+    "boolean": frozenset({"boolean"}),
+    "flattened": SCALAR_KINDS | {"object"},
+}
+
+
+def value_kind(value) -> str:
+    """Type d'une valeur JSON tel que le verrait le mapping dynamique (les chaînes numériques sont distinguées)."""
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "long"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, dict):
+        return "object"
+    value = str(value)
+    if NUMERIC_PATTERN.match(value):
+        return "numeric_string"
+    if DATE_PATTERN.match(value):
+        return "date"
+    return "string"
+
+
+class FieldStats:
+    """Types observés d'un champ : nombre de valeurs par type, quelques exemples par type, longueur maximale."""
+
+    __slots__ = ("kinds", "samples", "max_length")
+
+    def __init__(self):
+        self.kinds = Counter()
+        self.samples = {}
+        self.max_length = 0
+
+    def record(self, kind: str, value, sample_count: int):
+        self.kinds[kind] += 1
+        if kind == "object":
+            return
+        self.max_length = max(self.max_length, len(str(value)))
+        samples = self.samples.setdefault(kind, [])
+        sample = repr(value)[:80]
+        if len(samples) < sample_count and sample not in samples:
+            samples.append(sample)
+
+    def describe(self) -> str:
+        return ", ".join(f"{kind} x{count}" + (f" (ex: {', '.join(self.samples[kind])})"
+                                               if self.samples.get(kind) else "")
+                         for kind, count in self.kinds.most_common())
+
+
+class SchemaPreflight:
+    """
+    Remplace ElasticUploader (--preflight) : les actions produites par les processeurs sont analysées au lieu
+    d'être envoyées. Relève le type de chaque champ par index consolidé, signale les champs qui seraient rejetés
+    (ou ignorés) par le mapping des templates, et écrit un fichier de templates au mapping inféré, réutilisable
+    avec --mapping-file. Mémoire bornée : quelques exemples par type et au plus 'max_fields' champs par index,
+    quelle que soit la taille de la timeline.
+    """
+
+    mode = "pré-analyse du schéma"
+
+    # Limite du nombre de champs d'un index (index.mapping.total_fields.limit des templates)
+    TOTAL_FIELDS_LIMIT = 2000
+
+    # Nombre maximal de champs affichés par catégorie de problème et par index
+    MAX_REPORTED_FIELDS = 20
+
+    def __init__(self, output_path: str, sample_count: int = 3, max_fields: int = 20000):
+        self.output_path = output_path
+        self.sample_count = sample_count
+        self.max_fields = max_fields
+        self._templates = {}  # nom de catégorie -> (pattern, priorité, mapping explicite ou None)
+        self._template_by_index = {}
+        self._fields = {}  # nom de catégorie -> {chemin: FieldStats}
+        self.doc_counts = Counter()
+        self.overflow = Counter()  # champs ignorés au-delà de max_fields, par catégorie
+
+    def setup_templates(self, priority: int = 400, mappings: dict = None, data_streams: dict = None, **kwargs):
+        """
+        Relève les templates qui seraient installés ; le mapping explicite sert de référence à l'analyse
+        ('data_streams' sans effet : @timestamp est déjà déclaré par le schéma du flux de données).
+        """
+        for name, pattern in kwargs.items():
+            self._templates[name] = (pattern, priority, (mappings or {}).get(name))
+
+    def prepare_bulk_load(self):
+        """Sans objet : rien n'est envoyé."""
+
+    def restore_after_bulk_load(self):
+        """Sans objet : rien n'est envoyé."""
+
+    def _category(self, index_name: str) -> str:
+        try:
+            return self._template_by_index[index_name]
+        except KeyError:
+            pass
+        category = next((name for name, (pattern, _, _) in self._templates.items()
+                         if fnmatch.fnmatchcase(index_name, pattern)), index_name)
+        self._template_by_index[index_name] = category
+        return category
+
+    def bulk_upload(self, actions_generator, chunk_size: int, checkpoint=None):
+        """Analyse les actions au lieu de les envoyer, puis affiche le rapport et écrit les templates inférés."""
+        print(f"\nPré-analyse du schéma : aucun document n'est envoyé (templates inférés : '{self.output_path}')...")
+        declared = {name: flatten_properties(mappings) if mappings else {}
+                    for name, (_, _, mappings) in self._templates.items()}
+        try:
+            for action in actions_generator:
+                category = self._category(action["_index"])
+                self.doc_counts[category] += 1
+                fields = self._fields.setdefault(category, {})
+                self._observe(fields, declared.get(category, {}), category, action["_source"], "")
+            self.print_report(declared)
+            self.write_templates(declared)
+        except Exception:
+            print(f"Une erreur critique est survenue durant la pré-analyse : {traceback.format_exc()}")
+
+    def _observe(self, fields: dict, declared: dict, category: str, value, path: str):
+        if value is None:
+            return
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                self._observe(fields, declared, category, item, path)
+            return
+        kind = value_kind(value)
+        if path:
+            stats = fields.get(path)
+            if stats is None:
+                if len(fields) >= self.max_fields:
+                    self.overflow[category] += 1
+                    return
+                stats = fields[path] = FieldStats()
+            stats.record(kind, value, self.sample_count)
+        if kind == "object" and path not in declared:
+            # Un champ simple déclaré (flattened, keyword...) reçoit l'objet entier : pas de descente
+            for key, item in value.items():
+                self._observe(fields, declared, category, item, f"{path}.{key}" if path else key)
+
+    # --- Analyse ---
+    def _problems(self, category: str, declared: dict) -> (list, list):
+        """Retourne (champs rejetés, champs non indexés) : listes de (chemin, explication, FieldStats)."""
+        _, _, mappings = self._templates.get(category, (None, None, None))
+        fields = self._fields.get(category, {})
+        rejected, not_indexed = [], []
+        if not mappings:
+            # Mapping dynamique : types incompatibles selon l'ordre d'arrivée des documents
+            for path, stats in sorted(fields.items()):
+                kinds = set(stats.kinds)
+                if len(kinds) > 1 and not any(kinds <= compatible for compatible in DYNAMIC_COMPATIBLE_KINDS):
+                    rejected.append((path, "types incompatibles (mapping dynamique)", stats))
+            return rejected, not_indexed
+        declared_objects = self._parent_paths(declared)
+        strict = mappings.get("dynamic") == "strict"
+        for path, stats in sorted(fields.items()):
+            field = declared.get(path)
+            kinds = set(stats.kinds)
+            if field is None:
+                if path in declared_objects:
+                    if kinds - {"object"}:
+                        rejected.append((path, "valeur simple pour un objet déclaré", stats))
+                elif not self._is_under_undeclared(path, declared, declared_objects):
+                    (rejected if strict else not_indexed).append((path, "champ non déclaré", stats))
+                continue
+            unexpected = kinds - ACCEPTED_KINDS.get(field.get("type"), SCALAR_KINDS)
+            if not unexpected:
+                continue
+            explanation = f"déclaré {field.get('type')}"
+            if "object" not in unexpected and field.get("ignore_malformed"):
+                not_indexed.append((path, explanation + " (valeurs mal formées ignorées)", stats))
+            else:
+                rejected.append((path, explanation, stats))
+        return rejected, not_indexed
+
+    @staticmethod
+    def _parent_paths(fields: dict) -> set:
+        """Chemins des objets contenant les champs simples 'fields' ("a.b.c" -> "a.b", "a")."""
+        return {path.rsplit(".", i)[0] for path in fields for i in range(1, path.count(".") + 1)}
+
+    @staticmethod
+    def _is_under_undeclared(path: str, declared: dict, declared_objects: set) -> bool:
+        """Vrai si un parent du champ est lui-même un champ non déclaré (seul le plus haut est signalé)."""
+        parent = path.rsplit(".", 1)[0] if "." in path else None
+        return parent is not None and parent not in declared and parent not in declared_objects
+
+    def print_report(self, declared: dict):
+        print(f"\n[*] Pré-analyse du schéma : {sum(self.doc_counts.values())} documents analysés")
+        total_rejected = 0
+        for category, doc_count in sorted(self.doc_counts.items()):
+            fields = self._fields.get(category, {})
+            leaf_count = sum(1 for stats in fields.values() if set(stats.kinds) - {"object"})
+            pattern, _, mappings = self._templates.get(category, (category, None, None))
+            mapping_info = f"mapping explicite, dynamic: {mappings['dynamic']}" if mappings else "mapping dynamique"
+            print(f"\nIndex '{pattern}' : {doc_count} documents, {leaf_count} champs observés ({mapping_info})")
+            if not mappings and leaf_count > self.TOTAL_FIELDS_LIMIT:
+                print(f"    [LIMITE] {leaf_count} champs > index.mapping.total_fields.limit ({self.TOTAL_FIELDS_LIMIT}) : "
+                      f"les documents apportant de nouveaux champs seront rejetés")
+            if self.overflow[category]:
+                print(f"    [LIMITE] Plus de {self.max_fields} champs distincts : {self.overflow[category]} valeurs "
+                      f"non analysées")
+            rejected, not_indexed = self._problems(category, declared.get(category, {}))
+            total_rejected += len(rejected)
+            self._print_fields("REJET", rejected)
+            self._print_fields("NON INDEXÉ", not_indexed)
+        if total_rejected:
+            print(f"\n[!] {total_rejected} champs provoqueraient des rejets bulk : corriger le processeur ou son "
+                  f"OUTPUT_SCHEMA, ou ingérer avec --mapping-file '{self.output_path}'.")
+        else:
+            print("\n[*] Aucun champ ne provoquerait de rejet bulk.")
+
+    def _print_fields(self, label: str, problems: list):
+        for path, explanation, stats in problems[:self.MAX_REPORTED_FIELDS]:
+            print(f"    [{label}] {path} : {explanation} - {stats.describe()}")
+        if len(problems) > self.MAX_REPORTED_FIELDS:
+            print(f"    [{label}] ... et {len(problems) - self.MAX_REPORTED_FIELDS} autres champs")
+
+    # --- Templates inférés ---
+    def inferred_mappings(self, category: str, declared: dict) -> dict:
+        """
+        Mapping explicite de l'index : champs déclarés conservés tels quels, champs observés non déclarés typés
+        d'après leurs valeurs. Les champs déclarés qui provoqueraient des rejets (et tout ce qu'ils contiennent)
+        et les champs à la fois objet et valeur simple restent non mappés (dynamic: false).
+        """
+        _, _, mappings = self._templates.get(category, (None, None, None))
+        declared_paths = set(declared) | self._parent_paths(declared)
+        rejected = [path for path, _, _ in self._problems(category, declared)[0] if path in declared_paths]
+        fields = {path: field for path, field in declared.items()
+                  if not any(path == bad or path.startswith(bad + ".") for bad in rejected)}
+        declared_objects = self._parent_paths(fields)
+        observed = self._fields.get(category, {})
+        # Objet parfois valeur simple : ni lui ni ses sous-champs ne sont mappés
+        unmapped = {path for path, stats in observed.items() if "object" in stats.kinds and len(stats.kinds) > 1}
+        for path, stats in sorted(observed.items()):
+            kinds = set(stats.kinds)
+            if path in fields or path in declared_objects or "object" in kinds:
+                continue
+            parents = {path.rsplit(".", i)[0] for i in range(1, path.count(".") + 1)}
+            if parents & unmapped or any(parent in fields for parent in parents):
+                continue  # Sous un champ simple déclaré ou déjà inféré, ou sous un objet non mappé
+            if kinds <= {"long"}:
+                field_type = "long"
+            elif kinds <= {"long", "double"}:
+                field_type = "double"
+            elif kinds <= {"boolean"}:
+                field_type = "boolean"
+            elif kinds <= {"date"}:
+                field_type = "date"
+            else:
+                field_type = "text" if stats.max_length > 1024 else "keyword"
+            fields[path] = FIELD_TYPES[field_type]
+        dynamic = mappings["dynamic"] if mappings else "false"
+        return {"dynamic": dynamic, "properties": nest_properties(fields)}
+
+    def write_templates(self, declared: dict):
+        templates = {index_template_name(name): build_index_template(
+                         pattern, priority, mappings=self.inferred_mappings(name, declared.get(name, {})))
+                     for name, (pattern, priority, _) in self._templates.items()}
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            json.dump(templates, f, indent=2)
+        print(f"Templates inférés enregistrés dans '{self.output_path}' ({len(templates)} templates).")
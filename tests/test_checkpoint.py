@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from checkpoint import CheckpointError, CheckpointTracker
+
+
+class CheckpointSettingsTest(unittest.TestCase):
+    """--resume refuse un checkpoint écrit avec une autre opération bulk ou sans _id stables."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.timeline_path = os.path.join(directory.name, "timeline.jsonl")
+        with open(self.timeline_path, "w", encoding="utf-8") as f:
+            f.write('{"parser": "winevtx"}\n' * 10)
+        self.checkpoint_path = os.path.join(directory.name, "case.ckpt")
+        self.read_range = (0, os.path.getsize(self.timeline_path))
+
+    def _tracker(self, settings: dict) -> CheckpointTracker:
+        return CheckpointTracker(self.checkpoint_path, self.timeline_path, self.read_range, settings=settings)
+
+    def test_resume_with_same_settings(self):
+        tracker = self._tracker({"op_type": "create", "doc_ids": True})
+        tracker.offset = 22
+        tracker.save()
+        self.assertEqual(self._tracker({"op_type": "create", "doc_ids": True}).load_resume_offset(), 22)
+
+    def test_resume_with_other_settings_is_refused(self):
+        self._tracker({"op_type": "create", "doc_ids": True}).save()
+        with self.assertRaises(CheckpointError):
+            self._tracker({"op_type": "index", "doc_ids": False}).load_resume_offset()
+
+    def test_checkpoint_without_settings_is_accepted(self):
+        tracker = self._tracker({})
+        tracker.save()
+        self.assertEqual(self._tracker({"op_type": "index", "doc_ids": False}).load_resume_offset(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
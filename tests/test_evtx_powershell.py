@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+
+from timeline_transformer import TimelineTransformer
+
+HOST_ID = "6e1a5d3b-8c2f-4b7e-9a41-3f0d2c6b8e15"
+
+SCRIPT_BLOCK_XML = (
+    '<Event xmlns="http://schemas.microsoft.com/win/2004/08/events/event"><System>'
+    '<Provider Name="Microsoft-Windows-PowerShell"/><EventID>4104</EventID><Level>5</Level>'
+    '<TimeCreated SystemTime="2023-05-27T20:25:57.1096275Z"/><EventRecordID>1</EventRecordID>'
+    '<Channel>Microsoft-Windows-PowerShell/Operational</Channel><Computer>WS01.corp.local</Computer></System>'
+    '<EventData><Data Name="MessageNumber">1</Data><Data Name="MessageTotal">1</Data>'
+    '<Data Name="ScriptBlockText">Get-Process</Data>'
+    '<Data Name="ScriptBlockId">0b8f3a52-1d6c-4f0e-b2a7-5c9e4d1f7a63</Data>'
+    '<Data Name="Path">C:\\Temp\\test.ps1</Data><Data Name="HostName">ConsoleHost</Data>'
+    f'<Data Name="HostId">{HOST_ID}</Data></EventData></Event>')
+
+
+def script_block_line() -> str:
+    """Ligne de timeline Plaso d'un événement PowerShell 4104 (Script Block Logging)."""
+    return json.dumps({"data_type": "windows:evtx:record", "parser": "winevtx", "timestamp": 1685219157109627,
+                       "timestamp_desc": "Content Modification Time", "event_identifier": 4104,
+                       "source_name": "Microsoft-Windows-PowerShell",
+                       "filename": "C:\\Windows\\System32\\winevt\\Logs\\"
+                                   "Microsoft-Windows-PowerShell%4Operational.evtx",
+                       "_event_values_hash": "hash-4104", "xml_string": SCRIPT_BLOCK_XML})
+
+
+class EvtxPowershellScriptBlockTest(unittest.TestCase):
+
+    def test_host_id_in_powershell_host(self):
+        # HostId est un GUID : il est dans powershell.host.id (comme les événements 400 / 600), plus dans process.pid
+        actions = list(TimelineTransformer("test").transform_line(script_block_line(), "0"))
+        self.assertEqual(len(actions), 1)
+        parsed = actions[0]["_source"]["winlog_parsed"]
+        self.assertEqual(parsed["event"]["action"], "powershell_script_block_execution")
+        self.assertEqual(parsed["powershell"]["host"]["id"], HOST_ID)
+        self.assertEqual(parsed["powershell"]["script_block_text"], "Get-Process")
+        self.assertEqual(parsed["process"], {"name": "ConsoleHost"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+
+from timeline_transformer import TimelineTransformer
+
+EVENT_XML = (
+    '<Event xmlns="http://schemas.microsoft.com/win/2004/08/events/event"><System>'
+    '<Provider Name="{provider}"/><EventID>{event_id}</EventID><Level>0</Level>'
+    '<TimeCreated SystemTime="2023-05-27T20:25:57.1096275Z"/><EventRecordID>1</EventRecordID>'
+    '<Channel>{channel}</Channel><Computer>WS01.corp.local</Computer></System><EventData>'
+    '<Data Name="TargetUserName">user45</Data><Data Name="TargetDomainName">CORP</Data>'
+    '<Data Name="LogonType">2</Data><Data Name="IpAddress">10.0.186.28</Data><Data Name="IpPort">0</Data>'
+    '</EventData></Event>')
+
+
+def evtx_line(event_id: int, channel: str, with_xml: bool = True) -> str:
+    """Ligne de timeline Plaso d'un événement EVTX (journal 'channel')."""
+    event = {"data_type": "windows:evtx:record", "parser": "winevtx", "timestamp": 1685219157109627,
+             "timestamp_desc": "Content Modification Time", "event_identifier": event_id,
+             "source_name": "Microsoft-Windows-Security-Auditing",
+             "filename": f"C:\\Windows\\System32\\winevt\\Logs\\{channel}.evtx",
+             "_event_values_hash": f"hash-{event_id}"}
+    if with_xml:
+        event["xml_string"] = EVENT_XML.format(provider=event["source_name"], event_id=event_id, channel=channel)
+    return json.dumps(event)
+
+
+# Événement avec handler dédié (4624), événement générique et événement sans XML
+TIMELINE_LINES = [evtx_line(4624, "Security"), evtx_line(9999, "System"), evtx_line(4624, "Security", False)]
+
+
+class EvtxRawRetentionTest(unittest.TestCase):
+
+    def _documents(self, raw_retention: str) -> list:
+        transformer = TimelineTransformer("test", evtx_raw_retention=raw_retention)
+        documents = []
+        for line_number, line in enumerate(TIMELINE_LINES):
+            documents.extend(action["_source"] for action in transformer.transform_line(line, str(line_number)))
+        self.assertEqual(len(documents), len(TIMELINE_LINES))
+        return documents
+
+    def test_raw_line_dropped_below_full(self):
+        for raw_retention in ("none", "event_data"):
+            with self.subTest(raw_retention=raw_retention):
+                for document in self._documents(raw_retention):
+                    self.assertNotIn("event_raw_string", document)
+                    self.assertNotIn("Data_json_string", document)
+
+    def test_event_data_kept_with_event_data(self):
+        handled, generic, _ = self._documents("event_data")
+        self.assertIn("event_data_str", handled["winlog_parsed"]["winlog"])
+        self.assertIn("event_data_str", generic["winlog_parsed"]["winlog"])
+
+    def test_raw_line_kept_with_full(self):
+        for document in self._documents("full"):
+            self.assertIn("event_raw_string", document)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+
+from plaso_processors import json_codec
+from timeline_transformer import TimelineTransformer
+
+# Événement générique (sans handler dédié) aux valeurs non ASCII : Data_json_string et event_data_str
+EVENT_XML = (
+    '<Event xmlns="http://schemas.microsoft.com/win/2004/08/events/event"><System>'
+    '<Provider Name="Application Error"/><EventID>1000</EventID><Level>2</Level>'
+    '<TimeCreated SystemTime="2023-05-27T20:25:57.1096275Z"/><EventRecordID>7</EventRecordID>'
+    '<Channel>Application</Channel><Computer>WS01.corp.local</Computer></System><EventData>'
+    '<Data Name="AppName">Éditeur.exe</Data><Data Name="Path">C:\\Users\\José\\报告.docx</Data>'
+    '<Data Name="Code">0xc0000005</Data></EventData></Event>')
+
+TIMELINE_LINE = json.dumps({
+    "data_type": "windows:evtx:record", "parser": "winevtx", "timestamp": 1685219157109627,
+    "timestamp_desc": "Content Modification Time", "event_identifier": 1000, "source_name": "Application Error",
+    "filename": "C:\\Windows\\System32\\winevt\\Logs\\Application.evtx", "xml_string": EVENT_XML})
+
+STORED_STRING_FIELDS = ("Data_json_string", "event_data_str")
+
+
+def stored_strings(raw_retention: str) -> dict:
+    """Champs texte JSON stockés dans le document EVTX de TIMELINE_LINE."""
+    transformer = TimelineTransformer("test", evtx_raw_retention=raw_retention)
+    document = transformer.transform_line(TIMELINE_LINE, "1")[0]["_source"]
+    values = {"Data_json_string": document.get("Data_json_string"),
+              "event_data_str": document["winlog_parsed"]["winlog"].get("event_data_str")}
+    return {name: value for name, value in values.items() if value is not None}
+
+
+class StoredJsonStringsTest(unittest.TestCase):
+    """Les champs texte JSON des documents ne dépendent pas du backend de json_codec (format json.dumps)."""
+
+    def tearDown(self):
+        json_codec.set_backend("auto")
+
+    def test_backends_give_identical_stored_strings(self):
+        for raw_retention in ("full", "event_data"):
+            results = {}
+            for backend in json_codec.available_backends():
+                json_codec.set_backend(backend)
+                results[backend] = stored_strings(raw_retention)
+            with self.subTest(raw_retention=raw_retention):
+                self.assertTrue(results["stdlib"])
+                for backend, strings in results.items():
+                    self.assertEqual(strings, results["stdlib"], backend)
+
+    def test_stored_strings_use_stdlib_defaults(self):
+        for backend in json_codec.available_backends():
+            json_codec.set_backend(backend)
+            for name, value in stored_strings("full").items():
+                with self.subTest(backend=backend, field=name):
+                    self.assertEqual(value, json.dumps(json.loads(value)))
+                    self.assertNotIn("É", value)
+
+
+if __name__ == "__main__":
+    unittest.main()
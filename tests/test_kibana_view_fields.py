@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import unittest
+
+from plaso_processors.output_schema import flatten_properties
+from timeline_transformer import TimelineTransformer
+
+ALL_VIEW_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "kibana_view",
+                             "all_view.ndjson")
+
+# Clés d'une requête de filtre Kibana dont les clés filles sont des noms de champs
+FIELD_QUERY_KEYS = ("match_phrase", "match", "term", "terms", "range", "prefix", "wildcard")
+
+
+def filter_fields(node, fields: set):
+    """Champs référencés par les filtres d'une recherche enregistrée (filtres combinés compris)."""
+    if isinstance(node, list):
+        for item in node:
+            filter_fields(item, fields)
+    elif isinstance(node, dict):
+        for key, value in node.items():
+            if key in FIELD_QUERY_KEYS and isinstance(value, dict):
+                fields.update(value)
+            elif key == "exists" and isinstance(value, dict):
+                fields.add(value["field"])
+            elif key == "meta" and isinstance(value, dict):
+                fields.update(value[name] for name in ("key", "field") if isinstance(value.get(name), str))
+            filter_fields(value, fields)
+
+
+def mapped_fields(mappings: dict) -> (set, set):
+    """Champs interrogeables d'un mapping (sous-champs '.keyword' compris) et champs 'flattened'."""
+    fields, flattened = set(), set()
+    for path, field in flatten_properties(mappings).items():
+        fields.add(path)
+        fields.update(f"{path}.{name}" for name in field.get("fields", {}))
+        if field.get("type") == "flattened":
+            flattened.add(path)
+    return fields, flattened
+
+
+def load_saved_objects() -> list:
+    with open(ALL_VIEW_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def used_fields(saved_objects: list) -> dict:
+    """{titre de la vue de données: {champ: [objets qui l'utilisent]}} pour all_view.ndjson."""
+    titles = {obj["id"]: obj["attributes"]["title"] for obj in saved_objects if obj.get("type") == "index-pattern"}
+    used = {}
+    for obj in saved_objects:
+        attributes = obj.get("attributes", {})
+        if obj.get("type") == "index-pattern":
+            fields = set(json.loads(attributes.get("fieldAttrs") or "{}"))
+            patterns = [attributes["title"]]
+        elif obj.get("type") == "search":
+            fields = set(attributes.get("columns", [])) | {sort[0] for sort in attributes.get("sort", [])}
+            search_source = json.loads(attributes["kibanaSavedObjectMeta"]["searchSourceJSON"])
+            filter_fields(search_source.get("filter", []), fields)
+            patterns = sorted({titles[ref["id"]] for ref in obj.get("references", []) if ref["id"] in titles})
+        else:
+            continue
+        for pattern in patterns:
+            for field in fields:
+                used.setdefault(pattern, {}).setdefault(field, []).append(attributes["title"])
+    return used
+
+
+class KibanaViewFieldsTest(unittest.TestCase):
+    """Les champs des vues Kibana fournies existent dans les mappings explicites (--mapping-mode false / strict)."""
+
+    def test_all_view_fields_are_mapped(self):
+        transformer = TimelineTransformer("test")
+        used = used_fields(load_saved_objects())
+        self.assertTrue(used)
+        for mapping_mode in ("false", "strict"):
+            index_fields = {category: mapped_fields(mappings)
+                            for category, mappings in transformer.index_mappings(mapping_mode).items()}
+            for pattern, fields in sorted(used.items()):
+                # 'plaso_*_*_files' -> index 'files' ; 'plaso_*_*' -> tous les index consolidés
+                category = pattern.split("plaso_*_*", 1)[1].lstrip("_")
+                categories = [category] if category else list(index_fields)
+                for field, users in sorted(fields.items()):
+                    with self.subTest(mapping_mode=mapping_mode, pattern=pattern, field=field):
+                        self.assertTrue(
+                            any(field in index_fields[name][0]
+                                or any(field.startswith(f"{parent}.") for parent in index_fields[name][1])
+                                for name in categories),
+                            f"'{field}' ({', '.join(sorted(set(users)))}) absent du mapping de {pattern}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gzip
+import io
+import mmap
+import os
+import queue
+import stat
+import struct
+import sys
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Nombres magiques des formats compressés reconnus (détection indépendante de l'extension)
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = 0xFD2FB528
+_ZSTD_SKIPPABLE_MAGIC_MASK = 0xFFFFFFF0
+_ZSTD_SKIPPABLE_MAGIC = 0x184D2A50
+
+# Lecture des flux compressés : taille des blocs décompressés et nombre de blocs d'avance du thread lecteur
+DECOMPRESS_BLOCK_SIZE = 4 * 1024 * 1024
+DECOMPRESS_QUEUE_BLOCKS = 8
+
+
+def parse_shard(shard_spec: str) -> (int, int):
+    """
+    Analyse une spécification de shard 'i/N' (i commence à 1).
+    Lève ValueError si la spécification est invalide.
+    """
+    try:
+        index_str, count_str = shard_spec.split("/", 1)
+        index, count = int(index_str), int(count_str)
+    except ValueError:
+        raise ValueError(f"Spécification de shard invalide '{shard_spec}' (attendu : i/N, ex: 2/4)")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Spécification de shard invalide '{shard_spec}' (1 <= i <= N requis)")
+    return index, count
+
+
+def _align_on_line_start(mm, pos: int, size: int) -> int:
+    """Retourne le début de la première ligne commençant à 'pos' ou après."""
+    if pos <= 0:
+        return 0
+    if pos >= size:
+        return size
+    # On cherche à partir de pos - 1 : si l'octet précédent est déjà un '\n', pos est un début de ligne
+    newline_pos = mm.find(b"\n", pos - 1)
+    return size if newline_pos == -1 else newline_pos + 1
+
+
+def compute_byte_ranges(path: str, parts: int, start: int = 0, end: int = None) -> list:
+    """
+    Découpe [start, end) en 'parts' plages d'octets alignées sur les fins de ligne.
+    Chaque ligne appartient à exactement une plage. Des plages vides sont possibles
+    (fichier plus petit que le nombre de plages) et sont conservées pour que l'index
+    d'une plage reste stable (utilisé par --shard).
+    """
+    size = os.path.getsize(path)
+    end = size if end is None else min(end, size)
+    if parts <= 1 or end <= start:
+        return [(start, end)] + [(end, end)] * (max(parts, 1) - 1)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        step = (end - start) / parts
+        cuts = [start]
+        for k in range(1, parts):
+            cut = _align_on_line_start(mm, start + int(k * step), size)
+            cuts.append(min(max(cut, cuts[-1]), end))
+        cuts.append(end)
+    return [(cuts[k], cuts[k + 1]) for k in range(parts)]
+
+
+def split_byte_range(path: str, start: int, end: int, chunk_bytes: int) -> list:
+    """Découpe [start, end) en plages alignées sur les lignes d'environ 'chunk_bytes' octets."""
+    if end <= start:
+        return []
+    parts = max(1, -(-(end - start) // max(1, chunk_bytes)))
+    return [r for r in compute_byte_ranges(path, parts, start, end) if r[0] < r[1]]
+
+
+def iter_range_lines(path: str, start: int, end: int):
+    """
+    Lit les lignes de la plage [start, end) via une vue mémoire (mmap).
+    'start' doit être un début de ligne. Génère des tuples (offset de fin de ligne, ligne nettoyée) ;
+    les lignes vides sont ignorées et les lignes non UTF-8 signalées puis ignorées.
+    """
+    if end <= start:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        mm.seek(start)
+        readline = mm.readline
+        offset = start
+        while offset < end:
+            raw_line = readline()
+            if not raw_line:  # Fin du fichier atteinte avant 'end'
+                break
+            line_start, offset = offset, mm.tell()
+            try:
+                stripped_line = raw_line.decode("utf-8").strip()
+            except UnicodeDecodeError:
+                print(f"[Attention] Ligne non UTF-8 ignorée (octet {line_start})")
+                continue
+            if stripped_line:
+                yield offset, stripped_line
+
+
+# --- ENTRÉES EN FLUX : COMPRESSÉES (.jsonl.gz / .jsonl.zst), ENTRÉE STANDARD, FIFO ---
+
+# Chemin désignant l'entrée standard (--timeline -)
+STDIN_PATH = "-"
+
+
+def is_stream_input(path: str) -> bool:
+    """True pour l'entrée standard ou un fichier spécial (FIFO, /dev/stdin...) : lecture séquentielle uniquement."""
+    if path == STDIN_PATH:
+        return True
+    try:
+        return not stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def detect_compression(path: str):
+    """Retourne 'gzip', 'zstd' ou None d'après les premiers octets du fichier (None aussi s'il est illisible)."""
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(4)
+    except OSError:
+        return None
+    return _compression_from_magic(magic)
+
+
+def _compression_from_magic(magic: bytes):
+    if magic[:2] == _GZIP_MAGIC:
+        return "gzip"
+    if len(magic) == 4:
+        magic_number = struct.unpack("<I", magic)[0]
+        if magic_number == _ZSTD_MAGIC or magic_number & _ZSTD_SKIPPABLE_MAGIC_MASK == _ZSTD_SKIPPABLE_MAGIC:
+            return "zstd"
+    return None
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError("Le module 'zstandard' est requis pour lire une timeline .zst (pip install zstandard)")
+
+
+def _open_stream(path: str, compression: str = None):
+    """
+    Ouvre le flux (binaire, décompressé) d'une timeline. Pour l'entrée standard ou une FIFO, la compression
+    est détectée sur les premiers octets sans les consommer (peek). Retourne (flux, fichier sous-jacent) :
+    l'entrée standard n'est pas fermée.
+    """
+    raw = sys.stdin.buffer if path == STDIN_PATH else open(path, "rb")
+    if compression is None:
+        compression = _compression_from_magic(raw.peek(4)[:4])
+    if compression == "gzip":
+        stream = gzip.GzipFile(fileobj=raw, mode="rb")
+    elif compression == "zstd":
+        _require_zstandard()
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+    else:
+        stream = raw
+    return stream, (None if raw is sys.stdin.buffer else raw)
+
+
+def iter_stream_blocks(path: str, compression: str = None, idle_timeout: float = None):
+    """
+    Génère les blocs du flux (décompressé) de la timeline. La lecture et la décompression tournent dans
+    un thread dédié, en avance d'au plus DECOMPRESS_QUEUE_BLOCKS blocs : elles se recouvrent avec la
+    transformation des lignes (zlib et zstd relâchent le GIL pendant la décompression).
+    Les blocs sont rendus dès que des données sont disponibles (read1) : une entrée alimentée au fil de l'eau
+    (psort dans un tube) est traitée sans attendre un bloc complet. Avec 'idle_timeout', un bloc vide est
+    généré chaque fois qu'aucune donnée n'arrive pendant ce délai (signal pour vider les lots en cours).
+    """
+    blocks = queue.Queue(maxsize=DECOMPRESS_QUEUE_BLOCKS)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                blocks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def reader():
+        try:
+            stream, raw = _open_stream(path, compression)
+            try:
+                read = getattr(stream, "read1", stream.read)
+                while not stop.is_set():
+                    block = read(DECOMPRESS_BLOCK_SIZE)
+                    if not block:
+                        break
+                    put(block)
+            finally:
+                if raw is not None:
+                    stream.close()
+                    raw.close()
+            put(None)
+        except BaseException as e:  # Transmise au consommateur (fichier tronqué, données corrompues...)
+            put(e)
+
+    thread = threading.Thread(target=reader, name="timeline-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                item = blocks.get(timeout=idle_timeout)
+            except queue.Empty:
+                yield b""
+                continue
+            if item is None:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Un thread bloqué sur une lecture d'entrée standard ne peut pas être interrompu (thread démon)
+        thread.join(timeout=1.0)
+
+
+def iter_data_lines(data: bytes, base_offset: int = 0):
+    """
+    Découpe un bloc d'octets ne contenant que des lignes complètes (la dernière peut ne pas avoir de '\n').
+    Génère des tuples (offset de fin de ligne, ligne nettoyée), comme iter_range_lines.
+    """
+    offset = base_offset
+    for raw_line in data.split(b"\n"):
+        line_start, offset = offset, offset + len(raw_line) + 1
+        try:
+            stripped_line = raw_line.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            print(f"[Attention] Ligne non UTF-8 ignorée (octet {line_start})")
+            continue
+        if stripped_line:
+            yield offset, stripped_line
+
+
+def iter_stream_lines(path: str, compression: str = None, idle_timeout: float = None):
+    """
+    Lit en flux les lignes d'une timeline compressée (sans la décompresser sur disque), de l'entrée standard
+    ou d'une FIFO. Les offsets générés sont ceux du flux décompressé. Avec 'idle_timeout', le tuple
+    (offset, None) est généré quand l'entrée reste muette pendant ce délai (voir iter_stream_blocks).
+    """
+    carry = b""
+    offset = 0
+    for block in iter_stream_blocks(path, compression, idle_timeout):
+        if not block:
+            yield offset, None
+            continue
+        last_newline = block.rfind(b"\n")
+        if last_newline == -1:
+            carry += block
+            continue
+        data = carry + block[:last_newline + 1]
+        yield from iter_data_lines(data, offset)
+        offset += len(data)
+        carry = block[last_newline + 1:]
+    if carry:
+        yield from iter_data_lines(carry, offset)
+
+
+def _zstd_frame_end(mm, pos: int, size: int) -> int:
+    """
+    Retourne la fin de la trame zstd (ou trame 'skippable') débutant à 'pos', en ne lisant que les en-têtes.
+    Lève ValueError si la structure est invalide.
+    """
+    if pos + 4 > size:
+        raise ValueError("trame tronquée")
+    magic = struct.unpack_from("<I", mm, pos)[0]
+    if magic & _ZSTD_SKIPPABLE_MAGIC_MASK == _ZSTD_SKIPPABLE_MAGIC:
+        if pos + 8 > size:
+            raise ValueError("trame tronquée")
+        return pos + 8 + struct.unpack_from("<I", mm, pos + 4)[0]
+    if magic != _ZSTD_MAGIC:
+        raise ValueError(f"nombre magique inattendu à l'octet {pos}")
+
+    descriptor = mm[pos + 4]
+    single_segment = descriptor & 0x20
+    content_size_bytes = (1 if single_segment else 0, 2, 4, 8)[descriptor >> 6]
+    dictionary_id_bytes = (0, 1, 2, 4)[descriptor & 0x03]
+    checksum_bytes = 4 if descriptor & 0x04 else 0
+    pos += 5 + (0 if single_segment else 1) + dictionary_id_bytes + content_size_bytes
+
+    while True:
+        if pos + 3 > size:
+            raise ValueError("bloc tronqué")
+        header = mm[pos] | mm[pos + 1] << 8 | mm[pos + 2] << 16
+        block_type = (header >> 1) & 0x03
+        if block_type == 3:
+            raise ValueError(f"type de bloc réservé à l'octet {pos}")
+        pos += 3 + (1 if block_type == 1 else header >> 3)  # Bloc RLE : un seul octet stocké
+        if header & 0x01:  # Dernier bloc de la trame
+            return pos + checksum_bytes
+
+
+def split_zstd_frames(path: str, chunk_bytes: int) -> list:
+    """
+    Regroupe les trames d'un fichier zstd multi-trames (zstd -T, pzstd...) en plages d'octets compressés
+    d'environ 'chunk_bytes', décompressables indépendamment. Retourne une seule plage si le fichier
+    ne contient qu'une trame ou si sa structure n'est pas reconnue (lecture séquentielle).
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        range_start = pos = 0
+        try:
+            while pos < size:
+                pos = _zstd_frame_end(mm, pos, size)
+                if pos > size:
+                    raise ValueError("trame tronquée")
+                if pos - range_start >= chunk_bytes:
+                    ranges.append((range_start, pos))
+                    range_start = pos
+        except ValueError as e:
+            print(f"[Attention] Structure zstd non reconnue ({e}) : décompression séquentielle")
+            return [(0, size)]
+    if range_start < size:
+        ranges.append((range_start, size))
+    return ranges
+
+
+def decompress_zstd_range(path: str, start: int, end: int) -> bytes:
+    """Décompresse les trames zstd complètes contenues dans la plage d'octets [start, end)."""
+    _require_zstandard()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        compressed = mm[start:end]
+    reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(compressed), read_across_frames=True)
+    return reader.read()
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import re
+import traceback
+from collections import Counter
+from types import GeneratorType
+
+from event_dedup import BloomFilter
+from timeline_reader import decompress_zstd_range, iter_data_lines, iter_range_lines
+from plaso_processors import json_codec
+from plaso_processors.base_processor import BatchItemError
+from plaso_processors.output_schema import BASE_OUTPUT_SCHEMA, build_mappings, merge_schemas
+
+from plaso_processors.evtx_processor import PlasoEvtxProcessor
+from plaso_processors.registry_processor import PlasoRegistryProcessor
+from plaso_processors.mft_processor import PlasoMftProcessor
+from plaso_processors.lnk_processor import PlasoLnkProcessor
+from plaso_processors.prefetch_processor import PlasoPrefetchProcessor
+from plaso_processors.srum_processor import PlasoSrumProcessor
+from plaso_processors.browser_history_processor import PlasoBrowserHistoryProcessor
+from plaso_processors.amcache_processor import PlasoAmcacheProcessor
+from plaso_processors.generic_processor import PlasoGenericProcessor
+from plaso_processors.appcompatcache_processor import PlasoAppCompatCacheProcessor
+from plaso_processors.userassist_processor import PlasoUserAssistProcessor
+from plaso_processors.runkey_processor import PlasoRunKeyProcessor
+from plaso_processors.usb_processor import PlasoUsbProcessor
+from plaso_processors.mru_processor import PlasoMruProcessor
+
+
+# Découpages possibles d'un index consolidé (--index-partition <catégorie>=<mode>)
+INDEX_PARTITIONS = ("none", "year", "month", "data_stream")
+
+# Champ de temps obligatoire des flux de données, et sa valeur pour un document sans estimestamp (époque Unix,
+# comme les timestamps Plaso nuls)
+DATA_STREAM_OUTPUT_SCHEMA = {"@timestamp": "date"}
+UNDATED_TIMESTAMP = "1970-01-01T00:00:00.000000Z"
+
+
+def parse_index_partition(partition_spec: str) -> (str, str):
+    """
+    Analyse une spécification de découpage '<catégorie>=<mode>' (ex: files=month).
+    Lève ValueError si la spécification est invalide.
+    """
+    category, separator, partitioning = partition_spec.partition("=")
+    if not separator or partitioning not in INDEX_PARTITIONS:
+        raise ValueError(f"Découpage d'index invalide '{partition_spec}' (attendu : <catégorie>=<mode>, "
+                         f"mode parmi {', '.join(INDEX_PARTITIONS)})")
+    return category.strip(), partitioning
+
+
+class TimelineTransformer:
+    """
+    Transforme les lignes brutes d'une timeline Plaso en actions bulk Elasticsearch.
+    Ne dépend d'aucune connexion Elasticsearch : il peut donc être instancié
+    dans chaque processus de travail du mode multi-processus.
+    """
+
+    # Nombre maximal de valeurs 'parser' distinctes mémorisées (une timeline n'en contient que quelques dizaines)
+    ARTEFACT_TYPE_CACHE_SIZE = 4096
+
+    # Nombre de lignes transformées ensemble (transform_lines) : taille des lots passés aux process_batch
+    PROCESS_BATCH_SIZE = 2048
+
+    # Opérations bulk acceptées (--op-type) : 'create' ignore côté serveur les documents déjà indexés
+    OP_TYPES = ("index", "create")
+
+    def __init__(self, index_prefix: str, evtx_raw_retention: str = "full", doc_ids: bool = False,
+                 op_type: str = "index", dedup_capacity: int = 0, dedup_error_rate: float = 1e-7,
+                 index_partitions: dict = None):
+        if op_type not in self.OP_TYPES:
+            raise ValueError(f"Opération bulk inconnue : {op_type} (attendu : {', '.join(self.OP_TYPES)})")
+        self.index_prefix = index_prefix
+        # 'create' n'a de sens qu'avec des _id stables : il les active
+        self.op_type = op_type
+        self.doc_ids = doc_ids or op_type == "create"
+
+        # Suppression des doublons (--dedup) : filtre de Bloom sur l'identité des événements (event_identity)
+        self.dedup_filter = BloomFilter(dedup_capacity, dedup_error_rate) if dedup_capacity else None
+        # En mode multi-processus, les identités des événements conservés sont transmises au processus
+        # principal (liste de (identité, type d'artefact, nombre d'actions)), qui les repasse dans son filtre
+        self.dedup_keys = None
+
+        # MAPPING VERS LES NOUVEAUX INDEX PLUS LARGES
+        # IMPORTANT : L'ordre est crucial. Les regex les plus spécifiques doivent être testées AVANT les regex génériques.
+        self.parser_regex_map = {
+            # --- PROCESS (Artefacts d'exécution - Prioritaires car souvent 'winreg') ---
+            "amcache": re.compile(r'winreg/amcache'),  # Spécifique (winreg)
+            "userassist": re.compile(r'userassist'),  # Spécifique (winreg)
+            "appcompatcache": re.compile(r'appcompatcache'),
+            "srum": re.compile(r'esedb/srum'),
+            "prefetch": re.compile(r'prefetch'),
+
+            # --- HIVE SPÉCIFIQUES (Registre Windows) ---
+            "runkey": re.compile(r'winreg/windows_run'),  # Spécifique
+            "usb": re.compile(r'winreg/windows_usb_devices'),  # Spécifique
+            "mru": re.compile(r'winreg/(bagmru|mrulistex)'),  # Spécifique
+
+            # --- HIVE GÉNÉRIQUE (Registre Windows - Doit être après les spécifiques) ---
+            "hive": re.compile(r'winreg'),  # Générique (attrape tout le reste de winreg)
+
+            # --- EVTX ---
+            "evtx": re.compile(r'winevtx'),
+
+            # --- BROWSER ---
+            "browser_history": re.compile(r'(sqlite/((chrome|firefox|edge).*history))'),
+
+            # --- FILES ---
+            "lnk": re.compile(r'lnk'),
+            "mft": re.compile(r'(filestat)|(usnjrnl)|(mft)'),
+
+            # --- OTHER / FALLBACK ---
+            "other": re.compile(r'.*')  # Prend tout le reste
+        }
+
+        # Dictionnaire pour mapper le type d'artefact (clé du processeur) au nom de l'INDEX CONSOLIDÉ
+        self.index_category_map = {
+            "evtx": "evtx",
+            "runkey": "hive",
+            "usb": "hive",
+            "mru": "hive",
+            "hive": "hive",
+            "srum": "process",
+            "amcache": "process",
+            "appcompatcache": "process",
+            "prefetch": "process",
+            "userassist": "process",
+            "browser_history": "browser_artefacts",
+            "lnk": "files",
+            "mft": "files",
+            "other": "others"
+        }
+
+        # Découpage de chaque index consolidé (--index-partition) : 'none' = un seul index, 'year' / 'month' =
+        # un index par année / mois d'estimestamp ('<index>-2023', '<index>-2023.05'), 'data_stream' = flux de
+        # données (rollover par taille) : @timestamp reprend estimestamp et les documents sont écrits en 'create'
+        self.index_partitioning = dict.fromkeys(self.index_category_map.values(), "none")
+        for category, partitioning in (index_partitions or {}).items():
+            if category not in self.index_partitioning or partitioning not in INDEX_PARTITIONS:
+                raise ValueError(f"Découpage d'index invalide '{category}={partitioning}' (catégories : "
+                                 f"{', '.join(self.index_partitioning)} ; modes : {', '.join(INDEX_PARTITIONS)})")
+            self.index_partitioning[category] = partitioning
+
+        self.processors = {
+            "srum": PlasoSrumProcessor(),
+            "amcache": PlasoAmcacheProcessor(),
+            "appcompatcache": PlasoAppCompatCacheProcessor(),
+            "runkey": PlasoRunKeyProcessor(),
+            "usb": PlasoUsbProcessor(),
+            "mru": PlasoMruProcessor(),
+            "userassist": PlasoUserAssistProcessor(),
+            "browser_history": PlasoBrowserHistoryProcessor(),
+            "evtx": PlasoEvtxProcessor(raw_retention=evtx_raw_retention),
+            "hive": PlasoRegistryProcessor(),
+            "mft": PlasoMftProcessor(),
+            "lnk": PlasoLnkProcessor(),
+            "prefetch": PlasoPrefetchProcessor(),
+            "other": PlasoGenericProcessor()
+        }
+
+        # Table de dispatch : cache 'parser' -> clé de processeur, alimenté par une regex combinée unique
+        self.parser_dispatch_regex = self._build_parser_dispatch_regex()
+        self._artefact_type_cache = {}
+
+        # Compteurs de la passe (agrégés entre processus de travail via pop_stats)
+        self.stats = Counter()
+
+    def _build_parser_dispatch_regex(self):
+        """
+        Compile parser_regex_map en une seule alternative. Chaque branche teste sa regex n'importe où
+        dans la chaîne (lookahead, comme re.search) puis capture un groupe vide nommé d'après la clé :
+        les branches étant essayées dans l'ordre du dictionnaire, la priorité des regex est conservée.
+        """
+        branches = [rf"(?=[\s\S]*?(?:{value_regex.pattern}))(?P<{key}>)"
+                    for key, value_regex in self.parser_regex_map.items()]
+        return re.compile("|".join(branches))
+
+    def identify_artefact_type(self, event: dict) -> str:
+        parser = event.get("parser", "")
+        artefact_type = self._artefact_type_cache.get(parser)
+        if artefact_type is not None:
+            self.stats["classification_cache_hit"] += 1
+            return artefact_type
+
+        self.stats["classification_cache_miss"] += 1
+        match = self.parser_dispatch_regex.match(parser)
+        artefact_type = match.lastgroup if match else "other"
+        if len(self._artefact_type_cache) >= self.ARTEFACT_TYPE_CACHE_SIZE:
+            self._artefact_type_cache.clear()
+        self._artefact_type_cache[parser] = artefact_type
+        return artefact_type
+
+    def index_schemas(self) -> dict:
+        """
+        Schéma de sortie de chaque index consolidé : champs communs et OUTPUT_SCHEMA des processeurs
+        qui l'alimentent (index_category_map). Un champ déclaré avec deux types différents lève une ValueError.
+        """
+        schemas = {}
+        for key, processor in self.processors.items():
+            category = self.index_category_map.get(key, "others")
+            schemas.setdefault(category, [BASE_OUTPUT_SCHEMA]).append(processor.OUTPUT_SCHEMA)
+        for category, partitioning in self.index_partitioning.items():
+            if partitioning == "data_stream":
+                schemas[category].append(DATA_STREAM_OUTPUT_SCHEMA)
+        return {category: merge_schemas(*category_schemas) for category, category_schemas in schemas.items()}
+
+    def index_mappings(self, mapping_mode: str) -> dict:
+        """Mappings explicites par index consolidé (--mapping-mode false / strict) ; None en mode 'dynamic'."""
+        if mapping_mode == "dynamic":
+            return None
+        return {category: build_mappings(schema, mapping_mode) for category, schema in self.index_schemas().items()}
+
+    def data_stream_categories(self) -> list:
+        """Index consolidés écrits dans un flux de données (--index-partition <catégorie>=data_stream)."""
+        return [category for category, partitioning in self.index_partitioning.items()
+                if partitioning == "data_stream"]
+
+    @staticmethod
+    def time_partition_suffix(estimestamp, partitioning: str) -> str:
+        """Suffixe '-AAAA' ou '-AAAA.MM' de l'index d'un document ; '-undated' sans estimestamp exploitable."""
+        if isinstance(estimestamp, str) and estimestamp[:4].isdigit() and estimestamp[5:7].isdigit():
+            return f"-{estimestamp[:4]}" if partitioning == "year" else f"-{estimestamp[:4]}.{estimestamp[5:7]}"
+        return "-undated"
+
+    def collect_stats(self) -> Counter:
+        """Rapatrie les compteurs propres aux processeurs dans self.stats et retourne ce dernier."""
+        for processor in self.processors.values():
+            self.stats.update(processor.pop_stats())
+        return self.stats
+
+    def pop_stats(self) -> Counter:
+        """Retourne les compteurs accumulés depuis le dernier appel (processeurs inclus) et les remet à zéro."""
+        stats, self.stats = self.collect_stats(), Counter()
+        return stats
+
+    @staticmethod
+    def print_stats(stats: Counter):
+        """Affiche le résumé des compteurs de la passe."""
+        hits, misses = stats["classification_cache_hit"], stats["classification_cache_miss"]
+        total = hits + misses
+        if total:
+            print(f"[*] Classification des artefacts : {hits} succès / {misses} échecs de cache "
+                  f"({hits * 100 / total:.2f} % de succès)")
+
+        suppressed = sorted(((key.split(":", 1)[1], count) for key, count in stats.items()
+                             if key.startswith("dedup_suppressed:")), key=lambda item: item[1], reverse=True)
+        if suppressed:
+            print(f"[*] Doublons supprimés (--dedup) : {sum(count for _, count in suppressed)}")
+            for artefact_type_key, count in suppressed:
+                print(f"    {artefact_type_key:<45} {count}")
+
+        handler_hits = sorted(((key.split(":", 1)[1], count) for key, count in stats.items()
+                               if key.startswith("evtx_handler:")), key=lambda item: item[1], reverse=True)
+        if handler_hits:
+            print("[*] Événements EVTX par handler :")
+            for handler_name, count in handler_hits:
+                print(f"    {handler_name:<45} {count}")
+
+    @staticmethod
+    def event_identity(event: dict, stripped_line: str) -> bytes:
+        """
+        Empreinte (16 octets) identifiant un événement, stable d'une exécution à l'autre : base de l'_id
+        des documents (--doc-ids) et clé de déduplication (--dedup).
+        Plaso calcule _event_values_hash sur les valeurs de l'événement, hors horodatage et hors source
+        (snapshot VSS, copie du fichier) : il est donc complété par le timestamp et sa description
+        (une même entrée MFT produit un événement par date M/A/C/B). À défaut de hash, la ligne brute est utilisée.
+        """
+        values_hash = event.get("_event_values_hash")
+        if values_hash:
+            key = f"{values_hash}|{event.get('timestamp')}|{event.get('timestamp_desc')}|{event.get('parser')}"
+        else:
+            key = stripped_line
+        return hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def transform_line(self, stripped_line: str, line_ref: str) -> list:
+        """
+        Transforme une ligne JSON (déjà nettoyée) en une liste d'actions bulk.
+        'line_ref' localise la ligne dans les messages d'erreur (ex: 'ligne 12' ou 'octet 4096').
+        """
+        return self.transform_lines([(stripped_line, line_ref)])
+
+    def transform_lines(self, lines: list) -> list:
+        """
+        Transforme un lot de lignes [(ligne nettoyée, line_ref), ...] en actions bulk.
+        Les événements sont regroupés par type d'artefact et chaque groupe est confié en une fois
+        au process_batch de son processeur ; les actions sont restituées dans l'ordre des lignes.
+        """
+        events = [None] * len(lines)
+        batches = {}
+        for position, (stripped_line, line_ref) in enumerate(lines):
+            try:
+                event = json_codec.loads(stripped_line)
+                # Calculée avant le processeur, qui supprime _event_values_hash et timestamp de l'événement
+                identity = self.event_identity(event, stripped_line) \
+                    if self.doc_ids or self.dedup_filter is not None else None
+                event["event_raw_string"] = stripped_line
+                artefact_type_key = self.identify_artefact_type(event)
+                if self.dedup_filter is not None and self.dedup_filter.check_and_add(identity):
+                    self.stats[f"dedup_suppressed:{artefact_type_key}"] += 1
+                    continue
+            except json.JSONDecodeError:
+                print(f"[Attention] Ligne JSON invalide ignorée ({line_ref})")
+                continue
+            except Exception as e:
+                self._report_line_error(e, stripped_line, line_ref)
+                continue
+            events[position] = (event, artefact_type_key, identity)
+            batches.setdefault(artefact_type_key, []).append(position)
+
+        results = [None] * len(lines)
+        for artefact_type_key, positions in batches.items():
+            processor = self.processors.get(artefact_type_key, self.processors["other"])
+            batch_events = [events[position][0] for position in positions]
+            try:
+                batch_results = processor.process_batch(batch_events)
+            except Exception as e:
+                # Échec du lot entier : l'erreur est signalée pour chacune de ses lignes
+                batch_results = [BatchItemError(e)] * len(positions)
+            for position, processor_result in zip(positions, batch_results):
+                results[position] = processor_result
+
+        actions = []
+        for position, (stripped_line, line_ref) in enumerate(lines):
+            if events[position] is None:
+                continue
+            event, artefact_type_key, identity = events[position]
+            action_count = len(actions)
+            try:
+                processor_result = results[position]
+                if isinstance(processor_result, BatchItemError):
+                    raise processor_result.error
+                self._append_actions(actions, processor_result, event, artefact_type_key, stripped_line, line_ref,
+                                     identity.hex() if self.doc_ids else None)
+            except Exception as e:
+                self._report_line_error(e, stripped_line, line_ref)
+            if self.dedup_keys is not None:
+                self.dedup_keys.append((identity, artefact_type_key, len(actions) - action_count))
+        return actions
+
+    def drop_known_events(self, actions: list, dedup_keys: list) -> list:
+        """
+        Mode multi-processus : chaque processus ne déduplique que ses propres plages. Les identités des
+        événements qu'il a conservés ('dedup_keys', dans l'ordre des actions) passent ici dans le filtre
+        du processus principal, qui retire les actions des événements déjà vus dans une autre plage.
+        """
+        kept = []
+        position = 0
+        for identity, artefact_type_key, action_count in dedup_keys:
+            if not self.dedup_filter.check_and_add(identity):
+                kept.extend(actions[position:position + action_count])
+            else:
+                self.stats[f"dedup_suppressed:{artefact_type_key}"] += 1
+            position += action_count
+        return kept
+
+    @staticmethod
+    def _report_line_error(error: Exception, stripped_line: str, line_ref: str):
+        print(f"[ERREUR] Échec du traitement ({line_ref}). Erreur: {error}")
+        print(f"  Ligne: {stripped_line[:200]}...")
+        traceback.print_exc()
+
+    def _append_actions(self, actions: list, processor_result, event: dict, artefact_type_key: str,
+                        stripped_line: str, line_ref: str, id_base: str = None):
+        """
+        Ajoute à 'actions' les actions bulk correspondant au résultat d'un processeur pour une ligne.
+        Avec 'id_base', chaque document reçoit l'_id '<id_base>-<rang>' : le rang distingue les documents
+        d'un même événement éclaté (Registre, Prefetch, MRU...).
+        """
+        if isinstance(processor_result, GeneratorType):
+            events_to_yield = processor_result
+        elif isinstance(processor_result, tuple) and len(processor_result) == 2:
+            events_to_yield = [processor_result]
+        else:
+            print(
+                f"[Attention] Le processeur '{artefact_type_key}' a retourné un résultat inattendu: {type(processor_result)}. Traitement générique de l'erreur.")
+            processed_doc = {"message": f"Processor '{artefact_type_key}' returned malformed result.",
+                             "raw_event": event.get("event_raw_string")}
+            specific_index_key = "other"
+            events_to_yield = [(processed_doc, specific_index_key)]
+
+        for fan_out_position, item in enumerate(events_to_yield):
+            try:
+                processed_doc, specific_index_key = item
+            except ValueError as ve:
+                print(f"[ERREUR D'UNPACKING] Échec ({line_ref}, {artefact_type_key}). Erreur: {ve}")
+                error_doc = {
+                    "message": f"Unpacking error: {ve}. Original item: {item}",
+                    "raw_event_line": stripped_line,
+                    "artefact_type": "error_data"
+                }
+                specific_index_key = "other"
+                processed_doc = error_doc
+            except Exception as e:
+                print(f"[ERREUR CRITIQUE] Échec ({line_ref}, {artefact_type_key}). Erreur: {e}")
+                error_doc = {
+                    "message": f"Critical iteration error: {e}",
+                    "raw_event_line": stripped_line,
+                    "artefact_type": "critical_error"
+                }
+                specific_index_key = "other"
+                processed_doc = error_doc
+
+            # CONSERVATION DE LA CLÉ SPÉCIFIQUE DANS LE DOCUMENT
+            processed_doc["artefact_type"] = specific_index_key
+
+            # DÉTERMINATION DE L'INDEX CONSOLIDÉ
+            index_category_key = self.index_category_map.get(specific_index_key, "others")
+
+            index_name = f"{self.index_prefix}_{index_category_key}"
+
+            # DÉCOUPAGE TEMPOREL : index par année / mois, ou flux de données (écriture en 'create' seulement)
+            op_type = self.op_type
+            partitioning = self.index_partitioning.get(index_category_key, "none")
+            if partitioning == "data_stream":
+                processed_doc["@timestamp"] = processed_doc.get("estimestamp") or UNDATED_TIMESTAMP
+                op_type = "create"
+            elif partitioning != "none":
+                index_name += self.time_partition_suffix(processed_doc.get("estimestamp"), partitioning)
+
+            action = {
+                "_index": index_name,
+                "_source": processed_doc
+            }
+            if id_base is not None:
+                action["_id"] = f"{id_base}-{fan_out_position}"
+            if op_type != "index":
+                action["_op_type"] = op_type
+            actions.append(action)
+
+
+# --- MODE MULTI-PROCESSUS ---
+# Chaque processus de travail possède sa propre instance du transformateur,
+# créée une seule fois par l'initialiseur du pool.
+_worker_transformer = None
+
+
+def init_worker(index_prefix: str, json_backend: str, transformer_options: dict):
+    """
+    Initialiseur du pool : construit le transformateur (et ses processeurs) du processus de travail.
+    'transformer_options' contient les arguments nommés de TimelineTransformer (mêmes que le processus principal).
+    """
+    global _worker_transformer
+    json_codec.set_backend(json_backend)
+    _worker_transformer = TimelineTransformer(index_prefix, **transformer_options)
+
+
+def transform_range_in_worker(path: str, start: int, end: int) -> (list, Counter, list):
+    """
+    Point d'entrée exécuté dans un processus de travail : lit lui-même sa plage d'octets
+    de la timeline (mmap) et retourne les actions bulk produites, les compteurs de la plage
+    et, avec --dedup, les identités des événements conservés (None sinon).
+    """
+    return _transform_in_worker((stripped_line, f"octet {line_end}")
+                                for line_end, stripped_line in iter_range_lines(path, start, end))
+
+
+def transform_lines_in_worker(lines: list) -> (list, Counter, list):
+    """Variante de transform_range_in_worker pour un lot de lignes lues par le processus principal (flux compressé)."""
+    return _transform_in_worker(lines)
+
+
+def transform_zstd_range_in_worker(path: str, start: int, end: int) -> (bytes, bytes, list, Counter, list):
+    """
+    Décompresse une plage de trames zstd complètes et transforme les lignes qu'elle contient entièrement.
+    Les trames ne sont pas alignées sur les lignes : le début de la première ligne et la fin de la dernière
+    sont retournés tels quels (head, tail) pour être recollés par le processus principal avec les plages voisines.
+    Si la plage ne contient aucun '\n', tail vaut None et head contient toute la plage.
+    Retourne (head, tail, actions, compteurs, identités --dedup).
+    """
+    data = decompress_zstd_range(path, start, end)
+    first_newline = data.find(b"\n")
+    if first_newline == -1:
+        return data, None, [], Counter(), None
+    last_newline = data.rfind(b"\n")
+    body = data[first_newline + 1:last_newline + 1]
+    actions, stats, dedup_keys = _transform_in_worker(
+        (stripped_line, f"trames {start}-{end}, octet {line_end}")
+        for line_end, stripped_line in iter_data_lines(body, first_newline + 1))
+    return data[:first_newline], data[last_newline + 1:], actions, stats, dedup_keys
+
+
+def _transform_in_worker(lines) -> (list, Counter, list):
+    """Transforme les lignes [(ligne nettoyée, line_ref), ...] par lots de PROCESS_BATCH_SIZE."""
+    if _worker_transformer.dedup_filter is not None:
+        _worker_transformer.dedup_keys = []
+    actions = []
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= _worker_transformer.PROCESS_BATCH_SIZE:
+            actions.extend(_worker_transformer.transform_lines(batch))
+            batch = []
+    if batch:
+        actions.extend(_worker_transformer.transform_lines(batch))
+    dedup_keys, _worker_transformer.dedup_keys = _worker_transformer.dedup_keys, None
+    return actions, _worker_transformer.pop_stats(), dedup_keys